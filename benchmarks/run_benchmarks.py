@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+'''
+Benchmarks of the hot paths of digicircs, with scaling sweeps over the
+number of qubits, the number of gates and the batch size.
+
+Run all benchmarks and save the results:
+
+    python benchmarks/run_benchmarks.py -o results.json
+
+Run a quick subset (smallest sweep values only), or filter by name:
+
+    python benchmarks/run_benchmarks.py --quick -k multi_hot -o results.json
+
+Compare two result files (e.g. from two commits); benchmarks slower by more
+than the threshold are reported and the exit code is 1:
+
+    python benchmarks/run_benchmarks.py --compare base.json results.json
+'''
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import itertools
+import subprocess
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+QUBITS = [4, 16, 64, 256]
+GATES = [10, 100, 1000, 10000]
+BATCHES = [1, 32, 256]
+
+BENCHMARKS = {}
+
+def benchmark(**sweep):
+    '''
+    Register a benchmark. The decorated function takes one value of every
+    swept parameter and returns the callable to be timed.
+    '''
+    def register(func):
+        BENCHMARKS[func.__name__] = (func, sweep)
+        return func
+    return register
+
+def _dataset(n_qubit: int, n_gates: int, n_circuits: int = 1):
+    from digicircs import gen_circuit, one_hot
+    q_strs = [gen_circuit.circuit_from_scratch(n_qubit, n_gates, rand_seed=i)[0]
+              for i in range(n_circuits)]
+    names, targs, ctrls, max_len = one_hot.get_symbols_from_qstring_list(q_strs)
+    # all qubits and gates in the vocabulary
+    targs |= set(str(q) for q in range(n_qubit))
+    ctrls |= set(str(q) for q in range(n_qubit))
+    sym_dicts, rev_dicts = one_hot.create_symbol_dictionary([names, targs, ctrls])
+    return q_strs, sym_dicts, rev_dicts, one_hot.get_unary_string(sym_dicts)
+
+@benchmark(n_qubit=QUBITS, n_gates=GATES)
+def to_one_hot(n_qubit, n_gates):
+    from digicircs import one_hot
+    q_strs, sym_dicts, rev_dicts, unary = _dataset(n_qubit, n_gates)
+    return lambda: one_hot.to_one_hot(q_strs[0], n_gates, sym_dicts, unary)
+
+@benchmark(n_qubit=QUBITS[:2], n_gates=GATES[:3], batch=BATCHES)
+def to_multi_hot(n_qubit, n_gates, batch):
+    from digicircs import multi_hot
+    q_strs, sym_dicts, rev_dicts, unary = _dataset(n_qubit, n_gates, batch)
+    def run():
+        for q_str in q_strs:
+            multi_hot.to_multi_hot(q_str, n_gates, sym_dicts, unary)
+    return run
+
+@benchmark(n_qubit=QUBITS, n_gates=GATES)
+def from_multi_hot(n_qubit, n_gates):
+    from digicircs import multi_hot
+    q_strs, sym_dicts, rev_dicts, unary = _dataset(n_qubit, n_gates)
+    mhe = numpy.array(multi_hot.to_multi_hot(q_strs[0], n_gates, sym_dicts, unary)[1])
+    return lambda: multi_hot.from_multi_hot(mhe, rev_dicts)
+
+@benchmark(n_qubit=QUBITS, n_gates=GATES)
+def decoder(n_qubit, n_gates):
+    from digicircs import decoder
+    q_strs = _dataset(n_qubit, n_gates)[0]
+    return lambda: decoder.decoder(q_strs[0])
+
+@benchmark(n_qubit=QUBITS, n_gates=GATES[:3])
+def encoder(n_qubit, n_gates):
+    from digicircs import decoder, encoder
+    circuit = decoder.decoder(_dataset(n_qubit, n_gates)[0][0])
+    return lambda: encoder.encoder(circuit)
+
+@benchmark(n_qubit=QUBITS, n_moments=[1, 10, 100])
+def gen_circuit_topology(n_qubit, n_moments):
+    from digicircs import gen_circuit
+    return lambda: gen_circuit.gen_circuit_topology(n_qubit, n_moments)
+
+@benchmark(n_qubit=QUBITS, n_gates=GATES)
+def circuit_from_scratch(n_qubit, n_gates):
+    from digicircs import gen_circuit
+    return lambda: gen_circuit.circuit_from_scratch(n_qubit, n_gates)
+
+@benchmark(n_qubit=QUBITS, n_gates=GATES[:3], batch=BATCHES)
+def add_noise_to_mhe(n_qubit, n_gates, batch):
+    from digicircs import multi_hot
+    n_feat = 16 + 2 * n_qubit
+    mhe = numpy.zeros((batch, n_gates, n_feat))
+    return lambda: multi_hot.add_noise_to_mhe(mhe, 0.9)
+
+@benchmark(n_qubit=QUBITS, n_gates=GATES)
+def compute_nmoments_from_qstr(n_qubit, n_gates):
+    from digicircs.utils import circ_utils
+    q_strs = _dataset(n_qubit, n_gates)[0]
+    return lambda: circ_utils.compute_nmoments_from_qstr(q_strs[0])
+
+def time_callable(func, min_time: float = 0.2, repeat: int = 3):
+    '''
+    Time a callable: the number of loops is increased until one repetition
+    takes at least ``min_time``. Returns per-call times of all repetitions.
+    '''
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time or number >= 1e6:
+            break
+        number *= max(2, min(10, int(min_time / max(elapsed, 1e-9)) + 1))
+    times = [elapsed / number]
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - t0) / number)
+    return times, number
+
+def run(names: list = None, quick: bool = False, min_time: float = 0.2,
+        repeat: int = 3):
+    results = {}
+    for name, (func, sweep) in BENCHMARKS.items():
+        if names and not any(k in name for k in names):
+            continue
+        keys = list(sweep)
+        values = [sweep[k][:2] if quick else sweep[k] for k in keys]
+        for combo in itertools.product(*values):
+            params = dict(zip(keys, combo))
+            label = name + "[" + ",".join("{}={}".format(k, v) for k, v in params.items()) + "]"
+            try:
+                times, number = time_callable(func(**params), min_time, repeat)
+            except ImportError as error:
+                print("{:<60s} skipped ({})".format(label, error))
+                break
+            results[label] = {"benchmark": name, "params": params, "min": min(times),
+                              "median": float(numpy.median(times)), "number": number}
+            print("{:<60s} {:12.3e} s".format(label, min(times)))
+    return results
+
+def _metadata():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"],
+                                         stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        commit = None
+    return {"commit": commit, "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(), "numpy": numpy.__version__,
+            "machine": platform.machine(), "processor": platform.processor()}
+
+def compare(base_file: str, new_file: str, threshold: float = 1.2):
+    '''
+    Print the ratio new/base of the minimum times; returns the number of
+    benchmarks slower than ``threshold``.
+    '''
+    with open(base_file) as reader:
+        base = json.load(reader)["results"]
+    with open(new_file) as reader:
+        new = json.load(reader)["results"]
+    n_slower = 0
+    for label in sorted(set(base) & set(new)):
+        ratio = new[label]["min"] / base[label]["min"]
+        flag = ""
+        if ratio > threshold:
+            flag = "  SLOWER"
+            n_slower += 1
+        elif ratio < 1. / threshold:
+            flag = "  faster"
+        print("{:<60s} {:12.3e} {:12.3e} {:8.2f}x{}".format(
+              label, base[label]["min"], new[label]["min"], ratio, flag))
+    return n_slower
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-o", "--output", help="JSON file to save the results")
+    parser.add_argument("-k", "--filter", nargs="*", help="run benchmarks matching these names")
+    parser.add_argument("--quick", action="store_true", help="only the smallest sweep values")
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"))
+    parser.add_argument("--threshold", type=float, default=1.2)
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(int(compare(*args.compare, threshold=args.threshold) > 0))
+
+    results = run(args.filter, quick=args.quick, min_time=args.min_time,
+                  repeat=args.repeat)
+    if args.output:
+        with open(args.output, "w") as writer:
+            json.dump({"meta": _metadata(), "results": results}, writer, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+
+if os.environ.get("DIGICIRCS_PROFILE"):
+    from digicircs import profiling
+    profiling._enable_from_env()
@@ -0,0 +1,187 @@
+'''
+Length-bucketed minibatches of encoded circuits.
+
+Circuits are grouped into buckets of similar numbers of gates and every
+minibatch is padded only to its own maximum length, instead of the global
+``max_len`` of the dataset. Two kinds of datasets are supported:
+
+    - a list of circuit strings, encoded batch by batch;
+    - a binary dataset: an array (or ``numpy.memmap``) with shape
+      (n_circuits, max_len, 3 or 4) storing the decimal encodings returned
+      by ``one_hot.to_one_hot``, padded with ``nop`` gates.
+'''
+import numpy
+from digicircs import index_encoding
+from digicircs.utils import misc
+
+def get_lengths(dataset, symbol_dictionary: list = None):
+    '''
+    Number of gates of every circuit in the dataset.
+
+    Args:
+        :dataset: a list of circuit strings or a binary dataset.
+    Kwargs:
+        :symbol_dictionary: the symbol dictionaries, needed for binary
+                            datasets to identify the padding gates.
+    Returns:
+        :ndarray: the number of gates of each circuit.
+    '''
+    if isinstance(dataset, numpy.ndarray):
+        nop = symbol_dictionary[0]["nop"]
+        gated = dataset[..., 0] != nop
+        max_len = dataset.shape[1]
+        # position of the last gate that is not padding
+        last = max_len - numpy.argmax(gated[:, ::-1], axis=1)
+        return numpy.where(gated.any(axis=1), last, 0)
+    return numpy.array([misc.get_num_gates_qstring(q) for q in dataset])
+
+def bucket_batches(lengths, batch_size: int, bucket_width: int = 8,
+                   shuffle: bool = True, drop_last: bool = False,
+                   rand_seed: int = None):
+    '''
+    Split the dataset into minibatches of circuits with similar lengths.
+    Circuits with lengths in ``[k*bucket_width, (k+1)*bucket_width)`` share
+    bucket ``k``; batches never mix buckets.
+
+    Args:
+        :lengths: the number of gates of each circuit.
+        :batch_size: maximum number of circuits per batch.
+    Kwargs:
+        :bucket_width: range of lengths grouped into one bucket.
+        :shuffle: if True, shuffle circuits in each bucket and the batch order.
+        :drop_last: if True, drop the incomplete batch of every bucket.
+        :rand_seed: random generator seed, used for test.
+    Returns:
+        :list: A list of arrays with the circuit indices of each batch.
+    '''
+    lengths = numpy.asarray(lengths)
+    rng = numpy.random.default_rng(rand_seed)
+    buckets = lengths // bucket_width
+    if shuffle:
+        order = rng.permutation(len(lengths))
+        order = order[numpy.argsort(buckets[order], kind="stable")]
+    else:
+        order = numpy.argsort(buckets, kind="stable")
+
+    batches = []
+    bounds = numpy.flatnonzero(numpy.diff(buckets[order])) + 1
+    for bucket in numpy.split(order, bounds):
+        for start in range(0, len(bucket), batch_size):
+            batch = bucket[start:start+batch_size]
+            if drop_last and len(batch) < batch_size:
+                continue
+            batches.append(batch)
+    if shuffle:
+        batches = [batches[i] for i in rng.permutation(len(batches))]
+    return batches
+
+def encode_batch(dataset, indices, symbol_dictionary: list,
+                 encoding: str = "multi_hot", encode_params: bool = True,
+                 lengths=None):
+    '''
+    Encode the circuits of one batch, padded to the longest circuit in the batch.
+
+    Args:
+        :dataset: a list of circuit strings or a binary dataset.
+        :indices: indices of the circuits in the batch.
+        :symbol_dictionary: the symbol dictionaries.
+    Kwargs:
+        :encoding: "multi_hot" or "decimal".
+        :encode_params: if True, the parameters are included.
+        :lengths: pre-computed lengths of all circuits in the dataset.
+    Returns:
+        :ndarray: the encoding, shape (batch_size, batch_len, n_features).
+        :ndarray: the attention mask, True for gates and False for padding.
+    '''
+    assert encoding in ["multi_hot", "decimal"], \
+        "Only 'multi_hot' or 'decimal' encodings are supported!"
+    if lengths is None:
+        lengths = get_lengths(dataset, symbol_dictionary)
+    batch_lens = numpy.asarray(lengths)[indices]
+    batch_len = max(int(batch_lens.max(initial=0)), 1)
+    mask = numpy.arange(batch_len)[None, :] < batch_lens[:, None]
+
+    if isinstance(dataset, numpy.ndarray):
+        dec = numpy.asarray(dataset[numpy.sort(indices), :batch_len])
+        dec = dec[numpy.argsort(numpy.argsort(indices))]
+        idx = dec[..., :3].astype(numpy.int16)
+        params = dec[..., 3] if dec.shape[-1] > 3 else None
+    else:
+        idx, params = index_encoding.to_indices([dataset[i] for i in indices],
+                                                symbol_dictionary, max_len=batch_len)
+    if not encode_params:
+        params = None
+
+    if encoding == "decimal":
+        if params is None:
+            return idx.astype(float), mask
+        return numpy.concatenate([idx, params[..., None]], axis=-1).astype(float), mask
+    return index_encoding.indices_to_multi_hot(idx, params, symbol_dictionary,
+                                               dtype=float), mask
+
+def iter_batches(dataset, symbol_dictionary: list, batch_size: int,
+                 encoding: str = "multi_hot",
+                 encode_params: bool = True, bucket_width: int = 8,
+                 shuffle: bool = True, drop_last: bool = False,
+                 rand_seed: int = None):
+    '''
+    Iterate over length-bucketed minibatches of a dataset.
+
+    Args:
+        :dataset: a list of circuit strings or a binary dataset.
+        :symbol_dictionary: the symbol dictionaries.
+        :batch_size: maximum number of circuits per batch.
+    Kwargs:
+        :encoding: "multi_hot" or "decimal".
+        :encode_params: if True, the parameters are included.
+        :bucket_width: range of lengths grouped into one bucket.
+        :shuffle: if True, shuffle circuits in each bucket and the batch order.
+        :drop_last: if True, drop the incomplete batch of every bucket.
+        :rand_seed: random generator seed, used for test.
+    Yields:
+        :ndarray: the encoded batch.
+        :ndarray: the attention mask of the batch.
+        :ndarray: the indices of the circuits in the batch.
+    Examples:
+        >>> for mhe, mask, idx in iter_batches(q_strs, sym_dicts, 32):
+        ...     loss = model(mhe, mask)
+    '''
+    lengths = get_lengths(dataset, symbol_dictionary)
+    for indices in bucket_batches(lengths, batch_size, bucket_width=bucket_width,
+                                  shuffle=shuffle, drop_last=drop_last,
+                                  rand_seed=rand_seed):
+        batch, mask = encode_batch(dataset, indices, symbol_dictionary,
+                                   encoding=encoding, encode_params=encode_params,
+                                   lengths=lengths)
+        yield batch, mask, indices
+
+def save_binary_dataset(file_name: str, q_strings: list, symbol_dictionary: list,
+                        max_len: int = None, encode_params: bool = True):
+    '''
+    Store the decimal encodings of circuit strings as a binary dataset
+    (a ``.npy`` file) that can be memory-mapped with
+    ``numpy.load(file_name, mmap_mode="r")``.
+
+    Args:
+        :file_name: the ``.npy`` file to write.
+        :q_strings: A list of circuit strings.
+        :symbol_dictionary: the symbol dictionaries.
+    Kwargs:
+        :max_len: The maximum number of gates, the longest circuit if not given.
+        :encode_params: if True, the parameters are included.
+    Returns:
+        :ndarray: the memory-mapped dataset.
+    '''
+    if max_len is None:
+        max_len = int(get_lengths(q_strings).max(initial=1))
+    n_feat = 3 + int(encode_params)
+    data = numpy.lib.format.open_memmap(file_name, mode="w+", dtype=numpy.float32,
+                                        shape=(len(q_strings), max_len, n_feat))
+    for i, q_string in enumerate(q_strings):
+        idx, params = index_encoding.to_indices(q_string, symbol_dictionary,
+                                                max_len=max_len)
+        data[i, :, :3] = idx[0]
+        if encode_params:
+            data[i, :, 3] = params[0]
+    data.flush()
+    return data
@@ -9,7 +9,9 @@ Authors:
 import tequila as tq
 import tequila.circuit.gates as tq_g
 import warnings
+import functools
 from digicircs import __config__
+from digicircs.gate_set import get_gate_set
 from digicircs.utils import misc
 import numpy
 import numpy as np
@@ -31,7 +33,11 @@ PGATES_2Q = DEFAULT_GATES["_parameterized_gates_for_2qubit"]
 GATES_1Q = SGATES_1Q + PGATES_1Q
 GATES_2Q = PGATES_2Q + SGATES_2Q
 
-def decoder(q_string:str, fix_params: bool=True, rm_ctrl: bool=True):
+# Cache of preprocessed gate strings
+PREPROCESS_CACHE_SIZE = 65536
+
+def decoder(q_string:str, fix_params: bool=True, rm_ctrl: bool=True,
+            gate_set=None):
     """
     This function converts a string representation into its corresponding
     circuit
@@ -42,6 +48,7 @@ def decoder(q_string:str, fix_params: bool=True, rm_ctrl: bool=True):
         :fix_param: If True - fix the parameters; if False - parameters taken as
                     variables.
         :rm_ctrl: If true, the one qubit gates cannot have control qubits.
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
     Returns:
         :tq.QCircuit: a Tequila circuit object converted from the string.
     Examples:
@@ -62,11 +69,12 @@ def decoder(q_string:str, fix_params: bool=True, rm_ctrl: bool=True):
 
     q_circuit = tq.QCircuit()
     for string in strings:
-        string = gate_preprocess(string, rm_ctrl=rm_ctrl)
+        string = gate_preprocess(string, rm_ctrl=rm_ctrl, gate_set=gate_set)
         q_circuit += convert_string_to_gates(string, fix_params=fix_params)
     return q_circuit
 
-def gate_preprocess(q_string: str, fix_params: bool=True, rm_ctrl:bool=True):
+def gate_preprocess(q_string: str, fix_params: bool=True, rm_ctrl:bool=True,
+                    use_cache: bool=True, gate_set=None):
     """
     To make sure the one-to-one correspondance from string to gates, we consider
     the following exceptions:
@@ -83,17 +91,64 @@ def gate_preprocess(q_string: str, fix_params: bool=True, rm_ctrl:bool=True):
      Parameterized gate but ``P`` not given.     Assign a random value or set as variable.
     ============================================ =========================================
 
+    The results are memoized in a bounded LRU cache keyed by the raw gate
+    string, see ``set_preprocess_cache``. Gates that need a random parameter
+    are not cached unless ``cache_random`` is set.
+
     Args:
         :q_string: A string encoding the gate information.
     Kwargs:
         :fix_params: If true, the parameter must be a number, else can be a string.
         :rm_ctrl: If true, the one qubit gates cannot have control qubits.
+        :use_cache: If true, use the cache of preprocessed gate strings.
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
     Returns:
         :str: The editted string following rules above.
     """
-    # check if the strings are in the default gates.
-    all_gates_list = GATES_1Q + GATES_2Q
+    global _n_uncached
+    gate_set = get_gate_set(gate_set)
+    if use_cache and (_cache_random or not _needs_random_param(q_string, gate_set)):
+        return _gate_preprocess_cached(q_string, fix_params, rm_ctrl, gate_set)
+    _n_uncached += 1
+    return _gate_preprocess(q_string, fix_params, rm_ctrl, gate_set)
+
+def set_preprocess_cache(maxsize: int = PREPROCESS_CACHE_SIZE, cache_random: bool = False):
+    """
+    Resize (and clear) the cache of ``gate_preprocess``.
 
+    Kwargs:
+        :maxsize: maximum number of cached gate strings, None for unbounded.
+        :cache_random: If true, also cache gates whose parameter is filled
+                       randomly, i.e. the same random value is reused.
+    """
+    global _gate_preprocess_cached, _cache_random, _n_uncached
+    _gate_preprocess_cached = functools.lru_cache(maxsize=maxsize)(_gate_preprocess)
+    _cache_random = cache_random
+    _n_uncached = 0
+
+def preprocess_cache_info():
+    """
+    Statistics of the ``gate_preprocess`` cache.
+
+    Returns:
+        :dict: hits, misses, uncached calls, maxsize and current size.
+    """
+    info = _gate_preprocess_cached.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "uncached": _n_uncached,
+            "maxsize": info.maxsize, "currsize": info.currsize}
+
+def _needs_random_param(q_string: str, gate_set):
+    """
+    Whether a parameterized gate has no parameter, so that ``gate_preprocess``
+    fills it randomly.
+    """
+    return q_string.endswith("=nop") and q_string.split("=", 1)[0] in gate_set.parameterized
+
+def _gate_preprocess(q_string: str, fix_params: bool=True, rm_ctrl:bool=True,
+                     gate_set=None):
+    """
+    Implementation of ``gate_preprocess`` without cache.
+    """
     q_string = list(q_string.split("="))
     # get gate name, target qubit, control qubit, parameters.
     name    = q_string[0]
@@ -101,14 +156,15 @@ def gate_preprocess(q_string: str, fix_params: bool=True, rm_ctrl:bool=True):
     control = q_string[2]
     param   = q_string[3]
 
-    if name not in all_gates_list + ["nop"]:
+    gate_set = get_gate_set(gate_set)
+    if name not in gate_set.all_gates:
         raise Exception("Unknown gate name {} in q_string={}".format(name, q_string))
 
-    if name in SGATES_1Q:
+    if name in gate_set.static_1q:
         if rm_ctrl:
             control = "nop"
         param = "nop"
-    if name in PGATES_1Q:
+    if name in gate_set.param_1q:
         if rm_ctrl:
             control = "nop"
         if param == "nop": # TODO: check if we should turn PGATES into SGATES or assign a random one
@@ -118,14 +174,14 @@ def gate_preprocess(q_string: str, fix_params: bool=True, rm_ctrl:bool=True):
             else:
                 param = misc.random_chars(4)
 
-    if name in SGATES_2Q:
+    if name in gate_set.static_2q:
         if control == "nop" or control == target:
-            name = misc.cast_gate_2q_to_1q(name)
+            name = gate_set.cast_to_1q(name)
             control = "nop"
         param = "nop"
-    if name in PGATES_2Q:
+    if name in gate_set.param_2q:
         if control == "nop" or control ==  target:
-            name = misc.cast_gate_2q_to_1q(name)
+            name = gate_set.cast_to_1q(name)
             control = "nop"
         if param  == "nop":
             if fix_params:
@@ -137,25 +193,29 @@ def gate_preprocess(q_string: str, fix_params: bool=True, rm_ctrl:bool=True):
     g_str = name + "=" + target + "=" + control + "=" + param
     return g_str
 
-def qstring_preprocess(q_string: str, fix_params: bool = True):
+_cache_random = False
+_n_uncached = 0
+_gate_preprocess_cached = functools.lru_cache(maxsize=PREPROCESS_CACHE_SIZE)(_gate_preprocess)
+
+def qstring_preprocess(q_string: str, fix_params: bool = True, gate_set=None):
     '''
     Preprocess a quantum string based on ``gate_preprocess``.
     Args:
         :q_string: A string encoding the quantum circuit.
     Kwargs:
         :fix_params: If true, the parameter must be a number, else can be a string.
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
     Returns:
         :str: The editted string following rules above.
     '''
     strings = misc.break_qstr_to_gstrs(q_string)
-    q_string_edit = ""
+    g_strs_edit = []
     for g_str in strings:
-        g_str_n = gate_preprocess(g_str, fix_params)
-        #print(g_str_n)
+        g_str_n = gate_preprocess(g_str, fix_params, gate_set=gate_set)
         if g_str_n[:3] == "nop":
             g_str_n = ""
-        q_string_edit += g_str_n + "@"
-    return q_string_edit[:-1]
+        g_strs_edit.append(g_str_n)
+    return "@".join(g_strs_edit)
 
 
 def convert_string_to_gates(q_string: str, fix_params: bool = True):
@@ -0,0 +1,150 @@
+'''
+Single-gate edits of circuits in the index encoding.
+
+``neighbours`` enumerates every valid circuit one edit away from a given
+circuit, as a batch of index arrays (see ``index_encoding``):
+
+    - REPLACE: change the gate name, keeping the qubits (a new 2-qubit
+      gate on a 1-qubit gate gets every valid control);
+    - MOVE_TARGET / MOVE_CONTROL: move the target or the control qubit;
+    - INSERT: insert any valid gate at any position;
+    - DELETE: delete a gate.
+
+The validity rules are those of ``decoder.gate_preprocess``, encoded by
+the masks of ``sampling.GrammarMask``: 1-qubit gates have the ``nop``
+control, 2-qubit gates a control different from the target and within
+``max_dist``. Every edit kind is built with one masked ``nonzero`` and one
+gather over the whole batch.
+
+Examples:
+    >>> idx, params, edits = neighbours("H=0=nop=nop@CNOT=1=0=nop", sym_dicts, max_dist=1)
+    >>> q_strs = index_encoding.from_indices(idx, params, rev_dicts)
+'''
+import numpy
+from digicircs import index_encoding
+from digicircs.sampling import GrammarMask
+
+REPLACE, MOVE_TARGET, MOVE_CONTROL, INSERT, DELETE = range(5)
+EDIT_KINDS = ("replace", "move_target", "move_control", "insert", "delete")
+
+def neighbours(circuit, symbol_dictionary: list, gate_set=None, max_dist: int = None,
+               n_qubit: int = None, kinds: tuple = EDIT_KINDS, new_param: float = None,
+               rand_seed=None):
+    '''
+    All valid single-gate edits of a circuit.
+
+    Args:
+        :circuit: a circuit string, or a pair (index array of shape (n_gates, 3),
+                  parameter array of shape (n_gates,)).
+        :symbol_dictionary: the symbol dictionaries of gate names, targets and controls.
+    Kwargs:
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
+        :max_dist: maximum distance between target and control qubits.
+        :n_qubit: number of qubits, all qubits of the vocabulary if not given.
+        :kinds: the kinds of edits to enumerate, a subset of ``EDIT_KINDS``.
+        :new_param: parameter of inserted gates, uniform in [0, 2 pi) if not given.
+        :rand_seed: seed of the parameters of inserted gates.
+    Returns:
+        :ndarray: index arrays, shape (n_edits, n_gates + 1, 3), padded with ``nop``.
+        :ndarray: parameter arrays, shape (n_edits, n_gates + 1); replaced and
+                  moved gates keep their parameter.
+        :ndarray: (kind, position) of every edit, shape (n_edits, 2).
+    '''
+    for kind in kinds:
+        if kind not in EDIT_KINDS:
+            raise ValueError("Unknown edit kind {}".format(kind))
+    grammar = GrammarMask(symbol_dictionary, gate_set=gate_set, n_qubit=n_qubit,
+                          max_dist=max_dist)
+    if isinstance(circuit, str):
+        idx, params = index_encoding.to_indices([circuit], symbol_dictionary)
+        idx, params = idx[0], params[0]
+    else:
+        idx, params = numpy.asarray(circuit[0]), numpy.asarray(circuit[1], dtype=numpy.float32)
+    pad = numpy.array([symbol_dictionary[i].get("nop", 0) for i in range(3)], dtype=idx.dtype)
+    if "nop" in symbol_dictionary[0]:
+        # drop the padding gates
+        real = idx[:, 0] != pad[0]
+        idx, params = idx[real], params[real]
+    n_gates = len(idx)
+    base = numpy.concatenate([idx, pad[None]])
+    base_params = numpy.concatenate([params, numpy.full(1, 0.2, dtype=numpy.float32)])
+    g, t, c = idx[:, 0], idx[:, 1], idx[:, 2]
+    arity = grammar.gate_arity[g]
+
+    batches = []
+    if "replace" in kinds:
+        # (position, new gate, new control)
+        new_arity = grammar.gate_arity[None, :, None]
+        ctrls = numpy.arange(len(grammar.ctrl_nop))[None, None, :]
+        keep_ctrl = ctrls == c[:, None, None]
+        mask = grammar.gate_valid[None, :, None] \
+             & (numpy.arange(len(grammar.gate_valid))[None, :, None] != g[:, None, None]) \
+             & numpy.where(new_arity == 1, grammar.ctrl_nop[None, None, :],
+                           numpy.where((arity == 2)[:, None, None], keep_ctrl,
+                                       grammar.ctrl_2q[t][:, None, :]))
+        # the target must stay valid for the new arity
+        mask &= grammar.targ_by_arity[:, t].T[:, :, None][:, grammar.gate_arity, :]
+        pos, new_g, new_c = numpy.nonzero(mask)
+        triples = numpy.stack([new_g, t[pos], new_c], axis=1)
+        batches.append(_substitute(base, base_params, pos, triples, REPLACE))
+    if "move_target" in kinds:
+        targs = numpy.arange(grammar.targ_by_arity.shape[1])
+        mask = grammar.targ_by_arity[arity] & (targs[None, :] != t[:, None])
+        two = arity == 2
+        mask[two] &= grammar.ctrl_2q[:, c[two]].T
+        pos, new_t = numpy.nonzero(mask)
+        triples = numpy.stack([g[pos], new_t, c[pos]], axis=1)
+        batches.append(_substitute(base, base_params, pos, triples, MOVE_TARGET))
+    if "move_control" in kinds:
+        ctrls = numpy.arange(len(grammar.ctrl_nop))
+        mask = (arity == 2)[:, None] & grammar.ctrl_2q[t] & (ctrls[None, :] != c[:, None])
+        pos, new_c = numpy.nonzero(mask)
+        triples = numpy.stack([g[pos], t[pos], new_c], axis=1)
+        batches.append(_substitute(base, base_params, pos, triples, MOVE_CONTROL))
+    if "insert" in kinds:
+        # every valid (gate, target, control) triple
+        gate_arity = grammar.gate_arity[:, None, None]
+        valid = grammar.gate_valid[:, None, None] \
+              & grammar.targ_by_arity[grammar.gate_arity][:, :, None] \
+              & numpy.where(gate_arity == 2, grammar.ctrl_2q[None], grammar.ctrl_nop[None, None, :])
+        triples = numpy.stack(numpy.nonzero(valid), axis=1)
+        pos = numpy.repeat(numpy.arange(n_gates + 1), len(triples))
+        triples = numpy.tile(triples, (n_gates + 1, 1))
+        rng = numpy.random.default_rng(rand_seed)
+        values = rng.uniform(0, 2 * numpy.pi, len(pos)) if new_param is None \
+                 else numpy.full(len(pos), new_param)
+        src = _shifted_source(pos, n_gates, -1)
+        out = base[src]
+        out_params = base_params[src]
+        rows = numpy.arange(len(pos))
+        out[rows, pos] = triples
+        out_params[rows, pos] = values
+        batches.append((out, out_params, _edit_info(INSERT, pos)))
+    if "delete" in kinds:
+        pos = numpy.arange(n_gates)
+        src = _shifted_source(pos, n_gates, 1)
+        batches.append((base[src], base_params[src], _edit_info(DELETE, pos)))
+
+    if not batches:
+        return (numpy.zeros((0, n_gates + 1, 3), dtype=idx.dtype),
+                numpy.zeros((0, n_gates + 1), dtype=numpy.float32),
+                numpy.zeros((0, 2), dtype=numpy.int64))
+    return tuple(numpy.concatenate(arrays) for arrays in zip(*batches))
+
+def _substitute(base, base_params, pos, triples, kind: int):
+    out = numpy.repeat(base[None], len(pos), axis=0)
+    out[numpy.arange(len(pos)), pos] = triples
+    return out, numpy.repeat(base_params[None], len(pos), axis=0), _edit_info(kind, pos)
+
+def _shifted_source(pos, n_gates: int, shift: int):
+    '''
+    Source position of every output gate when a gate is inserted
+    (shift = -1) or deleted (shift = 1) at ``pos``; the padding gate
+    ``n_gates`` fills the end.
+    '''
+    j = numpy.arange(n_gates + 1)[None, :]
+    src = numpy.where(j < pos[:, None], j, j + shift)
+    return numpy.clip(src, 0, n_gates)
+
+def _edit_info(kind: int, pos):
+    return numpy.stack([numpy.full(len(pos), kind), pos], axis=1)
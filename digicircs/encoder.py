@@ -9,6 +9,7 @@ Authors:
 import tequila as tq
 import numpy as np
 from digicircs import __config__
+from digicircs.gate_set import get_gate_set
 from digicircs.utils import misc
 from tequila.circuit.compiler import Compiler
 
@@ -21,12 +22,14 @@ PGATES_2Q = DEFAULT_GATES["_parameterized_gates_for_2qubit"]
 GATES_1Q = SGATES_1Q + PGATES_1Q
 GATES_2Q = PGATES_2Q + SGATES_2Q
 
-def encoder(circuit :tq.QCircuit):
+def encoder(circuit :tq.QCircuit, gate_set=None):
     """
     This function converts a circuit into a string representation.
     Tequila gate list: <https://aspuru-guzik-group.github.io/tequila/package/circuit/tequila.circuit.gates.html#module-tequila.circuit.gates>
     Args:
         :circuit: a Tequila circuit object.
+    Kwargs:
+        :gate_set: the ``GateSet`` used to cast controlled 1-qubit gates.
     Returns:
         :str: a string representing the circuit.
     Examples:
@@ -41,7 +44,7 @@ def encoder(circuit :tq.QCircuit):
         gates = _break_circuit(circuit)
         q_string = ""
         for gate in gates:
-            q_string += _convert_gates_to_string(gate)
+            q_string += _convert_gates_to_string(gate, gate_set=gate_set)
             q_string += "@"
     except:
         compiler=Compiler(exponential_pauli=True, multicontrol=False,
@@ -55,7 +58,7 @@ def encoder(circuit :tq.QCircuit):
         gates = _break_circuit(circuit)
         q_string = ""
         for gate in gates:
-            q_string += _convert_gates_to_string(gate)
+            q_string += _convert_gates_to_string(gate, gate_set=gate_set)
             q_string += "@"
 
 
@@ -84,7 +87,7 @@ def _break_circuit(circuit :tq.QCircuit):
     except:
         raise Exception("The circuit structure is incompatible")
 
-def _convert_gates_to_string(gate: tq.gates):
+def _convert_gates_to_string(gate: tq.gates, gate_set=None):
     """
     This function returns the string corresponding to a gate in the form
     ``"<name>=<target>=<control>=<parameter>"``, and uses "nop" to denote the
@@ -100,6 +103,8 @@ def _convert_gates_to_string(gate: tq.gates):
 
     Args:
         :gate: A tequila gate object.
+    Kwargs:
+        :gate_set: the ``GateSet`` used to cast controlled 1-qubit gates.
     Returns:
         :str: A string encoding the given gate.
     Examples:
@@ -145,8 +150,9 @@ def _convert_gates_to_string(gate: tq.gates):
         control = list(gate.control)[0]
     except:
         pass
-    if name in GATES_1Q and control != "nop":
-        name = misc.cast_gate_1q_to_2q(name)
+    gate_set = get_gate_set(gate_set)
+    if name in gate_set.one_qubit and control != "nop":
+        name = gate_set.cast_to_2q(name)
     try:
         #for parameterized gate
         param = gate.parameter
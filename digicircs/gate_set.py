@@ -0,0 +1,188 @@
+'''
+Immutable gate sets.
+
+A ``GateSet`` collects the gate names supported by the generators, the
+decoder and the encoder, together with precomputed lookup tables:
+
+    - frozensets for membership checks (static/parameterized, 1q/2q);
+    - integer ids of the gate names (``nop`` included);
+    - cast maps between 1-qubit and controlled 2-qubit gates;
+    - arity and number of parameters of every gate.
+
+``DEFAULT_GATE_SET`` is built from ``__config__._default_gates``. Every
+module accepts a ``gate_set`` argument, so that custom gate sets can be
+used without editing the configuration or reloading the modules.
+
+Examples:
+    >>> gate_set = GateSet(sgates_1q=["H"], sgates_2q=["CNOT"], pgates_1q=["RZ"])
+    >>> q_str = gen_circuit.gen_circuit_gates(n_qubit=4, n_moments=3, gate_set=gate_set)
+'''
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from digicircs import __config__
+
+_PAULIS = ("X", "Y", "Z")
+
+@dataclass(frozen=True)
+class GateSet:
+    '''
+    Gate names grouped by arity and parameterization.
+
+    Kwargs:
+        :sgates_1q: static 1-qubit gates.
+        :sgates_2q: static 2-qubit gates.
+        :pgates_1q: parameterized 1-qubit gates.
+        :pgates_2q: parameterized 2-qubit gates.
+        :cast_2q_to_1q: names of 1-qubit gates replacing 2-qubit gates
+                        without a control qubit. Pauli-pair gates (e.g. XY)
+                        are cast to the rotation of the second Pauli.
+        :cast_1q_to_2q: names of 2-qubit gates replacing controlled 1-qubit gates.
+    '''
+    sgates_1q: tuple = ()
+    sgates_2q: tuple = ()
+    pgates_1q: tuple = ()
+    pgates_2q: tuple = ()
+    cast_2q_to_1q: dict = field(default=None, repr=False, compare=False, hash=False)
+    cast_1q_to_2q: dict = field(default=None, repr=False, compare=False, hash=False)
+
+    # derived tables
+    gates_1q: tuple = field(init=False, repr=False)
+    gates_2q: tuple = field(init=False, repr=False)
+    names: tuple = field(init=False, repr=False)
+    static_1q: frozenset = field(init=False, repr=False, compare=False)
+    static_2q: frozenset = field(init=False, repr=False, compare=False)
+    param_1q: frozenset = field(init=False, repr=False, compare=False)
+    param_2q: frozenset = field(init=False, repr=False, compare=False)
+    static: frozenset = field(init=False, repr=False, compare=False)
+    parameterized: frozenset = field(init=False, repr=False, compare=False)
+    one_qubit: frozenset = field(init=False, repr=False, compare=False)
+    two_qubit: frozenset = field(init=False, repr=False, compare=False)
+    all_gates: frozenset = field(init=False, repr=False, compare=False)
+    gate_ids: dict = field(init=False, repr=False, compare=False, hash=False)
+    _cast_key: tuple = field(init=False, repr=False)
+    _hash: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        _set = lambda name, value: object.__setattr__(self, name, value)
+        for name in ["sgates_1q", "sgates_2q", "pgates_1q", "pgates_2q"]:
+            _set(name, tuple(g.upper() for g in getattr(self, name)))
+        # same ordering as the module-level lists
+        _set("gates_1q", self.sgates_1q + self.pgates_1q)
+        _set("gates_2q", self.pgates_2q + self.sgates_2q)
+        _set("names", self.gates_1q + self.gates_2q)
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("Gate names must be unique: {}".format(self.names))
+        _set("static_1q", frozenset(self.sgates_1q))
+        _set("static_2q", frozenset(self.sgates_2q))
+        _set("param_1q", frozenset(self.pgates_1q))
+        _set("param_2q", frozenset(self.pgates_2q))
+        _set("static", frozenset(self.sgates_1q + self.sgates_2q))
+        _set("parameterized", frozenset(self.pgates_1q + self.pgates_2q))
+        _set("one_qubit", frozenset(self.gates_1q))
+        _set("two_qubit", frozenset(self.gates_2q))
+        _set("all_gates", frozenset(self.names) | {"nop"})
+        _set("gate_ids", MappingProxyType({g: i for i, g in enumerate(self.names + ("nop",))}))
+
+        cast_21 = dict(__config__._cast_2q_to_1q if self.cast_2q_to_1q is None
+                       else self.cast_2q_to_1q)
+        for g in self.gates_2q:
+            if g not in cast_21 and len(g) == 2 and g[0] in _PAULIS and g[1] in _PAULIS:
+                cast_21[g] = "R" + g[1]
+        cast_12 = dict(__config__._cast_1q_to_2q if self.cast_1q_to_2q is None
+                       else self.cast_1q_to_2q)
+        _set("cast_2q_to_1q", MappingProxyType(cast_21))
+        _set("cast_1q_to_2q", MappingProxyType(cast_12))
+        _set("_cast_key", (tuple(sorted(cast_21.items())), tuple(sorted(cast_12.items()))))
+        # used as a cache key, so the hash is computed once
+        _set("_hash", hash((self.names, self.static, self._cast_key)))
+
+    def __hash__(self):
+        return self._hash
+
+    @classmethod
+    def from_config(cls, gates: dict = None, cast_2q_to_1q: dict = None,
+                    cast_1q_to_2q: dict = None):
+        '''
+        Build a gate set from a dictionary with the layout of
+        ``__config__._default_gates``.
+        '''
+        if gates is None:
+            gates = __config__._default_gates
+        return cls(sgates_1q=gates.get("_static_gates_for_1qubit", ()),
+                   sgates_2q=gates.get("_static_gates_for_2qubits", ()),
+                   pgates_1q=gates.get("_parameterized_gates_for_1qubit", ()),
+                   pgates_2q=gates.get("_parameterized_gates_for_2qubit", ()),
+                   cast_2q_to_1q=cast_2q_to_1q, cast_1q_to_2q=cast_1q_to_2q)
+
+    def __reduce__(self):
+        # the mapping proxies cannot be pickled
+        return (GateSet, (self.sgates_1q, self.sgates_2q, self.pgates_1q, self.pgates_2q,
+                          dict(self.cast_2q_to_1q), dict(self.cast_1q_to_2q)))
+
+    def __contains__(self, name: str):
+        return name in self.all_gates
+
+    def __len__(self):
+        return len(self.names)
+
+    def arity(self, name: str):
+        '''
+        Number of qubits acted on by the gate, 0 for ``nop``.
+        '''
+        if name in self.one_qubit:
+            return 1
+        if name in self.two_qubit:
+            return 2
+        if name == "nop":
+            return 0
+        raise ValueError("Unknown gate name {}".format(name))
+
+    def n_params(self, name: str):
+        '''
+        Number of parameters of the gate.
+        '''
+        if name not in self.all_gates:
+            raise ValueError("Unknown gate name {}".format(name))
+        return int(name in self.parameterized)
+
+    def gate_id(self, name: str):
+        return self.gate_ids[name]
+
+    def cast_to_1q(self, name: str):
+        '''
+        Down cast a 2-qubit gate to a 1-qubit gate.
+        '''
+        try:
+            return self.cast_2q_to_1q[name]
+        except KeyError:
+            raise ValueError("Cannot cast the 2-qubit gate {} to 1-qubit gate!".format(name))
+
+    def cast_to_2q(self, name: str):
+        '''
+        Change a controlled 1-qubit gate to the corresponding 2-qubit gate.
+        '''
+        try:
+            return self.cast_1q_to_2q[name]
+        except KeyError:
+            raise ValueError("Cannot cast the 1-qubit gate {} to 2-qubit gate!".format(name))
+
+    def arities(self):
+        '''
+        Arity of every gate, ordered by gate id (``nop`` last).
+        '''
+        return tuple(self.arity(g) for g in self.names + ("nop",))
+
+    def param_counts(self):
+        '''
+        Number of parameters of every gate, ordered by gate id (``nop`` last).
+        '''
+        return tuple(self.n_params(g) for g in self.names + ("nop",))
+
+
+DEFAULT_GATE_SET = GateSet.from_config()
+
+def get_gate_set(gate_set: GateSet = None):
+    '''
+    The given gate set, or ``DEFAULT_GATE_SET`` if None.
+    '''
+    return DEFAULT_GATE_SET if gate_set is None else gate_set
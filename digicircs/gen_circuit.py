@@ -13,8 +13,8 @@ Authors:
 import numpy
 import random
 import warnings
-import copy
 from digicircs import __config__
+from digicircs.gate_set import get_gate_set
 from digicircs.utils import misc
 
 # Default gates (Static and Parameterized)
@@ -29,7 +29,7 @@ GATES_2Q = PGATES_2Q + SGATES_2Q
 def gen_circuit_topology(n_qubit: int, n_moments: int,
                          weights: list=[0.2, 0.6, 0.2],
                          local_rot_moment: bool=False, max_dist: int=None,
-                         rand_seed: int=None, **kwargs):
+                         rand_seed: int=None, coupling=None, **kwargs):
     '''
     Generate an arbitrary but valid circuit topology for given number
     of qubits and moments. For each moment, two types of gates are included:
@@ -37,6 +37,9 @@ def gen_circuit_topology(n_qubit: int, n_moments: int,
         - 1-qubit gates  (identity not included)
         - 2-qubit gates
 
+    If a coupling graph is given, the 2-qubit gates only act on its edges,
+    see ``gen_coupled_moments``.
+
     Args:
         :n_qubit: number of qubits in the circuit
         :n_moments: number of moments in the circuit
@@ -44,6 +47,7 @@ def gen_circuit_topology(n_qubit: int, n_moments: int,
         :weights: weights to generate the three types of gates
         :local_rot_layer: whether to have an initial moment of local rotations.
         :max_dist: maximun distance between target and control qubits.
+        :coupling: the coupling graph of the device, see ``coupling_edges``.
     Returns:
         :list: A list of moments
         :n_1q: Number of 1-qubit gates
@@ -64,8 +68,13 @@ def gen_circuit_topology(n_qubit: int, n_moments: int,
     	circuit_moments.append(moment)
     	n_moments -= 1
 
-    for i in range(n_moments):
-        moment = _gen_circuit_topo_one_moment(n_qubit, weights, max_dist=max_dist, rand_seed=rand_seed)
+    if coupling is not None:
+        moments = gen_coupled_moments(n_qubit, n_moments, coupling, weights=weights,
+                                      max_dist=max_dist, rand_seed=rand_seed)
+    else:
+        moments = (_gen_circuit_topo_one_moment(n_qubit, weights, max_dist=max_dist,
+                                                rand_seed=rand_seed) for i in range(n_moments))
+    for moment in moments:
         circuit_moments.append(moment)
         n_1q += len(moment[0])
         n_2q += len(moment[1])//2
@@ -74,7 +83,8 @@ def gen_circuit_topology(n_qubit: int, n_moments: int,
 
 
 def _gen_circuit_topo_one_moment(n_qubit: int, weights: list=[0.2, 0.6, 0.2],
-                                 max_dist: int=None, rand_seed:int=None, **kwargs):
+                                 max_dist: int=None, rand_seed:int=None, coupling=None,
+                                 **kwargs):
     '''
     Generate one moment of gates for given number of qubits.
 
@@ -83,6 +93,7 @@ def _gen_circuit_topo_one_moment(n_qubit: int, weights: list=[0.2, 0.6, 0.2],
     Kwargs:
         :weights: weights to generate the three types of gates: identity, 1-qubit gates and 2-qubit gates.
         :max_dist: the maximum distance for 2-qubit gates.
+        :coupling: the coupling graph of the device, see ``coupling_edges``.
     Returns:
         :list: A list representing one moment of gates with the following format:
 
@@ -92,6 +103,9 @@ def _gen_circuit_topo_one_moment(n_qubit: int, weights: list=[0.2, 0.6, 0.2],
          Note that the order of the last list is
          [target1, control1, target2, control2, ..]
     '''
+    if coupling is not None:
+        return gen_coupled_moments(n_qubit, 1, coupling, weights=weights,
+                                   max_dist=max_dist, rand_seed=rand_seed)[0]
 
     if max_dist == None:
         max_dist = n_qubit
@@ -114,18 +128,163 @@ def _gen_circuit_topo_one_moment(n_qubit: int, weights: list=[0.2, 0.6, 0.2],
                                                    qubit_targ=qubit_targ,
                                                    max_dist=max_dist,
                                                    rand_seed=rand_seed)
-                moment[1].append(qubit_targ)
-                moment[1].append(qubit_ctrl)
+                if qubit_ctrl is None: # no free qubit within max_dist
+                    gate = 1
+                else:
+                    moment[1].append(qubit_targ)
+                    moment[1].append(qubit_ctrl)
         if gate == 1: # do not use elif or else because above the gate could be changed
             moment[0].append(qubit_targ)
 
     return moment
 
+def gen_coupled_moments(n_qubit: int, n_moments: int, coupling,
+                        weights: list=[0.2, 0.6, 0.2], max_dist: int=None,
+                        rand_seed=None):
+    '''
+    Generate moments whose 2-qubit gates act on the edges of a coupling graph,
+    so the circuits run on the device without SWAP routing.
+
+    Every qubit of every moment draws an identity, a 1-qubit gate or a
+    2-qubit gate with the probabilities ``weights[0] : weights[1] : 2 weights[2]``
+    (a 2-qubit gate takes two qubits). The 2-qubit gates of all moments are
+    a random maximal matching of the edges between the qubits that drew a
+    2-qubit gate, computed at once with ``random_matching`` on the disjoint
+    union of the moments; the qubits left without a partner get a 1-qubit gate.
+
+    Args:
+        :n_qubit: number of qubits in the circuit.
+        :n_moments: number of moments in the circuit.
+        :coupling: the coupling graph of the device, see ``coupling_edges``.
+    Kwargs:
+        :weights: weights of the identity, 1-qubit gates and 2-qubit gates.
+        :max_dist: maximum distance between target and control qubits.
+        :rand_seed: seed or ``numpy.random.Generator``.
+    Returns:
+        :list: A list of moments, in the format of ``_gen_circuit_topo_one_moment``.
+    Examples:
+        >>> moments = gen_coupled_moments(6, 2, grid_coupling(2, 3), rand_seed=0)
+    '''
+    rng = numpy.random.default_rng(rand_seed)
+    edges = coupling_edges(coupling, n_qubit=n_qubit, max_dist=max_dist)
+    probs = numpy.array([weights[0], weights[1], 2 * weights[2]], dtype=float)
+    kinds = rng.choice(3, size=(n_moments, n_qubit), p=probs / probs.sum())
+
+    # edges between two qubits drawing a 2-qubit gate, offset by moment
+    want_2q = kinds == 2
+    m_idx, e_idx = numpy.nonzero(want_2q[:, edges[:, 0]] & want_2q[:, edges[:, 1]])
+    pairs = edges[e_idx] + (m_idx * n_qubit)[:, None]
+    pairs = pairs[random_matching(pairs, n_moments * n_qubit, rand_seed=rng)]
+    # random target/control orientation
+    flip = rng.random(len(pairs)) < 0.5
+    pairs[flip] = pairs[flip, ::-1]
+
+    kinds[want_2q] = 1
+    is_1q = (kinds == 1).ravel()
+    is_1q[pairs.ravel()] = False
+    is_1q = is_1q.reshape(n_moments, n_qubit)
+    # the pairs are sorted by moment
+    bounds = numpy.searchsorted(pairs[:, 0] // n_qubit, numpy.arange(n_moments + 1))
+    moments = []
+    for m in range(n_moments):
+        moment_pairs = pairs[bounds[m]:bounds[m+1]] - m * n_qubit
+        moments.append([numpy.nonzero(is_1q[m])[0].tolist(), moment_pairs.ravel().tolist()])
+    return moments
+
+def random_matching(edges, n_vertex: int, rand_seed=None):
+    '''
+    Random maximal matching of a graph.
+
+    The edges are ranked in a random order and every round keeps, in
+    parallel, the edges ranked first at both of their ends, then drops the
+    edges touching a matched vertex. The result is the greedy matching of
+    the random order, in a few rounds of array operations.
+
+    Args:
+        :edges: (n_edges, 2) array of vertex pairs.
+        :n_vertex: number of vertices.
+    Kwargs:
+        :rand_seed: seed or ``numpy.random.Generator``.
+    Returns:
+        :ndarray: boolean mask of the matched edges, shape (n_edges,).
+    '''
+    rng = numpy.random.default_rng(rand_seed)
+    edges = numpy.asarray(edges, dtype=int).reshape(-1, 2)
+    n_edges = len(edges)
+    rank = rng.permutation(n_edges)
+    matched = numpy.zeros(n_edges, dtype=bool)
+    alive = numpy.nonzero(edges[:, 0] != edges[:, 1])[0]
+    while len(alive) > 0:
+        ends, r = edges[alive], rank[alive]
+        first = numpy.full(n_vertex, n_edges)
+        numpy.minimum.at(first, ends[:, 0], r)
+        numpy.minimum.at(first, ends[:, 1], r)
+        win = (first[ends[:, 0]] == r) & (first[ends[:, 1]] == r)
+        matched[alive[win]] = True
+        used = numpy.zeros(n_vertex, dtype=bool)
+        used[ends[win].ravel()] = True
+        alive = alive[~(used[ends[:, 0]] | used[ends[:, 1]])]
+    return matched
+
+def coupling_edges(coupling, n_qubit: int=None, max_dist: int=None):
+    '''
+    Undirected edges of a coupling graph.
+
+    Args:
+        :coupling: the coupling graph, as neighbour lists (a list of lists, or a
+                   2D array padded with -1) or as a CSR adjacency (a tuple
+                   (indptr, indices) or a ``scipy.sparse`` matrix).
+    Kwargs:
+        :n_qubit: only keep the edges between the first n_qubit qubits.
+        :max_dist: only keep the edges with ``|q0 - q1| <= max_dist``.
+    Returns:
+        :ndarray: (n_edges, 2) array of the sorted pairs q0 < q1.
+    Examples:
+        >>> coupling_edges([[1], [0, 2], [1]])
+            array([[0, 1],
+                   [1, 2]])
+    '''
+    if hasattr(coupling, "tocsr"):
+        coupling = coupling.tocsr()
+        coupling = (coupling.indptr, coupling.indices)
+    if isinstance(coupling, tuple):
+        indptr, cols = numpy.asarray(coupling[0]), numpy.asarray(coupling[1], dtype=int)
+        rows = numpy.repeat(numpy.arange(len(indptr) - 1), numpy.diff(indptr))
+    elif isinstance(coupling, numpy.ndarray) and coupling.ndim == 2:
+        rows, pos = numpy.nonzero(coupling >= 0)
+        cols = coupling[rows, pos].astype(int)
+    else:
+        lens = [len(nbrs) for nbrs in coupling]
+        rows = numpy.repeat(numpy.arange(len(coupling)), lens)
+        cols = numpy.array([q for nbrs in coupling for q in nbrs], dtype=int)
+
+    edges = numpy.sort(numpy.stack([rows, cols], axis=1), axis=1)
+    keep = (edges[:, 0] >= 0) & (edges[:, 0] != edges[:, 1])
+    if n_qubit is not None:
+        keep &= edges[:, 1] < n_qubit
+    if max_dist is not None:
+        keep &= edges[:, 1] - edges[:, 0] <= max_dist
+    return numpy.unique(edges[keep], axis=0).reshape(-1, 2)
+
+def grid_coupling(n_rows: int, n_cols: int):
+    '''
+    Neighbour array of a square grid, the qubit ``i * n_cols + j`` at row i
+    and column j.
+
+    Returns:
+        :ndarray: (n_rows * n_cols, 4) array of neighbours, padded with -1.
+    '''
+    i, j = numpy.divmod(numpy.arange(n_rows * n_cols), n_cols)
+    nbrs = numpy.stack([i - 1, i + 1, i, i], axis=1) * n_cols \
+         + numpy.stack([j, j, j - 1, j + 1], axis=1)
+    valid = numpy.stack([i > 0, i < n_rows - 1, j > 0, j < n_cols - 1], axis=1)
+    return numpy.where(valid, nbrs, -1)
+
 def gen_circuit_gates(topo_lst: list=None, gate_pool: dict=None,
                       rand_seed: int=None, n_qubit: int=None,
                       n_moments: int=None, weights: list=[0.2, 0.4, 0.4],
                       local_rot_moment: bool=False,
-                      max_dist: int=None, **kwargs):
+                      max_dist: int=None, gate_set=None, coupling=None, **kwargs):
     '''
     Fill the gates randomly given a certain multi-moment circuit topology.
 
@@ -139,6 +298,8 @@ def gen_circuit_gates(topo_lst: list=None, gate_pool: dict=None,
         :rand_seed: the seed for random generator, do not give it value otherwise not random.
         :n_qubit: number of qubits in the circuit
         :n_moments: number of moments in the circuit
+        :gate_set: the ``GateSet`` used for the lists missing in ``gate_pool``.
+        :coupling: the coupling graph of the device, see ``coupling_edges``.
     Returns:
         :str: A string representing the gates in the circuit.
     Examples:
@@ -153,24 +314,26 @@ def gen_circuit_gates(topo_lst: list=None, gate_pool: dict=None,
         topo_lst = gen_circuit_topology(n_qubit=n_qubit, n_moments=n_moments,
                                         weights=weights,
                                         local_rot_moment=local_rot_moment,
-                                        max_dist=max_dist, rand_seed=rand_seed)[0]
+                                        max_dist=max_dist, rand_seed=rand_seed,
+                                        coupling=coupling)[0]
 
+    gate_set = get_gate_set(gate_set)
     try:
         sgates_1q = gate_pool["sgates_1q"]
     except:
-        sgates_1q = SGATES_1Q
+        sgates_1q = list(gate_set.sgates_1q)
     try:
         pgates_1q = gate_pool["pgates_1q"]
     except:
-        pgates_1q = PGATES_1Q
+        pgates_1q = list(gate_set.pgates_1q)
     try:
         sgates_2q = gate_pool["sgates_2q"]
     except:
-        sgates_2q = SGATES_2Q
+        sgates_2q = list(gate_set.sgates_2q)
     try:
         pgates_2q = gate_pool["pgates_2q"]
     except:
-        pgates_2q = PGATES_2Q
+        pgates_2q = list(gate_set.pgates_2q)
 
     # start generating circuits
     q_string = ""
@@ -187,7 +350,8 @@ def gen_circuit_gates(topo_lst: list=None, gate_pool: dict=None,
 
 def gen_gates_one_moment(topo_lst: list, sgates_1q: list=None,
                          pgates_1q: list=None, sgates_2q: list=None,
-                         pgates_2q: list=None, rand_seed: int=None, **kwargs):
+                         pgates_2q: list=None, rand_seed: int=None,
+                         gate_set=None, **kwargs):
     '''
     Fill the gates randomly given a certain single-moment circuit topology.
     current list of gates supported:
@@ -206,6 +370,7 @@ def gen_gates_one_moment(topo_lst: list, sgates_1q: list=None,
         :sgates_2q: list of symbols of static 2-qubit gates.
         :pgates_2q: list of symbols of parametrized 2-qubit gates.
         :rand_seed: the seed for random generator, do not give it value otherwise not random.
+        :gate_set: the ``GateSet`` used for the lists not given.
     Returns:
         :str: A string representing the gates in this circuit moment.
     Examples:
@@ -214,17 +379,18 @@ def gen_gates_one_moment(topo_lst: list, sgates_1q: list=None,
         >>> print(moment_str)
             X=0=nop=nop@CRZ=2=1=nop
     '''
+    gate_set = get_gate_set(gate_set)
     if sgates_1q is None:
-        sgates_1q = SGATES_1Q
+        sgates_1q = gate_set.sgates_1q
     if pgates_1q is None:
-        pgates_1q = PGATES_1Q
+        pgates_1q = gate_set.pgates_1q
     if sgates_2q is None:
-        sgates_2q = SGATES_2Q
+        sgates_2q = gate_set.sgates_2q
     if pgates_2q is None:
-        pgates_2q = PGATES_2Q
+        pgates_2q = gate_set.pgates_2q
 
-    sym_gates_1q = sgates_1q + pgates_1q
-    sym_gates_2q = sgates_2q + pgates_2q
+    sym_gates_1q = list(sgates_1q) + list(pgates_1q)
+    sym_gates_2q = list(sgates_2q) + list(pgates_2q)
 
     moment_str = ""
     # 1-qubit gates
@@ -252,7 +418,7 @@ def gen_circuit_gates_fixed_n_params(topo_lst: list, ngates_1q2q: list, n_params
                                      strategy: str='random',
                                      rand_seed: int=None,
                                      local_rot_moment: bool=False,
-                                     **kwargs):
+                                     gate_set=None, **kwargs):
     r'''
     Fill the gates randomly given a certain multi-moment circuit topology
     and a fixed number of parameters (and corresponding gates) to allocate.
@@ -275,6 +441,7 @@ def gen_circuit_gates_fixed_n_params(topo_lst: list, ngates_1q2q: list, n_params
 
         :rand_seed: the seed for random generator, do not give it value otherwise not random.
         :local_rot_layer: whether to have an initial moment of local rotations
+        :gate_set: the ``GateSet`` used for the lists not given.
     Returns:
         :str: A string representing the gates in the circuit.
     Examples:
@@ -287,14 +454,15 @@ def gen_circuit_gates_fixed_n_params(topo_lst: list, ngates_1q2q: list, n_params
         n_params = numpy.sum(ngates_1q2q)
         warnings.warn("Number of parameterized gates must be <= number of gates in topology.")
         #raise ValueError('Number of parameterized gates must be <= number of gates in topology.')
+    gate_set = get_gate_set(gate_set)
     if sgates_1q is None:
-        sgates_1q = SGATES_1Q
+        sgates_1q = gate_set.sgates_1q
     if sgates_2q is None:
-        sgates_2q = SGATES_2Q
+        sgates_2q = gate_set.sgates_2q
     if pgates_1q is None:
-        pgates_1q = PGATES_1Q
+        pgates_1q = gate_set.pgates_1q
     if pgates_2q is None:
-        pgates_2q = PGATES_2Q
+        pgates_2q = gate_set.pgates_2q
 
     # Numbers of parameterized gates to allocate
     n_p1q = int(weights_1q2q[0]*n_params)
@@ -365,7 +533,7 @@ def gen_gates_one_moment_fixed_n_params(n_params_1q: int,
                                         pgates_1q: list = None, pgates_2q: list = None,
                                         rand_seed: int = None,
                                         local_rot_moment: bool = False,
-                                        **kwargs):
+                                        gate_set=None, **kwargs):
     '''
     Fill the gates randomly given a certain single-moment circuit topology.
     current list of gates supported:
@@ -385,27 +553,24 @@ def gen_gates_one_moment_fixed_n_params(n_params_1q: int,
         :pgates_2q: list of symbols of parameterized 2-qubit gates.
         :rand_seed: the seed for random generator, do not give it value otherwise not random.
         :local_rot_layer: whether to have an initial moment of local rotations
+        :gate_set: the ``GateSet`` used for the lists not given.
     Returns:
         :str: A string representing the gates in this circuit moment.
     '''
+    gate_set = get_gate_set(gate_set)
     if sgates_1q is None:
-        sgates_1q = SGATES_1Q
+        sgates_1q = gate_set.sgates_1q
     if sgates_2q is None:
-        sgates_2q = SGATES_2Q
+        sgates_2q = gate_set.sgates_2q
     if pgates_1q is None:
-        pgates_1q = PGATES_1Q
+        pgates_1q = gate_set.pgates_1q
     if pgates_2q is None:
-        pgates_2q = PGATES_2Q
+        pgates_2q = gate_set.pgates_2q
 
     if local_rot_moment:
-    	try:
-    		sgates_1q.remove('Z')
-    	except:
-    		pass
-    	try:
-    		pgates_1q.remove('RZ')
-    	except:
-    		pass
+        # filtered copies, the input lists are not modified
+        sgates_1q = [g for g in sgates_1q if g != 'Z']
+        pgates_1q = [g for g in pgates_1q if g != 'RZ']
 
     moment_str = ""
     # 1-qubit gates
@@ -440,7 +605,7 @@ def gen_gates_one_moment_fixed_n_params(n_params_1q: int,
 def add_params(q_string: str, pgates_1q: list = None,
                pgates_2q: list = None, rand_seed: int = None,
                params: list = None, fix_params: bool = True,
-               return_nparam: bool = False, **kwargs):
+               return_nparam: bool = False, gate_set=None, **kwargs):
     '''
     Add random parameters to the gates.
 
@@ -453,6 +618,7 @@ def add_params(q_string: str, pgates_1q: list = None,
         :params: list of pre-computed parameters, default is None.
         :fix_params: if True, the parameters are fixed as numbers, otherwise as variables.
         :return_nparam: return the number of parameters.
+        :gate_set: the ``GateSet`` used for the lists not given.
     Returns:
         :str: A string of the same circuit but with random parameters for each gates.
         :int: number of parameters.
@@ -465,12 +631,12 @@ def add_params(q_string: str, pgates_1q: list = None,
             1
 
     '''
+    gate_set = get_gate_set(gate_set)
     if pgates_1q is None:
-        pgates_1q = PGATES_1Q
+        pgates_1q = gate_set.pgates_1q
     if pgates_2q is None:
-        pgates_2q = PGATES_2Q
-    pgates = pgates_1q + pgates_2q
-    pgates = [x.lower() for x in pgates]
+        pgates_2q = gate_set.pgates_2q
+    pgates = frozenset(x.lower() for x in list(pgates_1q) + list(pgates_2q))
 
     # TODO: check about the range of parameters.
     gates = list(q_string.split("@"))
@@ -503,7 +669,7 @@ def add_params(q_string: str, pgates_1q: list = None,
 def circuit_from_scratch(n_qubit: int, n_gates: int=None, min_ngates: int=5,
                          max_ngates: int=100, weights: list=[0.5, 0.5],
                          max_dist: int=None, rand_seed: int=None,
-                         fix_params: bool=True, **kwargs):
+                         fix_params: bool=True, gate_set=None, coupling=None, **kwargs):
     '''
     Generate a totally random circuit from scratch given the number of qubits.
 
@@ -517,6 +683,9 @@ def circuit_from_scratch(n_qubit: int, n_gates: int=None, min_ngates: int=5,
         :max_dist: maximun distance between target and control qubits.
         :rand_seed: random generator seed, used for test, do not assign value!
         :fix_params: if True, the generate a specific number for the parameters.
+        :gate_set: the ``GateSet`` to draw the gates from.
+        :coupling: the coupling graph of the device, see ``coupling_edges``;
+                   the 2-qubit gates only act on its edges.
     Returns:
         :str: a string containing the gates with order.
         :num_params: number of parameters
@@ -529,6 +698,7 @@ def circuit_from_scratch(n_qubit: int, n_gates: int=None, min_ngates: int=5,
     # for test-only
     random.seed(rand_seed)
     numpy.random.seed(rand_seed)
+    gate_set = get_gate_set(gate_set)
 
     if n_gates is None:
         n_gates = numpy.random.randint(min_ngates, max_ngates)
@@ -541,6 +711,17 @@ def circuit_from_scratch(n_qubit: int, n_gates: int=None, min_ngates: int=5,
     n_1q_gates = int(n_gates * weights[0])
     n_2q_gates = n_gates - n_1q_gates
     qubit_lst = list(range(n_qubit))
+    # control candidates of every target qubit
+    if coupling is None:
+        coupling = [qubit_lst[:q] + qubit_lst[q+1:] for q in qubit_lst]
+    edges = coupling_edges(coupling, n_qubit=n_qubit, max_dist=max_dist)
+    neighbours = [[] for q in qubit_lst]
+    for q0, q1 in edges.tolist():
+        neighbours[q0].append(q1)
+        neighbours[q1].append(q0)
+    targ_lst = [q for q in qubit_lst if neighbours[q]]
+    if n_2q_gates > 0 and not targ_lst:
+        raise ValueError("No pair of qubits can host a 2-qubit gate!")
 
     gate_strs = []
 
@@ -550,9 +731,9 @@ def circuit_from_scratch(n_qubit: int, n_gates: int=None, min_ngates: int=5,
 
     num_params = 0
     for i in range(n_1q_gates):
-        _gate = random.choice(GATES_1Q)
+        _gate = random.choice(gate_set.gates_1q)
         _targ = random.choice(qubit_lst)
-        if _gate in PGATES_1Q:
+        if _gate in gate_set.param_1q:
             if fix_params:
                 gstr = _gate + "=" + str(_targ) + "=nop=" + "{:1.4f}".format(params_1q[i])
             else:
@@ -564,20 +745,10 @@ def circuit_from_scratch(n_qubit: int, n_gates: int=None, min_ngates: int=5,
         gate_strs.append(gstr)
 
     for i in range(n_2q_gates):
-        _gate = random.choice(GATES_2Q)
-        _targ = random.choice(qubit_lst)
-
-        # get ctrl qubit
-        if max_dist is None:
-            min_idx = 0
-            max_idx = n_qubit - 2 # remove the target qubit
-        else:
-            min_idx = min(_targ - max_dist, 0)
-            max_idx = max(_targ + max_dist, n_qubit - 1) - 1 # removed this qubit
-        temp_lst = copy.copy(qubit_lst)
-        temp_lst.remove(_targ)
-        _ctrl = random.choice(temp_lst[min_idx:max_idx])
-        if _gate in PGATES_2Q:
+        _gate = random.choice(gate_set.gates_2q)
+        _targ = random.choice(targ_lst)
+        _ctrl = random.choice(neighbours[_targ])
+        if _gate in gate_set.param_2q:
             if fix_params:
                 gstr = _gate + "=" + str(_targ) + "=" + str(_ctrl) + "=%1.4f"%params_2q[i]
             else:
@@ -641,20 +812,17 @@ def _random_elem_from_lst(lst: list, qubit_targ: int=None,
         :param qubit_targ: the target qubit, only for 2-qubit gates
         :param max_dist: maximum distance of target and control qubits
     Returns:
-        :int: the element int the list selected.
+        :int: the element int the list selected, None if no element is
+              within max_dist of the target.
     '''
-    # TODO: add random seed
-    l_lst = len(lst)
     if qubit_targ is None or max_dist is None:
-        random.seed(rand_seed)
-        elem = random.choice(lst)
-    elif max_dist >= l_lst:
-        random.seed(rand_seed)
-        elem = random.choice(lst)
+        lst_ctrl = lst
     else:
         lst_ctrl = [el for el in lst if abs(el - qubit_targ) <= max_dist]
-        random.seed(rand_seed)
-        elem = random.choice(lst_ctrl)
+    if lst_ctrl == []:
+        return None
+    random.seed(rand_seed)
+    elem = random.choice(lst_ctrl)
 
     lst.remove(elem)
     return elem
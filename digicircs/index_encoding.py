@@ -0,0 +1,228 @@
+'''
+Compact index encoding of quantum circuits.
+
+Instead of three one-hot vectors per gate, every gate is stored as the
+indices of its gate name, target and control in the symbol dictionaries:
+
+    index array    : int16,   shape (n_circuits, max_len, 3)
+    parameter array: float32, shape (n_circuits, max_len)
+
+The dense one-hot and multi-hot encodings are expanded on demand with
+NumPy or ``torch.nn.functional.one_hot``.
+'''
+import numpy
+import torch
+import torch.nn.functional as F
+
+def to_indices(q_strings: list, symbol_dictionary: list, max_len: int = None,
+               dtype=numpy.int16):
+    '''
+    Convert circuit strings into index and parameter arrays, padded with
+    ``nop`` gates to ``max_len``.
+
+    Args:
+        :q_strings: A list of circuit strings.
+        :symbol_dictionary: A list of dictionaries with the keys as (gate symbols,
+                            control and target values) and values as unique integer values
+    Kwargs:
+        :max_len: The maximum number of gates, the longest circuit if not given.
+        :dtype: integer type of the index array.
+    Returns:
+        :ndarray: index array, shape (n_circuits, max_len, 3).
+        :ndarray: parameter array, shape (n_circuits, max_len).
+    Examples:
+        >>> sym_dicts = [{'H': 0, 'RX': 1, 'nop': 2}, {'0': 0, '1': 1}, {'nop': 0, '0': 1}]
+        >>> idx, params = to_indices(["H=0=nop=nop@RX=1=0=0.1"], sym_dicts)
+        >>> print(idx[0], params[0])
+            [[0 0 0]
+             [1 1 1]] [0.2 0.1]
+    '''
+    if isinstance(q_strings, str):
+        q_strings = [q_strings]
+    gate_strs = [q_string.split("@") for q_string in q_strings]
+    if max_len is None:
+        max_len = max((len(g) for g in gate_strs), default=0)
+
+    pad = [symbol_dictionary[ind].get("nop", 0) for ind in range(3)]
+    idx = numpy.empty((len(q_strings), max_len, 3), dtype=dtype)
+    idx[...] = pad
+    params = numpy.full((len(q_strings), max_len), 0.2, dtype=numpy.float32)
+    d_gate, d_targ, d_ctrl = symbol_dictionary[:3]
+    for i, g_strs in enumerate(gate_strs):
+        for j, g_str in enumerate(g_strs):
+            g_elems = g_str.split("=")
+            idx[i, j] = (d_gate[g_elems[0]], d_targ[g_elems[1]], d_ctrl[g_elems[2]])
+            try:
+                params[i, j] = float(g_elems[3])
+            except ValueError:
+                pass
+    return idx, params
+
+def from_indices(idx, params=None, reverse_e_dictionary_list: list = None,
+                 encode_params: bool = True):
+    '''
+    Convert index arrays back into circuit strings.
+
+    Args:
+        :idx: index array, shape (max_len, 3) or (n_circuits, max_len, 3).
+        :params: parameter array, shape (max_len,) or (n_circuits, max_len).
+        :reverse_e_dictionary_list: the reverse symbol dictionaries.
+    Kwargs:
+        :encode_params: if True, the parameters are included.
+    Returns:
+        :str or list: a circuit string for a single circuit, else a list of strings.
+    '''
+    if isinstance(idx, torch.Tensor):
+        idx = idx.detach().cpu().numpy()
+    if isinstance(params, torch.Tensor):
+        params = params.detach().cpu().numpy()
+    idx = numpy.asarray(idx)
+    single = idx.ndim == 2
+    if single:
+        idx = idx[None]
+        params = None if params is None else numpy.asarray(params)[None]
+    rev_gate, rev_targ, rev_ctrl = reverse_e_dictionary_list[:3]
+
+    q_strings = []
+    for i in range(idx.shape[0]):
+        gate_strs = []
+        for j, (g, t, c) in enumerate(idx[i].tolist()):
+            g_string = rev_gate[g] + "=" + rev_targ[t] + "=" + rev_ctrl[c] + "="
+            if encode_params:
+                # str of the numpy scalar keeps the shortest float32 repr
+                g_string += str(params[i, j])
+            else:
+                g_string += "nop%d"%j
+            gate_strs.append(g_string)
+        q_strings.append("@".join(gate_strs))
+    return q_strings[0] if single else q_strings
+
+def indices_to_one_hot(idx, symbol_dictionary: list):
+    '''
+    Expand an index array into dense one-hot arrays.
+
+    Args:
+        :idx: index array (numpy or torch), shape (..., 3).
+        :symbol_dictionary: the symbol dictionaries.
+    Returns:
+        :list: the one-hot arrays of gate names, targets and controls.
+    '''
+    sizes = [len(d) for d in symbol_dictionary[:3]]
+    if isinstance(idx, torch.Tensor):
+        return [F.one_hot(idx[..., ind].long(), sizes[ind]) for ind in range(3)]
+    idx = numpy.asarray(idx)
+    return [(idx[..., ind, None] == numpy.arange(sizes[ind])).astype(numpy.int8)
+            for ind in range(3)]
+
+def indices_to_multi_hot(idx, params=None, symbol_dictionary: list = None,
+                         dtype=None):
+    '''
+    Expand index (and parameter) arrays into multi-hot encodings, as
+    returned by ``multi_hot.to_multi_hot``.
+
+    Args:
+        :idx: index array (numpy or torch), shape (..., 3).
+    Kwargs:
+        :params: parameter array, shape (...); not encoded if None.
+        :symbol_dictionary: the symbol dictionaries.
+        :dtype: data type of the output.
+    Returns:
+        :ndarray or tensor: the multi-hot encoding, shape (..., n_features).
+    '''
+    sizes = [len(d) for d in symbol_dictionary[:3]]
+    offsets = numpy.cumsum([0] + sizes[:2])
+    n_feat = sum(sizes) + int(params is not None)
+    if isinstance(idx, torch.Tensor):
+        dtype = torch.float32 if dtype is None else dtype
+        mhe = torch.zeros(idx.shape[:-1] + (n_feat,), dtype=dtype, device=idx.device)
+        cols = idx.long() + torch.as_tensor(offsets, device=idx.device)
+        mhe.scatter_(-1, cols, 1)
+        if params is not None:
+            mhe[..., -1] = params
+        return mhe
+    dtype = numpy.float32 if dtype is None else dtype
+    idx = numpy.asarray(idx)
+    mhe = numpy.zeros(idx.shape[:-1] + (n_feat,), dtype=dtype)
+    numpy.put_along_axis(mhe, idx.astype(numpy.intp) + offsets, 1, axis=-1)
+    if params is not None:
+        mhe[..., -1] = params
+    return mhe
+
+def multi_hot_to_indices(mhe, symbol_dictionary: list, encode_params: bool = True):
+    '''
+    Recover index and parameter arrays from (noisy) multi-hot encodings by
+    taking the argmax of every segment.
+
+    Args:
+        :mhe: the multi-hot encoding (numpy or torch), shape (..., n_features).
+        :symbol_dictionary: the symbol dictionaries (or reverse dictionaries).
+    Kwargs:
+        :encode_params: if True, the last feature is the parameter.
+    Returns:
+        :ndarray or tensor: index array, shape (..., 3).
+        :ndarray or tensor: parameter array, None if ``encode_params`` is False.
+    '''
+    sizes = [len(d) for d in symbol_dictionary[:3]]
+    bounds = numpy.cumsum([0] + sizes)
+    if isinstance(mhe, torch.Tensor):
+        idx = torch.stack([mhe[..., bounds[k]:bounds[k+1]].argmax(-1)
+                           for k in range(3)], dim=-1)
+    else:
+        mhe = numpy.asarray(mhe)
+        idx = numpy.stack([mhe[..., bounds[k]:bounds[k+1]].argmax(-1)
+                           for k in range(3)], axis=-1)
+    params = mhe[..., -1] if encode_params else None
+    return idx, params
+
+def symbol_index_maps(symbol_dictionary: list, new_symbol_dictionary: list):
+    '''
+    Lookup tables from the values of ``symbol_dictionary`` to the values of
+    ``new_symbol_dictionary``, which must contain all the old symbols.
+
+    Args:
+        :symbol_dictionary: the old symbol dictionaries.
+        :new_symbol_dictionary: the new symbol dictionaries.
+    Returns:
+        :list: three integer arrays, old value -> new value.
+    '''
+    maps = []
+    for old_dict, new_dict in zip(symbol_dictionary[:3], new_symbol_dictionary[:3]):
+        table = numpy.empty(len(old_dict), dtype=numpy.intp)
+        for key, i in old_dict.items():
+            try:
+                table[i] = new_dict[key]
+            except KeyError:
+                raise ValueError("Symbol {} is missing in the new dictionary!".format(key))
+        maps.append(table)
+    return maps
+
+def remap_indices(idx, symbol_dictionary: list, new_symbol_dictionary: list,
+                  out=None):
+    '''
+    Convert an index array (or the first three columns of a decimal
+    encoding) to new symbol dictionaries. For dictionaries extended with
+    ``one_hot.extend_symbol_dictionary`` the indices do not change.
+
+    Args:
+        :idx: index array (numpy or torch), shape (..., 3) or (..., 4).
+        :symbol_dictionary: the old symbol dictionaries.
+        :new_symbol_dictionary: the new symbol dictionaries.
+    Kwargs:
+        :out: array to write to, can be ``idx`` itself (in place).
+    Returns:
+        :ndarray or tensor: the remapped index array.
+    '''
+    maps = symbol_index_maps(symbol_dictionary, new_symbol_dictionary)
+    if out is None:
+        out = idx.clone() if isinstance(idx, torch.Tensor) else numpy.array(idx)
+    elif out is not idx:
+        out[...] = idx
+    for ind, table in enumerate(maps):
+        if numpy.array_equal(table, numpy.arange(len(table))):
+            continue
+        if isinstance(idx, torch.Tensor):
+            table = torch.as_tensor(table, device=idx.device)
+            out[..., ind] = table[idx[..., ind].long()].to(out.dtype)
+        else:
+            out[..., ind] = table[numpy.asarray(idx[..., ind]).astype(numpy.intp)]
+    return out
@@ -0,0 +1,176 @@
+'''
+Expressibility and entangling capability of parameterized circuits.
+
+Both descriptors (Sim, Johnson and Aspuru-Guzik, 2019) are estimated from
+states with uniformly random parameters in [0, 2 pi). The parameter
+samples are drawn as one array and simulated as a stacked batch of
+states (see ``simulator.simulate``), ``batch_size`` samples at a time.
+
+    - expressibility: KL divergence between the distribution of the
+      fidelities of pairs of random states and the Haar distribution
+      ``(d - 1)(1 - F)^(d - 2)``, estimated with a histogram; lower is
+      more expressive.
+    - entangling capability: mean Meyer-Wallach measure
+      ``2 (1 - sum_k Tr(rho_k^2) / n)`` of the random states.
+
+``evaluate_circuits`` computes the descriptors of many circuits in a
+process pool.
+
+Examples:
+    >>> q_str = gen_circuit.gen_circuit_gates(n_qubit=4, n_moments=4, rand_seed=0)
+    >>> expressibility(q_str, n_samples=5000, rand_seed=1)
+    >>> entangling_capability(q_str, n_samples=2000, rand_seed=1)
+'''
+import inspect
+import numpy
+from concurrent.futures import ProcessPoolExecutor
+from digicircs import simulator
+
+def expressibility(q_string: str, n_samples: int = 5000, n_bins: int = 75,
+                   rand_seed=None, batch_size: int = 1024, rm_ctrl: bool = True,
+                   gate_set=None):
+    '''
+    Expressibility of a parameterized circuit.
+
+    Args:
+        :q_string: A string encoding a quantum circuit.
+    Kwargs:
+        :n_samples: number of pairs of random states.
+        :n_bins: number of bins of the fidelity histogram.
+        :rand_seed: seed or ``numpy.random.Generator``.
+        :batch_size: number of pairs simulated at once.
+        :rm_ctrl: If true, the one qubit gates cannot have control qubits.
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
+    Returns:
+        :float: the KL divergence from the Haar fidelity distribution.
+    '''
+    rng = numpy.random.default_rng(rand_seed)
+    n_qubit, n_params = _circuit_size(q_string, rm_ctrl, gate_set)
+    counts = numpy.zeros(n_bins, dtype=numpy.int64)
+    for n_batch in _batches(n_samples, batch_size):
+        params = rng.uniform(0, 2 * numpy.pi, size=(2 * n_batch, n_params))
+        states = simulator.simulate(q_string, n_qubit=n_qubit, params=params,
+                                    rm_ctrl=rm_ctrl, gate_set=gate_set)
+        counts += fidelity_histogram(states[:n_batch], states[n_batch:], n_bins)
+    return kl_divergence(counts / n_samples, haar_fidelity_bins(n_qubit, n_bins))
+
+def entangling_capability(q_string: str, n_samples: int = 2000, rand_seed=None,
+                          batch_size: int = 1024, rm_ctrl: bool = True, gate_set=None):
+    '''
+    Entangling capability (mean Meyer-Wallach measure) of a parameterized circuit.
+
+    Args:
+        :q_string: A string encoding a quantum circuit.
+    Kwargs:
+        :n_samples: number of random states.
+        :rand_seed: seed or ``numpy.random.Generator``.
+        :batch_size: number of states simulated at once.
+        :rm_ctrl: If true, the one qubit gates cannot have control qubits.
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
+    Returns:
+        :float: the entangling capability, between 0 and 1.
+    '''
+    rng = numpy.random.default_rng(rand_seed)
+    n_qubit, n_params = _circuit_size(q_string, rm_ctrl, gate_set)
+    total = 0.
+    for n_batch in _batches(n_samples, batch_size):
+        params = rng.uniform(0, 2 * numpy.pi, size=(n_batch, n_params))
+        states = simulator.simulate(q_string, n_qubit=n_qubit, params=params,
+                                    rm_ctrl=rm_ctrl, gate_set=gate_set)
+        total += meyer_wallach(states, n_qubit).sum()
+    return total / n_samples
+
+def evaluate_circuits(q_strings: list, metrics: tuple = ("expressibility", "entangling_capability"),
+                      n_workers: int = None, rand_seed=None, **kwargs):
+    '''
+    Descriptors of many circuits, computed in a process pool.
+
+    Args:
+        :q_strings: list of circuit strings.
+    Kwargs:
+        :metrics: names of the descriptors, functions of this module.
+        :n_workers: number of processes, the number of CPUs if None and
+                    no pool if 1.
+        :rand_seed: seed of the independent random streams of the circuits.
+        :kwargs: passed to the descriptor functions.
+    Returns:
+        :dict: an array of values over the circuits for every descriptor.
+    '''
+    for name in metrics:
+        if name not in _METRICS:
+            raise ValueError("Unknown metric {}".format(name))
+    accepted = set()
+    for name in metrics:
+        accepted.update(inspect.signature(_METRICS[name]).parameters)
+    unknown = sorted(set(kwargs) - accepted)
+    if unknown:
+        raise TypeError("No metric of {} accepts the arguments {}".format(list(metrics), unknown))
+    seeds = numpy.random.SeedSequence(rand_seed).spawn(len(q_strings))
+    tasks = [(q_str, metrics, seed, kwargs) for q_str, seed in zip(q_strings, seeds)]
+    if n_workers == 1:
+        results = [_evaluate_one(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(n_workers) as pool:
+            results = list(pool.map(_evaluate_one, tasks))
+    return {name: numpy.array([r[name] for r in results]) for name in metrics}
+
+def fidelity_histogram(states1, states2, n_bins: int = 75):
+    '''
+    Histogram on [0, 1] of the fidelities ``|<a|b>|^2`` of pairs of states,
+    shape (n_bins,).
+    '''
+    fids = numpy.abs(numpy.einsum("bi,bi->b", states1.conj(), states2))**2
+    bins = numpy.minimum((fids * n_bins).astype(numpy.int64), n_bins - 1)
+    return numpy.bincount(bins, minlength=n_bins)
+
+def haar_fidelity_bins(n_qubit: int, n_bins: int = 75):
+    '''
+    Probabilities of the fidelity bins for Haar random states, integrated
+    exactly over every bin: ``(1 - F_lo)^(d - 1) - (1 - F_hi)^(d - 1)``.
+    '''
+    edges = numpy.linspace(0, 1, n_bins + 1)
+    cdf_c = (1 - edges)**(2**n_qubit - 1)
+    return cdf_c[:-1] - cdf_c[1:]
+
+def kl_divergence(p, q):
+    '''
+    KL divergence of two discrete distributions, the bins with p = 0 omitted.
+    '''
+    p, q = numpy.asarray(p, dtype=float), numpy.asarray(q, dtype=float)
+    mask = p > 0
+    return float(numpy.sum(p[mask] * numpy.log(p[mask] / numpy.maximum(q[mask], 1e-300))))
+
+def meyer_wallach(states, n_qubit: int):
+    '''
+    Meyer-Wallach measure of a batch of states, shape (batch,).
+    '''
+    states = numpy.asarray(states).reshape((-1,) + (2,) * n_qubit)
+    purity = numpy.zeros(states.shape[0])
+    for k in range(n_qubit):
+        m = numpy.moveaxis(states, k + 1, 1).reshape(states.shape[0], 2, -1)
+        rho = numpy.einsum("bir,bjr->bij", m, m.conj())
+        purity += numpy.sum(numpy.abs(rho)**2, axis=(1, 2))
+    return 2 * (1 - purity / n_qubit)
+
+def _circuit_size(q_string: str, rm_ctrl: bool, gate_set):
+    gates, n_qubit = simulator.parse_gates(q_string, rm_ctrl=rm_ctrl, gate_set=gate_set,
+                                           check_params=False)
+    return n_qubit, sum(1 for g in gates if g[3] is not None)
+
+def _batches(n_samples: int, batch_size: int):
+    for start in range(0, n_samples, batch_size):
+        yield min(batch_size, n_samples - start)
+
+def _evaluate_one(task: tuple):
+    q_str, metrics, seed, kwargs = task
+    rng = numpy.random.default_rng(seed)
+    out = {}
+    for name in metrics:
+        func = _METRICS[name]
+        # only the kwargs accepted by the descriptor
+        accepted = inspect.signature(func).parameters
+        out[name] = func(q_str, rand_seed=rng, **{k: v for k, v in kwargs.items() if k in accepted})
+    return out
+
+_METRICS = {"expressibility": expressibility,
+            "entangling_capability": entangling_capability}
@@ -0,0 +1,229 @@
+'''
+Matrix-product-state simulator of circuits represented by strings.
+
+Meant for wide circuits with mostly nearest-neighbour gates, e.g. those
+generated with ``max_dist=1``. Every site tensor has the shape
+(left bond, 2, right bond). 1-qubit gates are applied locally; 2-qubit
+gates on neighbouring sites contract the two tensors, apply the gate and
+split them again with an SVD truncated to ``max_bond`` singular values
+and to a discarded weight below ``cutoff``. Gates on distant qubits first
+move one of the qubits next to the other with SWAPs; the qubits are not
+swapped back, the MPS keeps track of the site of every qubit instead.
+
+The MPS is kept in mixed canonical form around an orthogonality center,
+so that the truncations are optimal and the expectation values of Pauli
+terms only contract the sites between the term and the center.
+``truncation_error`` is the sum of the discarded weights, an estimate of
+the infidelity of the final state.
+
+Examples:
+    >>> state = simulate_mps(q_str, n_qubit=80, max_bond=64)
+    >>> value = state.expectation({((0, "Z"), (1, "Z")): 1.0})
+    >>> print(value, state.truncation_error)
+'''
+import numpy
+from digicircs import simulator, observables
+
+class MPS:
+    '''
+    Matrix-product state of qubits, initialized to ``|0...0>``.
+
+    Args:
+        :n_qubit: number of qubits.
+    Kwargs:
+        :max_bond: maximum bond dimension, unbounded if None.
+        :cutoff: maximum discarded weight of every truncation.
+    '''
+    def __init__(self, n_qubit: int, max_bond: int = None, cutoff: float = 1e-12):
+        self.n_qubit = n_qubit
+        self.max_bond = max_bond
+        self.cutoff = cutoff
+        self.tensors = []
+        for _ in range(n_qubit):
+            t = numpy.zeros((1, 2, 1), dtype=complex)
+            t[0, 0, 0] = 1.
+            self.tensors.append(t)
+        self.center = 0
+        self.truncation_error = 0.
+        self.n_swaps = 0
+        # site of every qubit and qubit of every site
+        self.site = list(range(n_qubit))
+        self.qubit = list(range(n_qubit))
+
+    def bond_dims(self):
+        '''
+        Dimensions of the n_qubit - 1 inner bonds.
+        '''
+        return [t.shape[2] for t in self.tensors[:-1]]
+
+    def apply_gate(self, name: str, targ: int, ctrl: int = -1, theta=None):
+        '''
+        Apply a gate, see ``simulator.gate_matrix`` for the conventions.
+        '''
+        if ctrl < 0:
+            site = self.site[targ]
+            mat = simulator.gate_matrix(name, theta)
+            self.tensors[site] = numpy.einsum("ij,ajb->aib", mat, self.tensors[site])
+            return
+        mat = simulator.gate_matrix(name, theta, controlled=True)
+        # move the control qubit next to the target
+        while abs(self.site[ctrl] - self.site[targ]) > 1:
+            s = self.site[ctrl]
+            self.swap(s, s - 1 if s > self.site[targ] else s + 1)
+        st, sc = self.site[targ], self.site[ctrl]
+        if st > sc:
+            # reorder the matrix from (target, control) to (control, target)
+            mat = mat.reshape(2, 2, 2, 2).transpose(1, 0, 3, 2).reshape(4, 4)
+        self._apply_2site(mat, min(st, sc))
+
+    def swap(self, site1: int, site2: int):
+        '''
+        Swap the qubits of two neighbouring sites.
+        '''
+        self._apply_2site(_SWAP, min(site1, site2))
+        q1, q2 = self.qubit[site1], self.qubit[site2]
+        self.qubit[site1], self.qubit[site2] = q2, q1
+        self.site[q1], self.site[q2] = site2, site1
+        self.n_swaps += 1
+
+    def _apply_2site(self, mat, site: int):
+        '''
+        Apply a 4x4 matrix on sites (site, site + 1) and split the result
+        with a truncated SVD; the center ends on site + 1.
+        '''
+        self.move_center(site)
+        a, b = self.tensors[site], self.tensors[site + 1]
+        theta = numpy.einsum("aib,bjc->aijc", a, b)
+        theta = numpy.einsum("klij,aijc->aklc", mat.reshape(2, 2, 2, 2), theta)
+        chi_l, chi_r = theta.shape[0], theta.shape[3]
+        u, s, vh = numpy.linalg.svd(theta.reshape(chi_l * 2, 2 * chi_r), full_matrices=False)
+        keep = self._n_keep(s)
+        norm = numpy.sum(s**2)
+        self.truncation_error += float(numpy.sum(s[keep:]**2) / norm)
+        s = s[:keep] / numpy.sqrt(numpy.sum(s[:keep]**2))
+        self.tensors[site] = u[:, :keep].reshape(chi_l, 2, keep)
+        self.tensors[site + 1] = (s[:, None] * vh[:keep]).reshape(keep, 2, chi_r)
+        self.center = site + 1
+
+    def _n_keep(self, s):
+        '''
+        Number of singular values kept: the fewest with a discarded weight
+        below the cutoff, at most max_bond.
+        '''
+        weights = s**2 / numpy.sum(s**2)
+        # discarded[k] = weight of s[k:]
+        discarded = numpy.cumsum(weights[::-1])[::-1]
+        keep = int(numpy.count_nonzero(discarded > self.cutoff))
+        keep = max(keep, 1)
+        if self.max_bond is not None:
+            keep = min(keep, self.max_bond)
+        return keep
+
+    def move_center(self, site: int):
+        '''
+        Move the orthogonality center to ``site`` with QR decompositions.
+        '''
+        while self.center < site:
+            c = self.center
+            t = self.tensors[c]
+            q, r = numpy.linalg.qr(t.reshape(-1, t.shape[2]))
+            self.tensors[c] = q.reshape(t.shape[0], 2, -1)
+            self.tensors[c + 1] = numpy.einsum("ab,bjc->ajc", r, self.tensors[c + 1])
+            self.center += 1
+        while self.center > site:
+            c = self.center
+            t = self.tensors[c]
+            q, r = numpy.linalg.qr(t.reshape(t.shape[0], -1).T)
+            self.tensors[c] = q.T.reshape(-1, 2, t.shape[2])
+            self.tensors[c - 1] = numpy.einsum("ajb,cb->ajc", self.tensors[c - 1], r)
+            self.center -= 1
+
+    def pauli_expectation(self, term: tuple):
+        '''
+        Expectation value of one Pauli term, a tuple of (qubit, pauli).
+        '''
+        if not term:
+            return 1.
+        ops = {self.site[q]: simulator.PAULI_MATRICES[p] for q, p in term}
+        first, last = min(ops), max(ops)
+        self.move_center(min(max(self.center, first), last))
+        # the sites outside [first, last] are isometries and contract to identities
+        t = self.tensors[first]
+        env = numpy.eye(t.shape[0], dtype=complex)
+        for site in range(first, last + 1):
+            t = self.tensors[site]
+            op = ops.get(site)
+            t_op = t if op is None else numpy.einsum("ij,ajb->aib", op, t)
+            env = numpy.einsum("ab,aic,bid->cd", env, t.conj(), t_op)
+        return numpy.trace(env).real
+
+    def expectation(self, hamiltonian):
+        '''
+        Expectation value of a Hamiltonian given as Pauli terms, see
+        ``observables.pauli_terms``; a list of values for a list of Hamiltonians.
+        '''
+        many = isinstance(hamiltonian, (list, tuple))
+        hams = [observables.pauli_terms(ham) for ham in (hamiltonian if many else [hamiltonian])]
+        terms = set(term for ham in hams for term in ham)
+        # sorted by first site, so the center sweeps once through the chain
+        values = {term: self.pauli_expectation(term) for term in
+                  sorted(terms, key=lambda t: min((self.site[q] for q, _ in t), default=-1))}
+        out = [sum(coeff * values[term] for term, coeff in ham.items()) for ham in hams]
+        return out if many else out[0]
+
+    def to_statevector(self):
+        '''
+        Dense statevector, with qubit 0 as the most significant bit; only
+        for small numbers of qubits.
+        '''
+        state = self.tensors[0]
+        for t in self.tensors[1:]:
+            state = numpy.tensordot(state, t, axes=([-1], [0]))
+        # axes are sites, reorder them by qubit
+        state = state.reshape((2,) * self.n_qubit)
+        state = state.transpose(self.site)
+        return state.reshape(-1)
+
+
+def simulate_mps(q_string: str, n_qubit: int = None, max_bond: int = None,
+                 cutoff: float = 1e-12, rm_ctrl: bool = True, gate_set=None):
+    '''
+    MPS of a circuit applied to ``|0...0>``.
+
+    Args:
+        :q_string: A string encoding a quantum circuit.
+    Kwargs:
+        :n_qubit: number of qubits, inferred from the gates if not given.
+        :max_bond: maximum bond dimension, unbounded if None.
+        :cutoff: maximum discarded weight of every truncation.
+        :rm_ctrl: If true, the one qubit gates cannot have control qubits.
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
+    Returns:
+        :MPS: the final state.
+    '''
+    gates, n_qubit = simulator.parse_gates(q_string, n_qubit=n_qubit, rm_ctrl=rm_ctrl,
+                                           gate_set=gate_set)
+    state = MPS(n_qubit, max_bond=max_bond, cutoff=cutoff)
+    for name, targ, ctrl, theta in gates:
+        state.apply_gate(name, targ, ctrl, theta)
+    return state
+
+def expectation(q_string: str, hamiltonian, n_qubit: int = None, max_bond: int = None,
+                cutoff: float = 1e-12, rm_ctrl: bool = True, gate_set=None):
+    '''
+    Expectation values of Hamiltonians on the MPS of a circuit.
+
+    Returns:
+        :float or list: the expectation value(s), see ``MPS.expectation``.
+        :float: the truncation error of the simulation.
+    '''
+    if n_qubit is None:
+        hams = hamiltonian if isinstance(hamiltonian, (list, tuple)) else [hamiltonian]
+        n_qubit = max(simulator.parse_gates(q_string, rm_ctrl=rm_ctrl, gate_set=gate_set)[1],
+                      max(observables._n_qubit_terms(observables.pauli_terms(ham))
+                          for ham in hams))
+    state = simulate_mps(q_string, n_qubit=n_qubit, max_bond=max_bond, cutoff=cutoff,
+                         rm_ctrl=rm_ctrl, gate_set=gate_set)
+    return state.expectation(hamiltonian), state.truncation_error
+
+_SWAP = numpy.eye(4, dtype=complex)[[0, 2, 1, 3]]
@@ -12,7 +12,7 @@ Author: Chong Sun <sunchong137@gmail.com>
 import copy
 import numpy
 import torch
-from digicircs import one_hot
+from digicircs import one_hot, index_encoding
 
 def _break_strings(q_string: str):
     return one_hot._break_strings(q_string)
@@ -23,6 +23,9 @@ def get_symbols_from_qstring_list(q_strings: list):
 def create_symbol_dictionary(elements: list):
     return one_hot.create_symbol_dictionary(elements)
 
+def extend_symbol_dictionary(symbol_dictionary_list: list, elements: list):
+    return one_hot.extend_symbol_dictionary(symbol_dictionary_list, elements)
+
 def get_unary_string(symbol_dictionary_list: list):
     return one_hot.get_unary_string(symbol_dictionary_list)
 
@@ -86,30 +89,12 @@ def from_multi_hot(mhe_string: list, reverse_e_dictionary_list: dict,
             H=0=nop=0.3@X=1=nop=0.4@RX=1=0=0.1@XY=0=3=0.2@RY=0=1=0.2
 
     """
-    q_string = ""
-    n_gates = len(reverse_e_dictionary_list[0])
-    n_targets = len(reverse_e_dictionary_list[1])
-    n_controls = len(reverse_e_dictionary_list[2])
-
     if type(mhe_string) is list:
         mhe_string = numpy.array(mhe_string)
-    ct = 0
-    for gate_encoding in mhe_string:
-        ind_g = int(gate_encoding[:n_gates].argmax())
-        ind_t = int(gate_encoding[n_gates: (n_gates+n_targets)].argmax())
-        ind_c = int(gate_encoding[(n_gates+n_targets):(n_gates+n_targets+n_controls)].argmax())
-
-        gate_name = reverse_e_dictionary_list[0][ind_g]
-        targ_q = reverse_e_dictionary_list[1][ind_t]
-        ctrl_q = reverse_e_dictionary_list[2][ind_c]
-        g_string = gate_name + "=" + targ_q + "=" + ctrl_q + "="
-        if encode_params:
-            g_string += str(float(gate_encoding[-1]))
-        else:
-            g_string += "nop%d"%ct
-            ct += 1
-        q_string += g_string + "@"
-    return q_string[:-1]
+    idx, params = index_encoding.multi_hot_to_indices(mhe_string, reverse_e_dictionary_list,
+                                                      encode_params=encode_params)
+    return index_encoding.from_indices(idx, params, reverse_e_dictionary_list,
+                                       encode_params=encode_params)
 
 def add_noise_to_mhe(mhe: list, upper_bound: float, encode_params: bool = True,
                      rand_seed: int = None):
@@ -163,3 +148,46 @@ def remove_noise_mhe(mhe:list, encode_param: bool = True):
     new_mhe[...,-1] = params
 
     return new_mhe
+
+def remap_multi_hot(mhe, symbol_dictionary: list, new_symbol_dictionary: list,
+                    encode_params: bool = True, out=None):
+    '''
+    Convert multi-hot encodings to new symbol dictionaries (e.g. extended
+    with ``extend_symbol_dictionary``) with a single vectorized copy of the
+    columns, without going through the circuit strings.
+
+    Args:
+        :mhe: multi-hot encodings (numpy or torch), shape (..., n_features).
+        :symbol_dictionary: the symbol dictionaries of the encoding.
+        :new_symbol_dictionary: the new symbol dictionaries.
+    Kwargs:
+        :encode_params: if True, the last feature is the parameter.
+        :out: pre-allocated output (e.g. a ``numpy.memmap``) of the new shape.
+    Returns:
+        :ndarray or tensor: the widened multi-hot encodings.
+    Examples:
+        >>> new_dict, new_rev = extend_symbol_dictionary(sym_dict, [{'X'}, {'8', '9'}, {'8', '9'}])
+        >>> mhe_new = remap_multi_hot(mhe, sym_dict, new_dict)
+    '''
+    maps = index_encoding.symbol_index_maps(symbol_dictionary, new_symbol_dictionary)
+    new_sizes = [len(d) for d in new_symbol_dictionary[:3]]
+    offsets = numpy.cumsum([0] + new_sizes[:2])
+    dst = numpy.concatenate([maps[ind] + offsets[ind] for ind in range(3)])
+    n_feat = sum(new_sizes) + int(encode_params)
+    if encode_params:
+        dst = numpy.append(dst, n_feat - 1)
+
+    if isinstance(mhe, torch.Tensor):
+        if out is None:
+            out = torch.zeros(mhe.shape[:-1] + (n_feat,), dtype=mhe.dtype, device=mhe.device)
+        else:
+            out.zero_()
+        out[..., torch.as_tensor(dst, device=mhe.device)] = mhe
+        return out
+    mhe = numpy.asarray(mhe)
+    if out is None:
+        out = numpy.zeros(mhe.shape[:-1] + (n_feat,), dtype=mhe.dtype)
+    else:
+        out[...] = 0
+    out[..., dst] = mhe
+    return out
@@ -0,0 +1,292 @@
+'''
+Expectation values of Pauli observables on circuits represented by strings.
+
+A Hamiltonian is a dictionary of Pauli terms in the OpenFermion layout,
+
+    {((0, "X"), (1, "Y")): 0.5, ((1, "Z"),): -1.2, (): 0.3},
+
+or any object with such a dictionary as ``terms`` (e.g. an OpenFermion
+``QubitOperator``). The terms are grouped into sets of qubit-wise
+commuting strings. Every group is evaluated from a single rotated state:
+the qubits are rotated to the Z basis (``H`` for X, ``S^dag H`` for Y),
+and the expectation of each Z-string is the probability vector contracted
+with the parity signs of the basis states, computed with bit masks.
+Diagonal terms (only Z) use the probabilities of the unrotated state.
+
+Examples:
+    >>> ham = {((0, "Z"), (1, "Z")): 1.0, ((0, "X"),): 0.5}
+    >>> expectation("H=0=nop=nop@CNOT=1=0=nop", ham)
+        1.5
+'''
+import numpy
+from digicircs import simulator
+
+def expectation(circuit, hamiltonian, n_qubit: int = None, params=None,
+                rm_ctrl: bool = True, gate_set=None, use_stabilizer: bool = True):
+    '''
+    Expectation values of Hamiltonians on the states prepared by circuits.
+
+    Args:
+        :circuit: a circuit string or a list of circuit strings.
+        :hamiltonian: a dictionary of Pauli terms (or an object with ``terms``),
+                      or a list of them.
+    Kwargs:
+        :n_qubit: number of qubits, inferred from the circuits and the
+                  Hamiltonians if not given.
+        :params: values of the parameterized gates of a single circuit,
+                 shape (n_params,) or (batch, n_params).
+        :rm_ctrl: If true, the one qubit gates cannot have control qubits.
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
+        :use_stabilizer: if True, Clifford circuits are simulated with
+                         ``stabilizer.Tableau`` instead of statevectors.
+    Returns:
+        :float or ndarray: the expectation values, with a leading axis over
+                           the circuits (or the batch of ``params``) and a
+                           trailing axis over the Hamiltonians when lists
+                           are given.
+    '''
+    many_circuits = not isinstance(circuit, str)
+    many_hams = isinstance(hamiltonian, (list, tuple))
+    circuits = list(circuit) if many_circuits else [circuit]
+    hams = list(hamiltonian) if many_hams else [hamiltonian]
+    if many_circuits and params is not None:
+        raise ValueError("params can only be given with a single circuit!")
+
+    hams = [pauli_terms(ham) for ham in hams]
+    parsed = [simulator.parse_gates(q_str, rm_ctrl=rm_ctrl, gate_set=gate_set,
+                                    check_params=params is None) for q_str in circuits]
+    if n_qubit is None:
+        n_qubit = max(max(n for _, n in parsed), max(_n_qubit_terms(terms) for terms in hams))
+
+    if use_stabilizer and params is None:
+        from digicircs import stabilizer
+        if all(stabilizer.is_clifford(gates) for gates, _ in parsed):
+            values = numpy.array([[tableau.expectation(terms) for terms in hams] for tableau in
+                                  (stabilizer.Tableau.from_gates(gates, n_qubit)
+                                   for gates, _ in parsed)])
+            values = values if many_hams else values[:, 0]
+            return values if many_circuits else values[0]
+
+    if many_circuits:
+        states = simulator.simulate_batch(circuits, n_qubit=n_qubit, rm_ctrl=rm_ctrl,
+                                          gate_set=gate_set)
+    else:
+        states = simulator.simulate(circuits[0], n_qubit=n_qubit, params=params,
+                                    rm_ctrl=rm_ctrl, gate_set=gate_set)
+    batched = states.ndim == 2
+    values = state_expectation(states.reshape(-1, 2**n_qubit), hams, n_qubit)
+    if not many_hams:
+        values = values[..., 0]
+    if not (many_circuits or batched):
+        values = values[0]
+    return values
+
+def local_expectation(q_string: str, hamiltonian, rm_ctrl: bool = True, gate_set=None,
+                      use_stabilizer: bool = True):
+    '''
+    Expectation values of Hamiltonians with few-body terms, every term
+    evaluated on the circuit pruned to its backward light cone (see
+    ``utils.lightcone``). Terms with the same pruned circuit share one
+    simulation, so only the qubits of the cones are ever simulated.
+
+    Args:
+        :q_string: A string encoding a quantum circuit.
+        :hamiltonian: a dictionary of Pauli terms (or an object with ``terms``),
+                      or a list of them.
+    Kwargs:
+        :rm_ctrl: If true, the one qubit gates cannot have control qubits.
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
+        :use_stabilizer: if True, Clifford cones are simulated with ``stabilizer.Tableau``.
+    Returns:
+        :float or ndarray: the expectation value(s), shape (n_hamiltonians,) for a list.
+    '''
+    from digicircs.utils import lightcone, misc
+    parsed = misc.parse_qstring(q_string, rm_ctrl=rm_ctrl, raw_params=True, gate_set=gate_set)
+    many_hams = isinstance(hamiltonian, (list, tuple))
+    hams = [pauli_terms(ham) for ham in (hamiltonian if many_hams else [hamiltonian])]
+    # pruned circuit -> (qubit map, terms)
+    cones = {}
+    for term in set(term for terms in hams for term in terms):
+        if not term:
+            continue
+        pruned, qubit_map = lightcone.prune_parsed(parsed, [q for q, _ in term])
+        key = (pruned, tuple(sorted(qubit_map.items())))
+        cones.setdefault(key, (qubit_map, []))[1].append(term)
+
+    term_values = {(): 1.}
+    for (pruned, _), (qubit_map, terms) in cones.items():
+        local = [lightcone.remap_terms({term: 1.}, qubit_map) for term in terms]
+        values = expectation(pruned or "nop", local, n_qubit=len(qubit_map), rm_ctrl=rm_ctrl,
+                             gate_set=gate_set, use_stabilizer=use_stabilizer)
+        term_values.update(zip(terms, numpy.atleast_1d(values)))
+    values = numpy.array([sum(coeff * term_values[term] for term, coeff in terms.items())
+                          for terms in hams])
+    return values if many_hams else values[0]
+
+def factorized_expectation(q_string: str, hamiltonian, n_qubit: int = None,
+                           rm_ctrl: bool = True, gate_set=None, use_stabilizer: bool = True):
+    '''
+    Expectation values of Hamiltonians on a circuit split into independent
+    sub-circuits (see ``utils.components``). Every term is the product of
+    its restrictions to the components, evaluated on the small registers.
+
+    Args:
+        :q_string: A string encoding a quantum circuit.
+        :hamiltonian: a dictionary of Pauli terms (or an object with ``terms``),
+                      or a list of them.
+    Kwargs:
+        :n_qubit: number of qubits, inferred from the gates and the terms if not given.
+        :rm_ctrl: If true, the one qubit gates cannot have control qubits.
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
+        :use_stabilizer: if True, Clifford components are simulated with ``stabilizer.Tableau``.
+    Returns:
+        :float or ndarray: the expectation value(s), shape (n_hamiltonians,) for a list.
+    '''
+    from digicircs.utils import components
+    many_hams = isinstance(hamiltonian, (list, tuple))
+    hams = [pauli_terms(ham) for ham in (hamiltonian if many_hams else [hamiltonian])]
+    terms = set(term for ham in hams for term in ham)
+    if n_qubit is None:
+        n_qubit = max(simulator.parse_gates(q_string, rm_ctrl=rm_ctrl, gate_set=gate_set)[1],
+                      _n_qubit_terms({t: 1 for t in terms}))
+    parts = components.split_circuit(q_string, n_qubit=n_qubit, rm_ctrl=rm_ctrl,
+                                     gate_set=gate_set)
+    label = numpy.empty(n_qubit, dtype=numpy.int64)
+    local = numpy.empty(n_qubit, dtype=numpy.int64)
+    for i, (_, qubits) in enumerate(parts):
+        label[qubits] = i
+        local[qubits] = numpy.arange(len(qubits))
+
+    # restrictions of the terms to every component
+    sub_terms = {term: {} for term in terms}
+    for term in terms:
+        for q, p in term:
+            sub_terms[term].setdefault(label[q], []).append((local[q], p))
+    values = {}
+    for i, (sub, qubits) in enumerate(parts):
+        local_terms = sorted(set(tuple(st[i]) for st in sub_terms.values() if i in st))
+        if local_terms:
+            vals = expectation(sub or "nop", [{t: 1.} for t in local_terms],
+                               n_qubit=len(qubits), rm_ctrl=rm_ctrl, gate_set=gate_set,
+                               use_stabilizer=use_stabilizer)
+            values.update({(i, t): v for t, v in zip(local_terms, numpy.atleast_1d(vals))})
+    term_values = {term: numpy.prod([values[(i, tuple(st))] for i, st in sub_terms[term].items()])
+                   for term in terms}
+    out = numpy.array([sum(coeff * term_values[term] for term, coeff in ham.items())
+                       for ham in hams])
+    return out if many_hams else out[0]
+
+def state_expectation(states, hamiltonians: list, n_qubit: int):
+    '''
+    Expectation values of Hamiltonians on a batch of statevectors.
+
+    Args:
+        :states: statevectors, shape (batch, 2**n_qubit).
+        :hamiltonians: list of Hamiltonians.
+        :n_qubit: number of qubits.
+    Returns:
+        :ndarray: the expectation values, shape (batch, n_hamiltonians).
+    '''
+    states = numpy.asarray(states).reshape(-1, 2**n_qubit)
+    hams = [pauli_terms(ham) for ham in hamiltonians]
+    # union of the terms of all Hamiltonians, evaluated once
+    columns = {}
+    for terms in hams:
+        for term in terms:
+            columns.setdefault(term, len(columns))
+    is_complex = any(numpy.iscomplexobj(c) for terms in hams for c in terms.values())
+    coeffs = numpy.zeros((len(columns), len(hams)), dtype=complex if is_complex else float)
+    for j, terms in enumerate(hams):
+        for term, coeff in terms.items():
+            coeffs[columns[term], j] += coeff
+
+    term_values = numpy.empty((states.shape[0], len(columns)))
+    probs_z = None
+    for basis, terms in group_qubitwise_commuting(list(columns)):
+        if any(p != "Z" for p in basis.values()):
+            probs = numpy.abs(rotate_to_z(states, basis, n_qubit))**2
+        else:
+            if probs_z is None:
+                probs_z = numpy.abs(states)**2
+            probs = probs_z
+        term_values[:, [columns[t] for t in terms]] = probs @ parity_signs(terms, n_qubit).T
+    return term_values @ coeffs
+
+def pauli_terms(hamiltonian):
+    '''
+    The Pauli terms of a Hamiltonian as a dictionary
+    ``{((qubit, pauli), ...): coeff}`` with qubits in increasing order.
+    '''
+    terms = getattr(hamiltonian, "terms", hamiltonian)
+    out = {}
+    for term, coeff in terms.items():
+        term = tuple(sorted((int(q), p.upper()) for q, p in term))
+        qubits = [q for q, _ in term]
+        if len(set(qubits)) != len(qubits):
+            raise ValueError("Qubit repeated in the Pauli term {}".format(term))
+        if any(p not in "XYZ" for _, p in term):
+            raise ValueError("Unknown Pauli operator in the term {}".format(term))
+        out[term] = out.get(term, 0) + coeff
+    return out
+
+def group_qubitwise_commuting(terms: list):
+    '''
+    Greedy partition of Pauli terms into qubit-wise commuting groups,
+    the terms with most qubits placed first.
+
+    Args:
+        :terms: Pauli terms as tuples of (qubit, pauli).
+    Returns:
+        :list: (basis, terms) pairs, with ``basis`` the Pauli of every
+               qubit measured by the group.
+    '''
+    groups = []
+    for term in sorted(terms, key=len, reverse=True):
+        for basis, members in groups:
+            if all(basis.get(q, p) == p for q, p in term):
+                basis.update(term)
+                members.append(term)
+                break
+        else:
+            groups.append((dict(term), [term]))
+    return groups
+
+def rotate_to_z(states, basis: dict, n_qubit: int):
+    '''
+    Rotate the qubits of a batch of statevectors so that the Pauli of
+    ``basis`` on every qubit becomes Z.
+    '''
+    states = numpy.asarray(states).reshape((-1,) + (2,) * n_qubit)
+    for qubit, pauli in basis.items():
+        if pauli == "Y":
+            states = simulator.apply_matrix(states, _S_DAG, qubit)
+        if pauli != "Z":
+            states = simulator.apply_matrix(states, simulator.STATIC_MATRICES["H"], qubit)
+    return states.reshape(-1, 2**n_qubit)
+
+def parity_signs(terms: list, n_qubit: int):
+    '''
+    Eigenvalues (+1 or -1) of the Z-strings on the same qubits as the
+    terms, for every basis state, shape (n_terms, 2**n_qubit). Qubit ``q``
+    is the bit ``n_qubit - 1 - q`` of the basis state index.
+    '''
+    index = numpy.arange(2**n_qubit, dtype=numpy.int64)
+    signs = numpy.empty((len(terms), 2**n_qubit))
+    for i, term in enumerate(terms):
+        mask = 0
+        for q, _ in term:
+            mask |= 1 << (n_qubit - 1 - q)
+        parity = numpy.zeros(2**n_qubit, dtype=numpy.int64)
+        bits = index & mask
+        while mask:
+            # strip the lowest set bit of the mask at every step
+            low = mask & -mask
+            parity ^= (bits & low) != 0
+            mask ^= low
+        signs[i] = 1 - 2 * parity
+    return signs
+
+def _n_qubit_terms(terms: dict):
+    return max((q + 1 for term in terms for q, _ in term), default=0)
+
+_S_DAG = simulator.STATIC_MATRICES["S"].conj().T
@@ -100,6 +100,82 @@ def create_symbol_dictionary(elements: list):
         reverse_dictionary_list.append(reverse_e_dictionary)
     return symbol_dictionary_list,reverse_dictionary_list
 
+def extend_symbol_dictionary(symbol_dictionary_list: list, elements: list):
+    """
+    Append-only version of ``create_symbol_dictionary``: the symbols already
+    in the dictionaries keep their values, and new symbols get new values at
+    the end of each segment. The decimal (index) encodings stay valid, and
+    the one-hot/multi-hot encodings only need to be widened, see
+    ``remap_one_hot`` and ``multi_hot.remap_multi_hot``.
+
+    Args:
+        :symbol_dictionary_list: the current list of symbol dictionaries.
+        :elements: a list of sets of (possibly new) string values.
+    Returns:
+        :list: the extended dictionaries of symbols to numbers.
+        :list: the extended reverse dictionaries of numbers to symbols.
+    Examples:
+        >>> symbol_dict = [{'H': 0, 'nop': 1}, {'0': 0, '1': 1}, {'nop': 0, '0': 1}]
+        >>> new_dict, rev_dict = extend_symbol_dictionary(symbol_dict, [{'X'}, {'2'}, {'2'}])
+        >>> print(new_dict)
+            [{'H': 0, 'nop': 1, 'X': 2}, {'0': 0, '1': 1, '2': 2}, {'nop': 0, '0': 1, '2': 2}]
+    """
+    elements = [set(element) for element in elements]
+    elements[0].add("nop")
+    elements[-1].add("nop")
+    symbol_dictionary_out = []
+    reverse_dictionary_out = []
+    for ind, element in enumerate(elements):
+        element_dictionary = dict(symbol_dictionary_list[ind]) \
+                             if ind < len(symbol_dictionary_list) else {}
+        # sort the new symbols, qubit indices numerically
+        new_keys = sorted(element - set(element_dictionary), key=_symbol_sort_key)
+        for key in new_keys:
+            element_dictionary[key] = len(element_dictionary)
+        symbol_dictionary_out.append(element_dictionary)
+        reverse_dictionary_out.append({i:key for key,i in element_dictionary.items()})
+    return symbol_dictionary_out, reverse_dictionary_out
+
+def _symbol_sort_key(symbol: str):
+    if symbol.isdigit():
+        return (0, int(symbol), symbol)
+    return (1, 0, symbol)
+
+def remap_one_hot(ohe_string: list, symbol_dictionary: list, new_symbol_dictionary: list):
+    """
+    Convert a one-hot encoding (as returned by ``to_one_hot``) to a new
+    symbol dictionary containing all symbols of the old one, without
+    going through the circuit strings.
+
+    Args:
+        :ohe_string: one hot encoding of the full circuit.
+        :symbol_dictionary: the symbol dictionaries of the encoding.
+        :new_symbol_dictionary: the new symbol dictionaries.
+    Returns:
+        :list: the one hot encoding with the new dictionaries.
+    """
+    maps = []
+    for old_dict, new_dict in zip(symbol_dictionary[:3], new_symbol_dictionary[:3]):
+        table = [0] * len(old_dict)
+        for key, i in old_dict.items():
+            try:
+                table[i] = new_dict[key]
+            except KeyError:
+                raise ValueError("Symbol {} is missing in the new dictionary!".format(key))
+        maps.append(table)
+    sizes = [len(new_dict) for new_dict in new_symbol_dictionary[:3]]
+
+    ohe_out = []
+    for gate_encoding in ohe_string:
+        gate_out = []
+        for ind, element in enumerate(gate_encoding[:3]):
+            temp_u = [0] * sizes[ind]
+            temp_u[maps[ind][element.index(1)]] = 1
+            gate_out.append(temp_u)
+        gate_out += list(gate_encoding[3:])
+        ohe_out.append(gate_out)
+    return ohe_out
+
 def get_unary_string(symbol_dictionary_list: list):
     """
     This function creates a list of all 0s of length equal to the length
@@ -0,0 +1,232 @@
+'''
+Asynchronous generate -> decode -> evaluate -> encode pipeline.
+
+A ``Pipeline`` is a chain of ``Stage`` objects connected by bounded
+``asyncio`` queues. Every stage has its own workers, so that generation,
+evaluation and encoding overlap; when a stage is slow, the queue in front
+of it fills up and the upstream stages wait (backpressure) instead of
+accumulating items in memory.
+
+CPU-heavy stages should use ``executor="process"``; the function (and the
+items) must then be picklable, i.e. defined at the top level of a module.
+
+Examples:
+    >>> def generate(seed):
+    ...     return gen_circuit.gen_circuit_gates(n_qubit=4, n_moments=3, rand_seed=seed)
+    >>> pipe = Pipeline([Stage("generate", generate, executor="process", workers=4),
+    ...                  Stage("evaluate", evaluate, executor="process", workers=4),
+    ...                  Stage("encode", encode)], queue_size=64)
+    >>> results = pipe.run(range(1000))
+    >>> print(pipe.report())
+'''
+import time
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+_STOP = object()
+
+class Stage:
+    '''
+    One step of the pipeline, applying ``func`` to every item.
+    Items for which ``func`` returns None are dropped.
+
+    Args:
+        :name: name of the stage, used in the report.
+        :func: the function applied to every item.
+    Kwargs:
+        :workers: number of items processed concurrently.
+        :executor: "thread", "process" or "inline" (run in the event loop,
+                   for cheap functions or coroutine functions).
+        :queue_size: size of the input queue, the pipeline default if not given.
+    '''
+    def __init__(self, name: str, func, workers: int = 1, executor: str = "thread",
+                 queue_size: int = None):
+        assert executor in ["thread", "process", "inline"], \
+            "Only 'thread', 'process' or 'inline' executors are supported!"
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.executor = executor
+        self.queue_size = queue_size
+        self.stats = {}
+
+    def reset_stats(self):
+        self.stats = {"items_in": 0, "items_out": 0, "busy_time": 0.,
+                      "wait_time": 0., "t_start": None, "t_end": None,
+                      "max_queue": 0}
+
+    def make_executor(self):
+        if self.executor == "thread":
+            return ThreadPoolExecutor(self.workers)
+        if self.executor == "process":
+            return ProcessPoolExecutor(self.workers)
+        return None
+
+    async def apply(self, pool, item):
+        if inspect.iscoroutinefunction(self.func):
+            return await self.func(item)
+        if pool is None:
+            return self.func(item)
+        return await asyncio.get_running_loop().run_in_executor(pool, self.func, item)
+
+
+class Pipeline:
+    '''
+    Chain of stages connected by bounded queues.
+
+    Args:
+        :stages: the list of ``Stage`` objects.
+    Kwargs:
+        :queue_size: default size of the queues between stages.
+    '''
+    def __init__(self, stages: list, queue_size: int = 16):
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.wall_time = 0.
+
+    def run(self, source, sink=None, ordered: bool = True):
+        '''
+        Run the pipeline over all items of ``source``.
+
+        Args:
+            :source: an iterable (or async iterable) of input items.
+        Kwargs:
+            :sink: if given, called with every output item instead of
+                   collecting the outputs.
+            :ordered: if True, the outputs are sorted by input position.
+        Returns:
+            :list: the outputs, None if ``sink`` is given.
+        '''
+        return asyncio.run(self.arun(source, sink=sink, ordered=ordered))
+
+    async def arun(self, source, sink=None, ordered: bool = True):
+        '''
+        Coroutine version of ``run``.
+        '''
+        queues = [asyncio.Queue(maxsize=stage.queue_size or self.queue_size)
+                  for stage in self.stages]
+        out_queue = asyncio.Queue(maxsize=self.queue_size)
+        queues.append(out_queue)
+        pools = [stage.make_executor() for stage in self.stages]
+        for stage in self.stages:
+            stage.reset_stats()
+
+        t0 = time.perf_counter()
+        tasks = [asyncio.create_task(self._feed(source, queues[0]))]
+        for k, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            for _ in range(stage.workers):
+                tasks.append(asyncio.create_task(
+                    self._work(stage, pools[k], queues[k], queues[k+1], remaining)))
+
+        outputs = []
+        consumer = asyncio.create_task(self._collect(out_queue, outputs, sink))
+        try:
+            await asyncio.gather(*tasks, consumer)
+        except BaseException:
+            for task in tasks + [consumer]:
+                task.cancel()
+            await asyncio.gather(*tasks, consumer, return_exceptions=True)
+            raise
+        finally:
+            for pool in pools:
+                if pool is not None:
+                    pool.shutdown(cancel_futures=True)
+            self.wall_time = time.perf_counter() - t0
+
+        if sink is not None:
+            return None
+        if ordered:
+            outputs.sort(key=lambda x: x[0])
+        return [out for _, out in outputs]
+
+    async def _feed(self, source, queue):
+        '''
+        Put the source items, tagged with their positions, into the first queue.
+        '''
+        n_workers = self.stages[0].workers if self.stages else 1
+        pos = 0
+        if hasattr(source, "__aiter__"):
+            async for item in source:
+                await queue.put((pos, item))
+                pos += 1
+        else:
+            for item in source:
+                await queue.put((pos, item))
+                pos += 1
+        for _ in range(n_workers):
+            await queue.put(_STOP)
+
+    async def _work(self, stage, pool, q_in, q_out, remaining):
+        '''
+        One worker of a stage. The last worker to finish stops the next stage.
+        '''
+        stats = stage.stats
+        while True:
+            t_wait = time.perf_counter()
+            stats["max_queue"] = max(stats["max_queue"], q_in.qsize())
+            elem = await q_in.get()
+            if elem is _STOP:
+                break
+            pos, item = elem
+            t_busy = time.perf_counter()
+            stats["wait_time"] += t_busy - t_wait
+            if stats["t_start"] is None:
+                stats["t_start"] = t_busy
+            stats["items_in"] += 1
+            result = await stage.apply(pool, item)
+            stats["busy_time"] += time.perf_counter() - t_busy
+            stats["t_end"] = time.perf_counter()
+            if result is not None:
+                stats["items_out"] += 1
+                await q_out.put((pos, result))
+
+        remaining[0] -= 1
+        if remaining[0] == 0:
+            k = self.stages.index(stage)
+            n_next = self.stages[k+1].workers if k + 1 < len(self.stages) else 1
+            for _ in range(n_next):
+                await q_out.put(_STOP)
+
+    async def _collect(self, queue, outputs, sink):
+        while True:
+            elem = await queue.get()
+            if elem is _STOP:
+                return
+            if sink is None:
+                outputs.append(elem)
+            else:
+                sink(elem[1])
+
+    def throughput(self):
+        '''
+        Per-stage statistics of the last run.
+
+        Returns:
+            :dict: for every stage, the number of items, the busy time summed
+                   over the workers, the time spent waiting for input and the
+                   throughput (items per second of stage activity).
+        '''
+        out = {}
+        for stage in self.stages:
+            stats = dict(stage.stats)
+            t_start, t_end = stats.pop("t_start"), stats.pop("t_end")
+            elapsed = (t_end - t_start) if t_start is not None else 0.
+            stats["throughput"] = stats["items_in"] / elapsed if elapsed > 0 else 0.
+            out[stage.name] = stats
+        return out
+
+    def report(self):
+        '''
+        The per-stage statistics as a text table.
+        '''
+        header = "{:<20s} {:>9s} {:>9s} {:>12s} {:>12s} {:>12s} {:>9s}".format(
+                 "stage", "in", "out", "busy (s)", "wait (s)", "items/s", "max q")
+        lines = [header, "-" * len(header)]
+        for name, stats in self.throughput().items():
+            lines.append("{:<20s} {:>9d} {:>9d} {:>12.4f} {:>12.4f} {:>12.2f} {:>9d}".format(
+                         name, stats["items_in"], stats["items_out"], stats["busy_time"],
+                         stats["wait_time"], stats["throughput"], stats["max_queue"]))
+        lines.append("total wall time: {:.4f} s".format(self.wall_time))
+        return "\n".join(lines)
@@ -0,0 +1,137 @@
+'''
+Prefix-state cache for the re-evaluation of mutated circuits.
+
+Local search and deep dreaming change one gate of a circuit at a time,
+so consecutive circuits share their first gates. ``PrefixEvaluator``
+stores the simulated state every ``checkpoint_every`` gates, keyed by a
+chained hash of the gate prefix (gate names, qubits and parameters). A
+new circuit resumes from the deepest checkpoint of its longest cached
+prefix, and only the remaining gates are simulated. The checkpoints are
+evicted in LRU order when their total size exceeds ``max_bytes``.
+
+Examples:
+    >>> evaluator = PrefixEvaluator(n_qubit=10, checkpoint_every=4, max_bytes=2**28)
+    >>> for q_str in mutations:
+    ...     energy = evaluator.expectation(q_str, hamiltonian)
+    >>> print(evaluator.info())
+'''
+import hashlib
+from collections import OrderedDict
+import numpy
+from digicircs import simulator, observables
+
+class PrefixEvaluator:
+    '''
+    Statevector simulator with checkpoints of gate prefixes.
+
+    Kwargs:
+        :n_qubit: number of qubits of the register, inferred per circuit if not given.
+        :checkpoint_every: number of gates between checkpoints.
+        :max_bytes: memory budget of the checkpoints.
+        :rm_ctrl: If true, the one qubit gates cannot have control qubits.
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
+    '''
+    def __init__(self, n_qubit: int = None, checkpoint_every: int = 4,
+                 max_bytes: int = 2**28, rm_ctrl: bool = True, gate_set=None):
+        assert checkpoint_every > 0, "checkpoint_every must be positive!"
+        self.n_qubit = n_qubit
+        self.checkpoint_every = checkpoint_every
+        self.max_bytes = max_bytes
+        self.rm_ctrl = rm_ctrl
+        self.gate_set = gate_set
+        self._cache = OrderedDict()
+        self.n_bytes = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {"hits": 0, "misses": 0, "gates_simulated": 0, "gates_skipped": 0,
+                      "evictions": 0}
+
+    def state(self, q_string: str):
+        '''
+        Statevector of a circuit, shape (2**n_qubit,).
+        '''
+        gates, n_qubit = simulator.parse_gates(q_string, n_qubit=self.n_qubit,
+                                               rm_ctrl=self.rm_ctrl, gate_set=self.gate_set)
+        keys = self._prefix_keys(gates, n_qubit)
+        # deepest cached checkpoint
+        start, state = 0, None
+        for pos in range(len(keys) - 1, 0, -1):
+            state = self._get(keys[pos])
+            if state is not None:
+                start = pos * self.checkpoint_every
+                break
+        if state is None:
+            self.stats["misses"] += 1
+            state = numpy.zeros((1,) + (2,) * n_qubit, dtype=complex)
+            state[(0,) * (n_qubit + 1)] = 1.
+        else:
+            self.stats["hits"] += 1
+        self.stats["gates_skipped"] += start
+        self.stats["gates_simulated"] += len(gates) - start
+
+        for i in range(start, len(gates)):
+            name, targ, ctrl, theta = gates[i]
+            state = simulator.apply_gate(state, name, targ, ctrl, theta)
+            if (i + 1) % self.checkpoint_every == 0:
+                # apply_gate returns new arrays, the checkpoints are never modified
+                self._put(keys[(i + 1) // self.checkpoint_every], state)
+        if not state.flags.writeable:
+            # the state is a checkpoint, the caller gets its own copy
+            return state.reshape(-1).copy()
+        return state.reshape(-1)
+
+    def expectation(self, q_string: str, hamiltonian):
+        '''
+        Expectation value(s) of Hamiltonians, see ``observables.state_expectation``.
+        '''
+        state = self.state(q_string)
+        n_qubit = int(numpy.log2(len(state)))
+        many = isinstance(hamiltonian, (list, tuple))
+        values = observables.state_expectation(state[None], hamiltonian if many
+                                               else [hamiltonian], n_qubit)[0]
+        return values if many else values[0]
+
+    def info(self):
+        '''
+        Hit rate, fraction of skipped gates, number and size of the checkpoints.
+        '''
+        n_calls = self.stats["hits"] + self.stats["misses"]
+        n_gates = self.stats["gates_simulated"] + self.stats["gates_skipped"]
+        return dict(self.stats, hit_rate=self.stats["hits"] / max(n_calls, 1),
+                    skip_rate=self.stats["gates_skipped"] / max(n_gates, 1),
+                    checkpoints=len(self._cache), bytes=self.n_bytes)
+
+    def clear(self):
+        self._cache.clear()
+        self.n_bytes = 0
+
+    def _prefix_keys(self, gates: list, n_qubit: int):
+        '''
+        Chained hashes of the prefixes at the checkpoints: keys[j] is the
+        key of the first j * checkpoint_every gates.
+        '''
+        h = hashlib.sha1(str(n_qubit).encode())
+        keys = [h.digest()]
+        for i, gate in enumerate(gates):
+            h.update(repr(gate).encode())
+            if (i + 1) % self.checkpoint_every == 0:
+                keys.append(h.digest())
+        return keys
+
+    def _get(self, key: bytes):
+        state = self._cache.get(key)
+        if state is not None:
+            self._cache.move_to_end(key)
+        return state
+
+    def _put(self, key: bytes, state):
+        if key in self._cache or state.nbytes > self.max_bytes:
+            return
+        state.flags.writeable = False
+        self._cache[key] = state
+        self.n_bytes += state.nbytes
+        while self.n_bytes > self.max_bytes:
+            _, old = self._cache.popitem(last=False)
+            self.n_bytes -= old.nbytes
+            self.stats["evictions"] += 1
@@ -0,0 +1,235 @@
+'''
+Opt-in instrumentation of the encode/decode/generate pipeline.
+
+When enabled, every public function of the instrumented modules is wrapped
+to record the number of calls, the wall time, the peak memory allocated
+during the call (if ``track_memory``) and the number of items processed. When disabled the
+original functions are restored, so there is no overhead at all.
+
+Use the context manager
+
+    >>> with profiling.profile() as prof:
+    ...     q_str = gen_circuit.gen_circuit_gates(n_qubit=4, n_moments=3)
+    >>> print(prof.to_table())
+
+or set the environment variable ``DIGICIRCS_PROFILE=1`` to profile a whole
+run; the report is written at exit to ``DIGICIRCS_PROFILE_OUTPUT`` (JSON)
+or printed to stderr.
+
+Note: only calls through the module attributes are recorded, names bound
+with ``from module import function`` before enabling are not wrapped.
+'''
+import os
+import sys
+import json
+import time
+import atexit
+import functools
+import importlib
+import inspect
+import threading
+import tracemalloc
+import warnings
+import numpy
+
+DEFAULT_MODULES = ["digicircs.gen_circuit", "digicircs.decoder", "digicircs.encoder",
+                   "digicircs.one_hot", "digicircs.multi_hot",
+                   "digicircs.utils.circ_utils"]
+
+class Profiler:
+    '''
+    Collected statistics of the instrumented functions.
+    '''
+    def __init__(self):
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, wall_time: float, peak_bytes: int, items: int):
+        with self._lock:
+            entry = self.stats.setdefault(name, {"calls": 0, "wall_time": 0.,
+                                                 "peak_bytes": 0, "items": 0})
+            entry["calls"] += 1
+            entry["wall_time"] += wall_time
+            entry["peak_bytes"] += peak_bytes
+            entry["items"] += items
+
+    def reset(self):
+        with self._lock:
+            self.stats = {}
+
+    def to_json(self, file_name: str = None):
+        '''
+        Export the statistics as JSON, written to ``file_name`` if given.
+        '''
+        out = json.dumps(self.stats, indent=2, sort_keys=True)
+        if file_name is not None:
+            with open(file_name, "w") as writer:
+                writer.write(out)
+        return out
+
+    def to_table(self):
+        '''
+        Export the statistics as a flat text table, sorted by wall time.
+        '''
+        header = "{:<45s} {:>9s} {:>12s} {:>12s} {:>14s} {:>10s}".format(
+                 "function", "calls", "time (s)", "per call", "peak alloc (B)", "items")
+        lines = [header, "-" * len(header)]
+        for name, entry in sorted(self.stats.items(),
+                                  key=lambda x: -x[1]["wall_time"]):
+            lines.append("{:<45s} {:>9d} {:>12.4f} {:>12.2e} {:>14d} {:>10d}".format(
+                         name, entry["calls"], entry["wall_time"],
+                         entry["wall_time"] / entry["calls"],
+                         entry["peak_bytes"], entry["items"]))
+        return "\n".join(lines)
+
+
+_profiler = Profiler()
+_originals = {}
+_track_memory = False
+# True if ``enable`` started tracemalloc, which must then stop it
+_started_tracing = False
+
+def enable(modules: list = None, track_memory: bool = False):
+    '''
+    Wrap the public functions of the modules with the instrumentation.
+
+    Kwargs:
+        :modules: names of the modules to instrument, ``DEFAULT_MODULES`` if not given.
+        :track_memory: if True, record the peak allocated memory with ``tracemalloc``
+                       (the peak of a user tracing session is reset by every call).
+    Returns:
+        :Profiler: the profiler collecting the statistics.
+    '''
+    global _track_memory, _started_tracing
+    _track_memory = track_memory
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracing = True
+    if modules is None:
+        modules = DEFAULT_MODULES
+    for mod_name in modules:
+        try:
+            module = importlib.import_module(mod_name)
+        except ImportError as error:
+            warnings.warn("Cannot instrument {}: {}".format(mod_name, error))
+            continue
+        for name, func in inspect.getmembers(module, inspect.isfunction):
+            key = (mod_name, name)
+            if name.startswith("_") or func.__module__ != mod_name or key in _originals:
+                continue
+            _originals[key] = func
+            setattr(module, name, _instrument(func, mod_name.split(".")[-1] + "." + name))
+    return _profiler
+
+def disable():
+    '''
+    Restore the original functions. The statistics are kept. A tracing
+    session of ``tracemalloc`` started by the user is left running.
+    '''
+    global _started_tracing
+    for (mod_name, name), func in _originals.items():
+        setattr(sys.modules[mod_name], name, func)
+    _originals.clear()
+    if _started_tracing and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _started_tracing = False
+
+def is_enabled():
+    return len(_originals) > 0
+
+def get_profiler():
+    return _profiler
+
+class profile:
+    '''
+    Context manager enabling the instrumentation in its scope.
+
+    Kwargs:
+        :modules: names of the modules to instrument.
+        :track_memory: if True, record the peak allocated memory with ``tracemalloc``.
+        :reset: if True, clear the statistics collected before.
+    '''
+    def __init__(self, modules: list = None, track_memory: bool = False,
+                 reset: bool = True):
+        self.modules = modules
+        self.track_memory = track_memory
+        self.reset = reset
+
+    def __enter__(self):
+        if self.reset:
+            _profiler.reset()
+        return enable(modules=self.modules, track_memory=self.track_memory)
+
+    def __exit__(self, *args):
+        disable()
+        return False
+
+def _count_items(args: tuple):
+    '''
+    Number of items processed by a call: the number of gates for a circuit
+    string, the length for lists and arrays, otherwise 1.
+    '''
+    if not args:
+        return 1
+    arg = args[0]
+    if isinstance(arg, str):
+        return arg.count("@") + 1
+    if isinstance(arg, (list, tuple, numpy.ndarray)):
+        return len(arg)
+    return 1
+
+def _instrument(func, name: str):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _track_memory:
+            mem0 = _enter_peak()
+        t0 = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            wall_time = time.perf_counter() - t0
+            peak = _exit_peak() - mem0 if _track_memory else 0
+            _profiler.record(name, wall_time, peak, _count_items(args))
+    return wrapper
+
+# peak traced memory of the active instrumented calls of every thread
+_peaks = threading.local()
+
+def _enter_peak():
+    '''
+    Reset the peak of ``tracemalloc`` for a new call, keeping the peak seen
+    so far by the enclosing calls. Returns the traced memory at entry.
+    '''
+    stack = _peaks.__dict__.setdefault("stack", [])
+    current, peak = tracemalloc.get_traced_memory()
+    if stack:
+        stack[-1] = max(stack[-1], peak)
+    tracemalloc.reset_peak()
+    stack.append(current)
+    return current
+
+def _exit_peak():
+    '''
+    Peak traced memory of the call, passed on to the enclosing call.
+    '''
+    stack = _peaks.stack
+    peak = max(stack.pop(), tracemalloc.get_traced_memory()[1])
+    if stack:
+        stack[-1] = max(stack[-1], peak)
+    return peak
+
+def _report_at_exit():
+    output = os.environ.get("DIGICIRCS_PROFILE_OUTPUT")
+    if output:
+        _profiler.to_json(output)
+    else:
+        print(_profiler.to_table(), file=sys.stderr)
+
+def _enable_from_env():
+    '''
+    Enable the instrumentation if ``DIGICIRCS_PROFILE`` is set.
+    '''
+    if os.environ.get("DIGICIRCS_PROFILE", "0") not in ["", "0"]:
+        track_memory = os.environ.get("DIGICIRCS_PROFILE_MEMORY", "0") not in ["", "0"]
+        enable(track_memory=track_memory)
+        atexit.register(_report_at_exit)
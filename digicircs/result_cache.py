@@ -0,0 +1,179 @@
+'''
+Persistent cache of circuit properties, keyed by canonical circuit hashes.
+
+The results are pickled into an SQLite file, so the cache survives between
+runs and can be shared by processes. When the cache exceeds ``max_entries``
+or ``max_bytes``, the least recently used entries are evicted.
+
+Examples:
+    >>> cache = ResultCache("results.sqlite", max_bytes=2**30)
+    >>> depth = cached(circ_utils.compute_depth, cache, circuit_input=True)
+    >>> depth("H=0=nop=nop@CNOT=1=0=nop@X=2=nop=nop")   # computed
+    >>> depth("X=2=nop=nop@H=0=nop=nop@CNOT=1=0=nop")   # equivalent circuit, read from the cache
+'''
+import pickle
+import sqlite3
+import threading
+import functools
+from digicircs.utils import canonical
+
+class ResultCache:
+    '''
+    Size-bounded key-value store in an SQLite file.
+
+    Kwargs:
+        :file_name: the SQLite file, ":memory:" for a non-persistent cache.
+        :max_entries: maximum number of entries, unbounded if None.
+        :max_bytes: maximum total size of the pickled values, unbounded if None.
+    '''
+    def __init__(self, file_name: str = ":memory:", max_entries: int = None,
+                 max_bytes: int = None):
+        self.file_name = file_name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(file_name, check_same_thread=False, timeout=60)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, "
+                           "value BLOB, size INTEGER, access INTEGER)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_access ON results (access)")
+        self._conn.commit()
+        self._tick = self._conn.execute("SELECT MAX(access) FROM results").fetchone()[0] or 0
+
+    def get(self, key: str, default=None):
+        '''
+        The value stored under ``key``, ``default`` if missing.
+        '''
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM results WHERE key = ?",
+                                     (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._tick += 1
+            self._conn.execute("UPDATE results SET access = ? WHERE key = ?",
+                               (self._tick, key))
+            self._conn.commit()
+        return pickle.loads(row[0])
+
+    def put(self, key: str, value):
+        '''
+        Store ``value`` under ``key`` and evict old entries if needed.
+        '''
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._tick += 1
+            self._conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                               (key, blob, len(blob), self._tick))
+            self._evict()
+            self._conn.commit()
+
+    def __contains__(self, key: str):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM results WHERE key = ?",
+                                      (key,)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def n_bytes(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def info(self):
+        '''
+        Hits, misses, evictions, number of entries and total size.
+        '''
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self), "bytes": self.n_bytes()}
+
+    def _evict(self):
+        if self.max_entries is not None:
+            n_over = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] \
+                   - self.max_entries
+            if n_over > 0:
+                self._conn.execute("DELETE FROM results WHERE key IN (SELECT key FROM "
+                                   "results ORDER BY access LIMIT ?)", (n_over,))
+                self.evictions += n_over
+        if self.max_bytes is not None:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total > self.max_bytes:
+                keys = []
+                for key, size in self._conn.execute("SELECT key, size FROM results "
+                                                    "ORDER BY access"):
+                    if total <= self.max_bytes:
+                        break
+                    keys.append((key,))
+                    total -= size
+                self._conn.executemany("DELETE FROM results WHERE key = ?", keys)
+                self.evictions += len(keys)
+
+    def __getstate__(self):
+        # the connection is re-opened in other processes
+        state = self.__dict__.copy()
+        del state["_conn"], state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.file_name, check_same_thread=False, timeout=60)
+
+
+def cached(evaluator, cache: ResultCache, name: str = None, circuit_input: bool = False,
+           **canonical_kwargs):
+    '''
+    Wrap a property evaluator of circuit strings with a ``ResultCache``.
+    Equivalent circuits (see ``canonical.canonical_qstring``) share the
+    cached result, so the property must be invariant under the chosen
+    equivalences (e.g. use ``relabel_qubits`` only for properties such as
+    the depth that do not depend on the qubit labels).
+
+    Args:
+        :evaluator: function of a circuit string (or tequila circuit).
+        :cache: the ``ResultCache``.
+    Kwargs:
+        :name: name of the property in the keys, the function name if not given.
+        :circuit_input: if True, the evaluator takes a tequila circuit decoded
+                        from the string, e.g. ``circ_utils.compute_depth``.
+        :canonical_kwargs: passed to ``canonical.canonical_qstring``.
+    Returns:
+        :callable: the cached evaluator, taking a circuit string and the
+                   other arguments of ``evaluator``.
+    '''
+    if name is None:
+        name = getattr(evaluator, "__qualname__", repr(evaluator))
+    # the equivalences are part of the key, wrappers with different ones
+    # can share a cache
+    if canonical_kwargs:
+        name += repr(sorted(canonical_kwargs.items()))
+
+    @functools.wraps(evaluator)
+    def wrapper(q_string: str, *args, **kwargs):
+        key = name + ":" + canonical.circuit_hash(q_string, **canonical_kwargs)
+        if args or kwargs:
+            key += ":" + repr((args, sorted(kwargs.items())))
+        result = cache.get(key, _MISSING)
+        if result is _MISSING:
+            if circuit_input:
+                from digicircs import decoder
+                result = evaluator(decoder.decoder(q_string), *args, **kwargs)
+            else:
+                result = evaluator(q_string, *args, **kwargs)
+            cache.put(key, result)
+        return result
+    return wrapper
+
+_MISSING = object()
@@ -0,0 +1,187 @@
+'''
+Grammar-constrained sampling of circuits from per-position logits.
+
+A generative model outputs, for every gate position, logits over the gate
+names, the target qubits and the control qubits of the symbol
+dictionaries. Sampling them independently often gives invalid gates
+(unknown names, 2-qubit gates without control, control == target, ...).
+Here the three fields are drawn in order, gate -> target -> control, and
+every draw is restricted by validity masks precomputed from the gate set
+and ``max_dist``:
+
+    - gate names must belong to the gate set (``nop`` only if allowed);
+    - 1-qubit gates get the ``nop`` control;
+    - 2-qubit gates get a control qubit different from the target and
+      within ``max_dist`` of it.
+
+The sampled gates are written into index arrays (see ``index_encoding``),
+so every sampled circuit is valid and decodes without repair.
+
+Examples:
+    >>> grammar = GrammarMask(sym_dicts, max_dist=2)
+    >>> idx = sample_indices(gate_logits, targ_logits, ctrl_logits, grammar,
+    ...                      temperature=0.8, top_k=5)
+    >>> q_strs = index_encoding.from_indices(idx, params, rev_dicts)
+'''
+import numpy
+import torch
+from digicircs.gate_set import get_gate_set
+
+class GrammarMask:
+    '''
+    Validity masks of the gates of a vocabulary.
+
+    Args:
+        :symbol_dictionary: the symbol dictionaries of gate names, targets and controls.
+    Kwargs:
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
+        :n_qubit: number of qubits, all qubits of the vocabulary if not given.
+        :max_dist: maximum distance between target and control qubits.
+        :allow_nop: if True, ``nop`` gates (padding) can be sampled.
+    '''
+    def __init__(self, symbol_dictionary: list, gate_set=None, n_qubit: int = None,
+                 max_dist: int = None, allow_nop: bool = False):
+        gate_set = get_gate_set(gate_set)
+        d_gate, d_targ, d_ctrl = symbol_dictionary[:3]
+        if "nop" not in d_ctrl:
+            raise ValueError("The control dictionary has no nop!")
+
+        self.gate_arity = numpy.zeros(len(d_gate), dtype=numpy.int64)
+        self.gate_valid = numpy.zeros(len(d_gate), dtype=bool)
+        for sym, i in d_gate.items():
+            if sym == "nop":
+                self.gate_valid[i] = allow_nop
+            elif sym in gate_set.all_gates:
+                self.gate_arity[i] = gate_set.arity(sym)
+                self.gate_valid[i] = True
+
+        targ_qubits = qubit_values(d_targ)
+        ctrl_qubits = qubit_values(d_ctrl)
+        targ_valid = targ_qubits >= 0
+        ctrl_valid = ctrl_qubits >= 0
+        if n_qubit is not None:
+            targ_valid &= targ_qubits < n_qubit
+            ctrl_valid &= ctrl_qubits < n_qubit
+        # valid (target, control) pairs of 2-qubit gates
+        pairs = targ_valid[:, None] & ctrl_valid[None, :] \
+              & (targ_qubits[:, None] != ctrl_qubits[None, :])
+        if max_dist is not None:
+            pairs &= abs(targ_qubits[:, None] - ctrl_qubits[None, :]) <= max_dist
+        self.ctrl_2q = pairs
+
+        targ_pad = numpy.zeros(len(d_targ), dtype=bool)
+        targ_pad[d_targ.get("nop", 0)] = True
+        # target masks of gates with arity 0 (nop), 1 and 2
+        self.targ_by_arity = numpy.stack([targ_pad, targ_valid, pairs.any(axis=1)])
+        self.ctrl_nop = numpy.zeros(len(d_ctrl), dtype=bool)
+        self.ctrl_nop[d_ctrl["nop"]] = True
+
+        if not targ_valid.any():
+            self.gate_valid[self.gate_arity > 0] = False
+        if not pairs.any():
+            self.gate_valid[self.gate_arity == 2] = False
+        if not self.gate_valid.any():
+            raise ValueError("No valid gate can be sampled with this vocabulary!")
+        self._tensors = {}
+
+    def tensors(self, device):
+        '''
+        The masks as torch tensors on ``device``, cached.
+        '''
+        key = str(device)
+        if key not in self._tensors:
+            self._tensors[key] = {name: torch.as_tensor(getattr(self, name), device=device)
+                                  for name in ["gate_arity", "gate_valid", "targ_by_arity",
+                                               "ctrl_2q", "ctrl_nop"]}
+        return self._tensors[key]
+
+
+def sample_indices(gate_logits, targ_logits, ctrl_logits, grammar: GrammarMask,
+                   temperature: float = 1.0, top_k: int = None, rand_seed=None,
+                   out=None):
+    '''
+    Draw valid gates from per-position logits.
+
+    Args:
+        :gate_logits: logits of the gate names, shape (..., n_gate_symbols).
+        :targ_logits: logits of the target qubits, shape (..., n_target_symbols).
+        :ctrl_logits: logits of the control qubits, shape (..., n_control_symbols).
+        :grammar: the ``GrammarMask`` of the vocabulary.
+    Kwargs:
+        :temperature: sampling temperature, 0 for greedy decoding.
+        :top_k: if given, sample among the k most likely valid symbols.
+        :rand_seed: seed (or ``numpy.random.Generator`` / ``torch.Generator``).
+        :out: index array to write to, shape (..., 3).
+    Returns:
+        :ndarray or tensor: the index array, shape (..., 3).
+    '''
+    if isinstance(gate_logits, torch.Tensor):
+        masks = grammar.tensors(gate_logits.device)
+        if rand_seed is None or isinstance(rand_seed, torch.Generator):
+            gen = rand_seed
+        else:
+            gen = torch.Generator(device=gate_logits.device).manual_seed(rand_seed)
+        draw = lambda logits, valid: _draw_torch(logits, valid, temperature, top_k, gen)
+        g = draw(gate_logits, masks["gate_valid"])
+        arity = masks["gate_arity"][g]
+        t = draw(targ_logits, masks["targ_by_arity"][arity])
+        c_valid = torch.where((arity == 2)[..., None], masks["ctrl_2q"][t], masks["ctrl_nop"])
+        c = draw(ctrl_logits, c_valid)
+        idx = torch.stack([g, t, c], dim=-1)
+        if out is None:
+            return idx
+        out[...] = idx.to(out.dtype)
+        return out
+
+    rng = numpy.random.default_rng(rand_seed)
+    draw = lambda logits, valid: _draw_numpy(logits, valid, temperature, top_k, rng)
+    g = draw(gate_logits, grammar.gate_valid)
+    arity = grammar.gate_arity[g]
+    t = draw(targ_logits, grammar.targ_by_arity[arity])
+    c_valid = numpy.where((arity == 2)[..., None], grammar.ctrl_2q[t], grammar.ctrl_nop)
+    c = draw(ctrl_logits, c_valid)
+    if out is None:
+        out = numpy.empty(g.shape + (3,), dtype=numpy.int16)
+    out[..., 0] = g
+    out[..., 1] = t
+    out[..., 2] = c
+    return out
+
+def _draw_numpy(logits, valid, temperature, top_k, rng):
+    '''
+    Gumbel-max sampling restricted to the valid symbols.
+    '''
+    logits = numpy.asarray(logits, dtype=numpy.float64)
+    if temperature > 0:
+        logits = logits / temperature
+    scores = numpy.where(valid, logits, -numpy.inf)
+    if top_k is not None and top_k < scores.shape[-1]:
+        kth = -numpy.partition(-scores, top_k - 1, axis=-1)[..., top_k-1:top_k]
+        scores = numpy.where(scores >= kth, scores, -numpy.inf)
+    if temperature > 0:
+        scores = scores + rng.gumbel(size=scores.shape)
+    return numpy.argmax(scores, axis=-1)
+
+def _draw_torch(logits, valid, temperature, top_k, gen):
+    logits = logits.float()
+    if temperature > 0:
+        logits = logits / temperature
+    scores = logits.masked_fill(~valid, -float("inf"))
+    if top_k is not None and top_k < scores.shape[-1]:
+        kth = torch.topk(scores, top_k, dim=-1).values[..., -1:]
+        scores = scores.masked_fill(scores < kth, -float("inf"))
+    if temperature > 0:
+        # Gumbel noise: -log(E) with E ~ Exp(1)
+        noise = torch.empty_like(scores).exponential_(generator=gen).log_().neg_()
+        scores = scores + noise
+    return scores.argmax(dim=-1)
+
+def qubit_values(symbol_dict: dict):
+    '''
+    Qubit index of every symbol, -1 for symbols that are not qubits.
+    '''
+    values = numpy.full(len(symbol_dict), -1, dtype=numpy.int64)
+    for sym, i in symbol_dict.items():
+        if sym.isdigit():
+            values[i] = int(sym)
+    return values
@@ -0,0 +1,335 @@
+'''
+Evolutionary search over circuits in the index encoding.
+
+The population is stored as one index array of shape (population, n_gates, 3)
+and one parameter array (see ``index_encoding``); selection, mutation and
+crossover act on the whole population with array operations:
+
+    - tournament selection and elitism;
+    - mutation: every gate is redrawn with probability ``mutation_rate``
+      from the valid gates of ``sampling.GrammarMask``, and the angles are
+      perturbed with Gaussian noise;
+    - crossover: one-point crossover on gate positions, or moment-aligned
+      crossover, which takes the moments before a cut from one parent and
+      the moments after it from the other, using the ASAP schedule of
+      ``utils.scheduler``.
+
+The fitness is a callable of a circuit string (higher is better),
+evaluated in a process pool. Results are cached by fitness name and
+canonical circuit hash (see ``utils.canonical``), in memory or in a
+``result_cache.ResultCache``.
+The search stops early when the best fitness has not improved for
+``patience`` generations, and can write and resume checkpoints.
+
+Examples:
+    >>> ga = GeneticSearch(fitness, sym_dicts, n_gates=20, population_size=64,
+    ...                    max_dist=1, crossover="moment", n_workers=8)
+    >>> best_q_str, best_fitness = ga.run(200, checkpoint_file="ga.pkl")
+'''
+import pickle
+import numpy
+from concurrent.futures import ProcessPoolExecutor
+from digicircs import index_encoding
+from digicircs.sampling import GrammarMask, sample_indices, qubit_values
+from digicircs.utils import canonical, scheduler
+
+class GeneticSearch:
+    '''
+    Genetic algorithm over fixed-length circuits.
+
+    Args:
+        :fitness: picklable function of a circuit string, returning a float
+                  to maximize.
+        :symbol_dictionary: the symbol dictionaries of gate names, targets and controls.
+        :n_gates: number of gate slots of every circuit.
+    Kwargs:
+        :population_size: number of circuits per generation.
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
+        :max_dist: maximum distance between target and control qubits.
+        :n_qubit: number of qubits, all qubits of the vocabulary if not given.
+        :allow_nop: if True, gate slots can be empty, so the circuits have variable length.
+        :mutation_rate: probability to redraw every gate.
+        :param_sigma: standard deviation of the perturbation of the angles.
+        :crossover: "one_point" or "moment".
+        :crossover_rate: probability that a child is a crossover of two parents.
+        :n_elite: number of best circuits copied to the next generation.
+        :tournament_size: number of circuits competing in every selection.
+        :n_workers: number of processes evaluating the fitness, no pool if 1.
+        :cache: a ``ResultCache`` for the fitness values, in memory if None.
+        :cache_name: prefix of the cache keys, identifying the fitness
+                     (as in ``result_cache.cached``); the module and qualified
+                     name of ``fitness`` if not given. Required with a
+                     ``cache`` if ``fitness`` has no stable name (lambdas,
+                     local functions, ``functools.partial`` objects).
+        :rand_seed: seed of the search.
+    '''
+    def __init__(self, fitness, symbol_dictionary: list, n_gates: int,
+                 population_size: int = 64, gate_set=None, max_dist: int = None,
+                 n_qubit: int = None, allow_nop: bool = False, mutation_rate: float = 0.05,
+                 param_sigma: float = 0.1, crossover: str = "one_point",
+                 crossover_rate: float = 0.8, n_elite: int = 2, tournament_size: int = 3,
+                 n_workers: int = 1, cache=None, cache_name: str = None, rand_seed=None):
+        assert crossover in ["one_point", "moment"], \
+            "Only 'one_point' or 'moment' crossovers are supported!"
+        self.fitness = fitness
+        self.symbol_dictionary = symbol_dictionary
+        self.rev_dicts = [{v: k for k, v in d.items()} for d in symbol_dictionary[:3]]
+        self.n_gates = n_gates
+        self.population_size = population_size
+        self.grammar = GrammarMask(symbol_dictionary, gate_set=gate_set, n_qubit=n_qubit,
+                                   max_dist=max_dist, allow_nop=allow_nop)
+        self.mutation_rate = mutation_rate
+        self.param_sigma = param_sigma
+        self.crossover = crossover
+        self.crossover_rate = crossover_rate
+        self.n_elite = n_elite
+        self.tournament_size = tournament_size
+        self.n_workers = n_workers
+        self.cache = cache
+        if cache_name is None:
+            cache_name = _stable_name(fitness)
+            if cache_name is None and cache is not None:
+                raise ValueError("The fitness has no stable name, give a cache_name "
+                                 "to identify it in the cache!")
+            elif cache_name is None:
+                # the in-memory cache only serves this search
+                cache_name = "fitness"
+        self.cache_name = cache_name
+        self._memo = {}
+        self.rng = numpy.random.default_rng(rand_seed)
+        self._targ_qubits = qubit_values(symbol_dictionary[1])
+        self._ctrl_qubits = qubit_values(symbol_dictionary[2])
+        self._nop_gate = symbol_dictionary[0].get("nop", -1)
+
+        self.generation = 0
+        self.history = []
+        self.best = (None, -numpy.inf)
+        self.idx, self.params = self.random_circuits(population_size)
+        self.scores = None
+
+    def random_circuits(self, n_circuits: int):
+        '''
+        Uniformly random valid circuits, as index and parameter arrays.
+        '''
+        shape = (n_circuits, self.n_gates)
+        idx = self._random_gates(shape)
+        params = self.rng.uniform(0, 2 * numpy.pi, size=shape).astype(numpy.float32)
+        return idx, params
+
+    def _random_gates(self, shape: tuple):
+        zeros = lambda d: numpy.zeros(shape + (len(self.symbol_dictionary[d]),))
+        return sample_indices(zeros(0), zeros(1), zeros(2), self.grammar, rand_seed=self.rng)
+
+    def decode(self, idx=None, params=None):
+        '''
+        Circuit strings of index arrays, the population if not given.
+        '''
+        idx = self.idx if idx is None else idx
+        params = self.params if params is None else params
+        q_strs = index_encoding.from_indices(idx, params, self.rev_dicts)
+        # drop the empty gate slots
+        return ["@".join(g for g in q_str.split("@") if not g.startswith("nop="))
+                for q_str in q_strs]
+
+    def evaluate(self, q_strings: list, pool=None):
+        '''
+        Fitness of circuit strings, read from the cache when possible.
+        '''
+        keys = [self.cache_name + ":" + canonical.circuit_hash(q_str) for q_str in q_strings]
+        scores = numpy.empty(len(q_strings))
+        todo = {}
+        for i, key in enumerate(keys):
+            value = self._cache_get(key)
+            if value is None:
+                todo.setdefault(key, []).append(i)
+            else:
+                scores[i] = value
+        items = [(key, q_strings[rows[0]]) for key, rows in todo.items()]
+        if pool is None:
+            values = [self.fitness(q_str) for _, q_str in items]
+        else:
+            values = list(pool.map(self.fitness, [q_str for _, q_str in items]))
+        for (key, _), value in zip(items, values):
+            self._cache_put(key, float(value))
+            scores[todo[key]] = value
+        return scores
+
+    def step(self, pool=None):
+        '''
+        Evaluate the population and breed the next generation.
+        '''
+        q_strs = self.decode()
+        self.scores = self.evaluate(q_strs, pool=pool)
+        best = int(numpy.argmax(self.scores))
+        if self.scores[best] > self.best[1]:
+            self.best = (q_strs[best], float(self.scores[best]))
+        self.history.append({"generation": self.generation, "best": float(self.scores[best]),
+                             "mean": float(self.scores.mean())})
+
+        n_children = self.population_size - self.n_elite
+        elite = numpy.argsort(-self.scores, kind="stable")[:self.n_elite]
+        parents1 = self.select(n_children)
+        parents2 = self.select(n_children)
+        idx, params = self.idx[parents1].copy(), self.params[parents1].copy()
+        cross = self.rng.random(n_children) < self.crossover_rate
+        if cross.any():
+            if self.crossover == "moment":
+                c_idx, c_params = self.moment_crossover(parents1[cross], parents2[cross])
+            else:
+                c_idx, c_params = self.one_point_crossover(parents1[cross], parents2[cross])
+            idx[cross], params[cross] = c_idx, c_params
+        idx, params = self.mutate(idx, params)
+        self.idx = numpy.concatenate([self.idx[elite], idx])
+        self.params = numpy.concatenate([self.params[elite], params])
+        self.generation += 1
+
+    def select(self, n_select: int):
+        '''
+        Tournament selection, returns the indices of the winners.
+        '''
+        contestants = self.rng.integers(0, self.population_size,
+                                        size=(n_select, self.tournament_size))
+        winners = numpy.argmax(self.scores[contestants], axis=1)
+        return contestants[numpy.arange(n_select), winners]
+
+    def mutate(self, idx, params):
+        '''
+        Redraw gates with probability ``mutation_rate`` and perturb the angles.
+        '''
+        mask = self.rng.random(idx.shape[:2]) < self.mutation_rate
+        if mask.any():
+            idx = numpy.where(mask[..., None], self._random_gates(idx.shape[:2]), idx)
+        noise = self.rng.normal(0, self.param_sigma, size=params.shape)
+        params = numpy.mod(params + noise, 2 * numpy.pi).astype(numpy.float32)
+        return idx.astype(numpy.int16), params
+
+    def one_point_crossover(self, parents1, parents2):
+        '''
+        Children taking the gates before a random cut from the first parent.
+        '''
+        cut = self.rng.integers(1, max(self.n_gates, 2), size=len(parents1))
+        first = numpy.arange(self.n_gates)[None, :] < cut[:, None]
+        idx = numpy.where(first[..., None], self.idx[parents1], self.idx[parents2])
+        params = numpy.where(first, self.params[parents1], self.params[parents2])
+        return idx, params
+
+    def moment_crossover(self, parents1, parents2):
+        '''
+        Children made of the moments before a random cut of the first parent
+        and the moments from the cut of the second parent, compacted and
+        truncated to ``n_gates``.
+        '''
+        moments = self.moments()
+        m1, m2 = moments[parents1], moments[parents2]
+        n_moments = numpy.maximum(m1.max(axis=1), m2.max(axis=1)) + 1
+        cut = (self.rng.random(len(parents1)) * (n_moments + 1)).astype(int)
+        keep = numpy.concatenate([(m1 >= 0) & (m1 < cut[:, None]), m2 >= cut[:, None]], axis=1)
+        idx = numpy.concatenate([self.idx[parents1], self.idx[parents2]], axis=1)
+        params = numpy.concatenate([self.params[parents1], self.params[parents2]], axis=1)
+        # move the kept gates to the front, in order
+        order = numpy.argsort(~keep, axis=1, kind="stable")[:, :self.n_gates]
+        rows = numpy.arange(len(parents1))[:, None]
+        idx, params, keep = idx[rows, order], params[rows, order], keep[rows, order]
+        if self._nop_gate >= 0 and self.grammar.gate_valid[self._nop_gate]:
+            pad = numpy.array([d.get("nop", 0) for d in self.symbol_dictionary[:3]],
+                              dtype=idx.dtype)
+            idx = numpy.where(keep[..., None], idx, pad)
+        else:
+            # fixed length circuits: the empty slots get random gates
+            idx = numpy.where(keep[..., None], idx, self._random_gates(keep.shape))
+        return idx, params
+
+    def moments(self):
+        '''
+        ASAP moments of the gates of the population, -1 for nop gates.
+        '''
+        targets = self._targ_qubits[self.idx[..., 1]]
+        controls = self._ctrl_qubits[self.idx[..., 2]]
+        nop = self.idx[..., 0] == self._nop_gate
+        targets = numpy.where(nop, -1, targets)
+        controls = numpy.where(nop, -1, controls)
+        return scheduler.asap_moments_batch(targets, controls)
+
+    def run(self, n_generations: int, patience: int = None, tol: float = 0.,
+            target: float = None, checkpoint_file: str = None, checkpoint_every: int = 10):
+        '''
+        Run the search.
+
+        Args:
+            :n_generations: maximum number of generations.
+        Kwargs:
+            :patience: stop when the best fitness has not improved by more
+                       than ``tol`` for ``patience`` generations.
+            :tol: minimum improvement.
+            :target: stop when the best fitness reaches ``target``.
+            :checkpoint_file: file to write the checkpoints to.
+            :checkpoint_every: number of generations between checkpoints.
+        Returns:
+            :str: the best circuit.
+            :float: its fitness.
+        '''
+        pool = ProcessPoolExecutor(self.n_workers) if self.n_workers > 1 else None
+        try:
+            last_best, n_stall = self.best[1], 0
+            for _ in range(n_generations):
+                self.step(pool=pool)
+                if self.best[1] > last_best + tol:
+                    last_best, n_stall = self.best[1], 0
+                else:
+                    n_stall += 1
+                if checkpoint_file is not None and self.generation % checkpoint_every == 0:
+                    self.save(checkpoint_file)
+                if (patience is not None and n_stall >= patience) or \
+                   (target is not None and self.best[1] >= target):
+                    break
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        if checkpoint_file is not None:
+            self.save(checkpoint_file)
+        return self.best
+
+    def save(self, file_name: str):
+        '''
+        Write a checkpoint: the population, the random state, the history
+        and the in-memory fitness cache.
+        '''
+        state = {"idx": self.idx, "params": self.params, "generation": self.generation,
+                 "history": self.history, "best": self.best, "rng": self.rng.bit_generator.state,
+                 "memo": self._memo}
+        with open(file_name, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load(self, file_name: str):
+        '''
+        Resume from a checkpoint written by ``save``.
+        '''
+        with open(file_name, "rb") as f:
+            state = pickle.load(f)
+        self.idx, self.params = state["idx"], state["params"]
+        self.generation, self.history, self.best = state["generation"], state["history"], state["best"]
+        self.rng.bit_generator.state = state["rng"]
+        self._memo.update(state["memo"])
+        return self
+
+    def _cache_get(self, key: str):
+        if self.cache is not None:
+            return self.cache.get(key)
+        return self._memo.get(key)
+
+    def _cache_put(self, key: str, value: float):
+        if self.cache is not None:
+            self.cache.put(key, value)
+        else:
+            self._memo[key] = value
+
+def _stable_name(func):
+    '''
+    Module and qualified name of a function, None if they do not identify it
+    across runs (lambdas, local functions, callables without a name).
+    '''
+    qualname = getattr(func, "__qualname__", None)
+    module = getattr(func, "__module__", None)
+    if qualname is None or module is None or "<" in qualname:
+        return None
+    return module + "." + qualname
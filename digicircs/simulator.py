@@ -0,0 +1,405 @@
+'''
+Native statevector simulator of circuits represented by strings.
+
+The gates follow the tequila conventions used by ``decoder``:
+
+    - ``RX(a) = exp(-i a/2 X)``, and the same for RY and RZ;
+    - ``CRX=t=c=a`` is RX(a) on qubit ``t`` controlled by qubit ``c``,
+      ``CNOT=t=c`` is X on ``t`` controlled by ``c``;
+    - ``XY=t=c=a`` is ``exp(-i a/2 X_t Y_c)``;
+    - qubit 0 is the most significant bit of the basis state index.
+
+The state is stored as an array of shape (batch, 2, ..., 2) with one axis
+per qubit; every gate is a small tensor contraction over one axis, or a
+slice for controlled gates. The batch dimension runs over sets of
+parameters of the same circuit. ``sample_shots`` draws measurement
+samples from the final probabilities.
+
+Examples:
+    >>> state = simulate("H=0=nop=nop@CNOT=1=0=nop")
+    >>> print(state)
+        [0.70710678+0.j 0.        +0.j 0.        +0.j 0.70710678+0.j]
+'''
+import numpy
+from digicircs.gate_set import get_gate_set
+from digicircs.utils import misc, components
+
+SQRT2 = numpy.sqrt(0.5)
+PAULI_MATRICES = {"I": numpy.eye(2, dtype=complex),
+                  "X": numpy.array([[0, 1], [1, 0]], dtype=complex),
+                  "Y": numpy.array([[0, -1j], [1j, 0]], dtype=complex),
+                  "Z": numpy.array([[1, 0], [0, -1]], dtype=complex)}
+STATIC_MATRICES = {"X": PAULI_MATRICES["X"], "Y": PAULI_MATRICES["Y"],
+                   "Z": PAULI_MATRICES["Z"],
+                   "H": numpy.array([[SQRT2, SQRT2], [SQRT2, -SQRT2]], dtype=complex),
+                   "S": numpy.array([[1, 0], [0, 1j]], dtype=complex),
+                   "T": numpy.array([[1, 0], [0, numpy.exp(0.25j * numpy.pi)]], dtype=complex)}
+
+def simulate(q_string: str, n_qubit: int = None, params=None, initial_state=None,
+             rm_ctrl: bool = True, gate_set=None):
+    '''
+    Statevector of a circuit applied to ``|0...0>``.
+
+    Args:
+        :q_string: A string encoding a quantum circuit.
+    Kwargs:
+        :n_qubit: number of qubits, inferred from the gates if not given.
+        :params: values of the parameterized gates (in the order of the
+                 circuit), shape (n_params,) or (batch, n_params); the
+                 parameters of the string are used if not given.
+        :initial_state: initial statevector(s), shape (2**n_qubit,) or (batch, 2**n_qubit).
+        :rm_ctrl: If true, the one qubit gates cannot have control qubits.
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
+    Returns:
+        :ndarray: the statevector, shape (2**n_qubit,), or (batch, 2**n_qubit)
+                  if ``params`` or ``initial_state`` is batched.
+    '''
+    gates, n_qubit = parse_gates(q_string, n_qubit=n_qubit, rm_ctrl=rm_ctrl,
+                                 gate_set=gate_set, check_params=params is None)
+    n_pgates = sum(1 for g in gates if g[3] is not None)
+    batched = False
+    if params is not None:
+        params = numpy.asarray(params, dtype=float)
+        batched = params.ndim == 2
+        # explicit batch size: -1 cannot be inferred without parameterized gates
+        params = params.reshape(len(params) if batched else 1, n_pgates)
+    if initial_state is None:
+        n_batch = 1 if params is None else params.shape[0]
+        state = numpy.zeros((n_batch, 2**n_qubit), dtype=complex)
+        state[:, 0] = 1.
+    else:
+        state = numpy.array(initial_state, dtype=complex)
+        batched = batched or state.ndim == 2
+        state = state.reshape(-1, 2**n_qubit)
+        if params is not None and state.shape[0] == 1:
+            state = numpy.repeat(state, params.shape[0], axis=0)
+    state = state.reshape((-1,) + (2,) * n_qubit)
+
+    k = 0
+    for name, targ, ctrl, theta in gates:
+        if theta is not None:
+            if params is not None:
+                theta = params[:, k]
+            k += 1
+        state = apply_gate(state, name, targ, ctrl, theta)
+    state = state.reshape(-1, 2**n_qubit)
+    return state if batched else state[0]
+
+def simulate_batch(q_strings: list, n_qubit: int = None, rm_ctrl: bool = True,
+                   gate_set=None):
+    '''
+    Statevectors of a list of circuits on the same number of qubits.
+
+    Returns:
+        :ndarray: the statevectors, shape (n_circuits, 2**n_qubit).
+    '''
+    if n_qubit is None:
+        n_qubit = max(parse_gates(q_str, rm_ctrl=rm_ctrl, gate_set=gate_set)[1]
+                      for q_str in q_strings)
+    return numpy.stack([simulate(q_str, n_qubit=n_qubit, rm_ctrl=rm_ctrl, gate_set=gate_set)
+                        for q_str in q_strings])
+
+def component_states(q_string: str, n_qubit: int = None, rm_ctrl: bool = True,
+                     gate_set=None):
+    '''
+    Statevectors of the independent sub-circuits (see
+    ``utils.components.split_circuit``); the state of the circuit is their
+    tensor product, which is never formed.
+
+    Returns:
+        :list: (qubits, statevector) pairs.
+    '''
+    return [(qubits, simulate(sub, n_qubit=len(qubits), rm_ctrl=rm_ctrl, gate_set=gate_set))
+            for sub, qubits in components.split_circuit(q_string, n_qubit=n_qubit,
+                                                        rm_ctrl=rm_ctrl, gate_set=gate_set)]
+
+def outcome_probabilities(states: list, bits):
+    '''
+    Probabilities of measurement outcomes of a factorized state.
+
+    Args:
+        :states: (qubits, statevector) pairs from ``component_states``.
+        :bits: outcomes as bits, shape (..., n_qubit) with qubit 0 first.
+    Returns:
+        :ndarray: the probabilities, shape (...).
+    '''
+    bits = numpy.asarray(bits, dtype=numpy.int64)
+    probs = numpy.ones(bits.shape[:-1])
+    for qubits, state in states:
+        powers = 1 << numpy.arange(len(qubits) - 1, -1, -1)
+        probs = probs * numpy.abs(state[bits[..., qubits] @ powers])**2
+    return probs
+
+def parse_gates(q_string: str, n_qubit: int = None, rm_ctrl: bool = True, gate_set=None,
+                check_params: bool = True):
+    '''
+    Gates of a circuit string as (name, target, control, angle) tuples,
+    control -1 and angle None when absent. With ``check_params=False``,
+    symbolic parameters (to be given to ``simulate``) are kept as nan.
+
+    Returns:
+        :list: the gates.
+        :int: the number of qubits.
+    '''
+    gate_set = get_gate_set(gate_set)
+    names, targets, controls, params = misc.parse_qstring(q_string, rm_ctrl=rm_ctrl,
+                                                          gate_set=gate_set)
+    gates = []
+    for name, targ, ctrl, theta in zip(names, targets.tolist(), controls.tolist(), params):
+        name = name.upper()
+        if name not in gate_set.all_gates:
+            raise ValueError("Unknown gate name {}".format(name))
+        if name in gate_set.parameterized:
+            if check_params and numpy.isnan(theta):
+                raise ValueError("Gate {} needs a numerical parameter!".format(name))
+        else:
+            theta = None
+        gates.append((name, targ, ctrl, theta))
+    n_min = max(targets.max(initial=-1), controls.max(initial=-1)) + 1
+    if n_qubit is None:
+        n_qubit = max(n_min, 1)
+    elif n_qubit < n_min:
+        raise ValueError("The circuit acts on {} qubits, more than n_qubit={}".format(n_min, n_qubit))
+    return gates, n_qubit
+
+def apply_gate(state, name: str, targ: int, ctrl: int = -1, theta=None):
+    '''
+    Apply one gate to a batched state of shape (batch, 2, ..., 2).
+
+    Args:
+        :state: the state.
+        :name: the gate name.
+        :targ: the target qubit.
+    Kwargs:
+        :ctrl: the control qubit, -1 if none.
+        :theta: the angle, a float or an array of shape (batch,).
+    Returns:
+        :ndarray: the new state.
+    '''
+    if len(name) == 2 and name in _PAULI_PAIRS:
+        # exp(-i theta/2 P_t P_c) = cos(theta/2) - i sin(theta/2) P_t P_c
+        theta = numpy.asarray(theta, dtype=float).reshape((-1,) + (1,) * (state.ndim - 1))
+        pp = apply_matrix(state, PAULI_MATRICES[name[0]], targ)
+        pp = apply_matrix(pp, PAULI_MATRICES[name[1]], ctrl)
+        return numpy.cos(theta / 2) * state - 1j * numpy.sin(theta / 2) * pp
+
+    if name[0] == "C" and name != "CNOT" and name[1:] in _ROTATIONS:
+        name = name[1:]
+    elif name == "CNOT":
+        name = "X"
+    if name in _ROTATIONS:
+        mat = rotation_matrix(name[1], theta)
+    else:
+        mat = STATIC_MATRICES[name]
+
+    if ctrl < 0:
+        return apply_matrix(state, mat, targ)
+    # apply the gate on the subspace where the control qubit is 1
+    index = [slice(None)] * state.ndim
+    index[ctrl + 1] = 1
+    index = tuple(index)
+    sub_targ = targ if targ < ctrl else targ - 1
+    state = state.copy()
+    state[index] = apply_matrix(state[index], mat, sub_targ)
+    return state
+
+def apply_matrix(state, mat, qubit: int):
+    '''
+    Apply a 2x2 matrix, or a batch of matrices with shape (batch, 2, 2),
+    to one qubit of a batched state.
+    '''
+    axis = qubit + 1
+    state = numpy.moveaxis(state, axis, -1)
+    if mat.ndim == 2:
+        state = state @ mat.T
+    else:
+        shape = state.shape
+        state = numpy.einsum("bkj,bij->bki", state.reshape(shape[0], -1, 2), mat).reshape(shape)
+    return numpy.moveaxis(state, -1, axis)
+
+def rotation_matrix(axis: str, theta):
+    '''
+    ``exp(-i theta/2 P)`` for the Pauli matrix ``P`` of ``axis``; a batch of
+    matrices with shape (batch, 2, 2) if ``theta`` is an array.
+    '''
+    theta = numpy.asarray(theta, dtype=float)
+    cos = numpy.cos(theta / 2)[..., None, None]
+    sin = numpy.sin(theta / 2)[..., None, None]
+    return cos * PAULI_MATRICES["I"] - 1j * sin * PAULI_MATRICES[axis]
+
+_PAULI_PAIRS = frozenset(misc.get_paulis_2q())
+_ROTATIONS = frozenset(["RX", "RY", "RZ"])
+
+SHOT_CHUNK_SIZE = 2**20
+
+def sample_shots(q_string, n_shots: int, n_qubit: int = None, params=None,
+                 rand_seed=None, return_counts: bool = True,
+                 chunk_size: int = SHOT_CHUNK_SIZE, rm_ctrl: bool = True, gate_set=None,
+                 use_stabilizer: bool = True):
+    '''
+    Measurement samples of circuits in the computational basis.
+
+    The outcomes are packed bitstrings: the index of the basis state, with
+    qubit 0 as the most significant bit (see ``unpack_bitstrings``).
+    Only the shot buffers are chunked: every non-Clifford circuit still
+    builds its full statevector, its probabilities and their cumulative sum
+    (``2**n_qubit`` entries each, plus copies of the state by the gates).
+
+    Args:
+        :q_string: a circuit string or a list of circuit strings.
+        :n_shots: number of shots per circuit.
+    Kwargs:
+        :n_qubit: number of qubits, inferred from the gates if not given.
+        :params: values of the parameterized gates of a single circuit, shape (n_params,).
+        :rand_seed: seed or ``numpy.random.Generator``.
+        :return_counts: if True, return the distinct outcomes and their
+                        counts, else the outcome of every shot.
+        :chunk_size: number of shots drawn at once, bounding the memory of the shots.
+        :rm_ctrl: If true, the one qubit gates cannot have control qubits.
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
+        :use_stabilizer: if True, Clifford circuits are sampled from a
+                         ``stabilizer.Tableau``; with more than 64 qubits the
+                         outcomes are then rows of ``numpy.packbits`` bits.
+    Returns:
+        :tuple or ndarray: (outcomes, counts) uint64 and int64 arrays sorted
+                           by outcome, or the uint64 outcomes of shape (n_shots,);
+                           a list over the circuits if a list is given.
+    Examples:
+        >>> outcomes, counts = sample_shots("H=0=nop=nop@CNOT=1=0=nop", 1000)
+        >>> print(outcomes, counts)
+            [0 3] [497 503]
+    '''
+    rng = numpy.random.default_rng(rand_seed)
+    many = not isinstance(q_string, str)
+    if many and params is not None:
+        raise ValueError("params can only be given with a single circuit!")
+    results = []
+    # one circuit at a time, so that only one statevector is in memory
+    for q_str in (q_string if many else [q_string]):
+        if use_stabilizer and params is None:
+            from digicircs import stabilizer
+            gates, n_q = parse_gates(q_str, n_qubit=n_qubit, rm_ctrl=rm_ctrl, gate_set=gate_set)
+            if stabilizer.is_clifford(gates):
+                tableau = stabilizer.Tableau.from_gates(gates, n_q)
+                if not return_counts:
+                    bits = tableau.sample(n_shots, rand_seed=rng)
+                    results.append(_bits_to_outcomes(bits, n_q, False))
+                    continue
+                # the distinct outcomes are merged after every chunk
+                outcomes, counts = None, None
+                for start in range(0, n_shots, chunk_size):
+                    bits = tableau.sample(min(chunk_size, n_shots - start), rand_seed=rng)
+                    outcomes, counts = _merge_counts(outcomes, counts,
+                                                     *_bits_to_outcomes(bits, n_q, True))
+                if outcomes is None:
+                    outcomes, counts = _bits_to_outcomes(tableau.sample(0), n_q, True)
+                results.append((outcomes, counts))
+                continue
+        state = simulate(q_str, n_qubit=n_qubit, params=params, rm_ctrl=rm_ctrl,
+                         gate_set=gate_set)
+        probs = numpy.abs(state)**2
+        del state
+        results.append(sample_probabilities(probs, n_shots, rand_seed=rng,
+                                            return_counts=return_counts,
+                                            chunk_size=chunk_size))
+    return results if many else results[0]
+
+def sample_probabilities(probs, n_shots: int, rand_seed=None, return_counts: bool = True,
+                         chunk_size: int = SHOT_CHUNK_SIZE):
+    '''
+    Draw outcomes from a probability vector by binary search of uniform
+    numbers in the cumulative distribution, ``chunk_size`` shots at a time.
+    The counts are accumulated after every chunk, so the memory is the
+    cumulative distribution and the counts (the size of ``probs`` each)
+    plus one chunk, independent of ``n_shots`` (plus the outcomes if
+    ``return_counts`` is False).
+
+    Returns:
+        :tuple or ndarray: see ``sample_shots``.
+    '''
+    rng = numpy.random.default_rng(rand_seed)
+    cdf = numpy.cumsum(probs, dtype=numpy.float64)
+    cdf /= cdf[-1]
+    last = len(cdf) - 1
+    if return_counts:
+        total = numpy.zeros(len(cdf), dtype=numpy.int64)
+    else:
+        shots = numpy.empty(n_shots, dtype=numpy.uint64)
+    for start in range(0, n_shots, chunk_size):
+        n_chunk = min(chunk_size, n_shots - start)
+        u = rng.random(n_chunk)
+        if return_counts:
+            # sorted queries make the binary searches cache friendly
+            u.sort()
+        idx = numpy.minimum(numpy.searchsorted(cdf, u, side="right"), last)
+        if return_counts:
+            # idx is sorted: the distinct values start where it changes
+            starts = numpy.flatnonzero(numpy.r_[True, idx[1:] != idx[:-1]])
+            total[idx[starts]] += numpy.diff(numpy.r_[starts, n_chunk])
+        else:
+            shots[start:start + n_chunk] = idx
+    if not return_counts:
+        return shots
+    outcomes = numpy.flatnonzero(total)
+    return outcomes.astype(numpy.uint64), total[outcomes]
+
+def _merge_counts(outcomes, counts, new_outcomes, new_counts):
+    '''
+    Union of two sets of distinct outcomes with their counts, sorted.
+    '''
+    if outcomes is None:
+        return new_outcomes, new_counts
+    outcomes, inverse = numpy.unique(numpy.concatenate([outcomes, new_outcomes]), axis=0,
+                                     return_inverse=True)
+    counts = numpy.bincount(inverse.ravel(), weights=numpy.concatenate([counts, new_counts]),
+                            minlength=len(outcomes))
+    return outcomes, counts.astype(numpy.int64)
+
+def _bits_to_outcomes(bits, n_qubit: int, return_counts: bool):
+    '''
+    Outcomes from rows of packed bits: uint64 indices up to 64 qubits.
+    '''
+    if n_qubit <= 64:
+        words = numpy.zeros((len(bits), 8), dtype=numpy.uint8)
+        words[:, 8 - bits.shape[1]:] = bits
+        # big-endian bytes, then shift out the padding bits
+        bits = words.view(">u8")[:, 0].astype(numpy.uint64) \
+             >> numpy.uint64(8 * bits.shape[1] - n_qubit)
+    if not return_counts:
+        return bits
+    outcomes, counts = numpy.unique(bits, axis=0, return_counts=True)
+    return outcomes, counts.astype(numpy.int64)
+
+def unpack_bitstrings(outcomes, n_qubit: int):
+    '''
+    Bits of packed outcomes, shape (..., n_qubit) uint8 with qubit 0 first.
+    '''
+    outcomes = numpy.asarray(outcomes, dtype=numpy.uint64)
+    shifts = numpy.arange(n_qubit - 1, -1, -1, dtype=numpy.uint64)
+    return ((outcomes[..., None] >> shifts) & numpy.uint64(1)).astype(numpy.uint8)
+
+def gate_matrix(name: str, theta=None, controlled: bool = False):
+    '''
+    Matrix of a gate: 2x2 for 1-qubit gates, 4x4 for 2-qubit gates with
+    the qubits ordered as (target, control).
+
+    Args:
+        :name: the gate name.
+    Kwargs:
+        :theta: the angle of parameterized gates.
+        :controlled: if True, 1-qubit gates are controlled by a second qubit.
+    Returns:
+        :ndarray: the matrix.
+    '''
+    if len(name) == 2 and name in _PAULI_PAIRS:
+        pp = numpy.kron(PAULI_MATRICES[name[0]], PAULI_MATRICES[name[1]])
+        return numpy.cos(theta / 2) * numpy.eye(4) - 1j * numpy.sin(theta / 2) * pp
+    if name == "CNOT":
+        name, controlled = "X", True
+    elif name[0] == "C" and name[1:] in _ROTATIONS:
+        name, controlled = name[1:], True
+    mat = rotation_matrix(name[1], theta) if name in _ROTATIONS else STATIC_MATRICES[name]
+    if not controlled:
+        return mat
+    return numpy.kron(PAULI_MATRICES["I"], numpy.diag([1., 0.])) \
+         + numpy.kron(mat, numpy.diag([0., 1.]))
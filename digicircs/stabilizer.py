@@ -0,0 +1,318 @@
+'''
+Stabilizer simulator of Clifford circuits represented by strings.
+
+Circuits made only of ``X, Y, Z, H, S`` and ``CNOT`` (and controlled
+Paulis with ``rm_ctrl=False``) are simulated in polynomial time with the
+Aaronson-Gottesman tableau: n destabilizer and n stabilizer rows, each a
+Pauli string stored as X and Z bits packed into ``numpy.uint64`` words
+(qubit ``a`` is bit ``a % 64`` of word ``a // 64``), plus a sign bit.
+A gate updates one or two bit columns of all rows at once.
+
+Expectation values of Pauli strings are 0 or +-1 and follow from the
+commutation of the string with the stabilizers. Measurement samples in
+the computational basis are drawn without re-simulating: the outcomes of
+a stabilizer state are uniform over an affine subspace, spanned by the X
+parts of the stabilizers, after a Gaussian elimination of the tableau.
+
+``observables.expectation`` and ``simulator.sample_shots`` use this
+simulator automatically for Clifford circuits.
+
+Examples:
+    >>> tableau = simulate_tableau("H=0=nop=nop@" + "@".join(
+    ...     "CNOT={}={}=nop".format(q + 1, q) for q in range(199)))
+    >>> tableau.expectation({((0, "Z"), (199, "Z")): 1.0})
+        1.0
+    >>> bits = tableau.sample(1000, rand_seed=0)
+'''
+import numpy
+from digicircs import simulator
+
+CLIFFORD_1Q = frozenset(["X", "Y", "Z", "H", "S"])
+CLIFFORD_2Q = frozenset(["CNOT"])
+SAMPLE_CHUNK_SIZE = 2**22
+
+class Tableau:
+    '''
+    Stabilizer tableau of ``|0...0>`` on ``n_qubit`` qubits.
+    '''
+    def __init__(self, n_qubit: int):
+        self.n_qubit = n_qubit
+        self.n_words = (n_qubit + 63) // 64
+        # rows 0..n-1: destabilizers X_a, rows n..2n-1: stabilizers Z_a
+        self.x = numpy.zeros((2 * n_qubit, self.n_words), dtype=numpy.uint64)
+        self.z = numpy.zeros((2 * n_qubit, self.n_words), dtype=numpy.uint64)
+        self.r = numpy.zeros(2 * n_qubit, dtype=numpy.uint8)
+        for a in range(n_qubit):
+            w, b = divmod(a, 64)
+            self.x[a, w] = numpy.uint64(1) << numpy.uint64(b)
+            self.z[n_qubit + a, w] = numpy.uint64(1) << numpy.uint64(b)
+
+    @classmethod
+    def from_gates(cls, gates: list, n_qubit: int):
+        '''
+        Tableau of parsed gates, see ``simulator.parse_gates``.
+        '''
+        tableau = cls(n_qubit)
+        for name, targ, ctrl, _ in gates:
+            tableau.apply_gate(name, targ, ctrl)
+        return tableau
+
+    def copy(self):
+        new = Tableau.__new__(Tableau)
+        new.n_qubit, new.n_words = self.n_qubit, self.n_words
+        new.x, new.z, new.r = self.x.copy(), self.z.copy(), self.r.copy()
+        return new
+
+    def _column(self, table, a: int):
+        w, b = divmod(a, 64)
+        return ((table[:, w] >> numpy.uint64(b)) & numpy.uint64(1)).astype(numpy.uint8)
+
+    def _flip(self, table, a: int, bits):
+        w, b = divmod(a, 64)
+        table[:, w] ^= bits.astype(numpy.uint64) << numpy.uint64(b)
+
+    def apply_gate(self, name: str, targ: int, ctrl: int = -1, theta=None):
+        '''
+        Apply a Clifford gate; controlled X, Y and Z are accepted.
+        '''
+        if name == "CNOT" or (ctrl >= 0 and name == "X"):
+            self.cnot(ctrl, targ)
+        elif ctrl >= 0 and name == "Z":
+            self.h_gate(targ)
+            self.cnot(ctrl, targ)
+            self.h_gate(targ)
+        elif ctrl >= 0 and name == "Y":
+            # CY = S CNOT S^dag on the target
+            for _ in range(3):
+                self.s_gate(targ)
+            self.cnot(ctrl, targ)
+            self.s_gate(targ)
+        elif ctrl < 0 and name in CLIFFORD_1Q:
+            getattr(self, name.lower() + "_gate")(targ)
+        else:
+            raise ValueError("{} is not a Clifford gate!".format(name))
+
+    def h_gate(self, a: int):
+        xa, za = self._column(self.x, a), self._column(self.z, a)
+        self.r ^= xa & za
+        self._flip(self.x, a, xa ^ za)
+        self._flip(self.z, a, xa ^ za)
+
+    def s_gate(self, a: int):
+        xa, za = self._column(self.x, a), self._column(self.z, a)
+        self.r ^= xa & za
+        self._flip(self.z, a, xa)
+
+    def x_gate(self, a: int):
+        self.r ^= self._column(self.z, a)
+
+    def y_gate(self, a: int):
+        self.r ^= self._column(self.x, a) ^ self._column(self.z, a)
+
+    def z_gate(self, a: int):
+        self.r ^= self._column(self.x, a)
+
+    def cnot(self, ctrl: int, targ: int):
+        xc, zc = self._column(self.x, ctrl), self._column(self.z, ctrl)
+        xt, zt = self._column(self.x, targ), self._column(self.z, targ)
+        self.r ^= xc & zt & (xt ^ zc ^ 1)
+        self._flip(self.x, targ, xc)
+        self._flip(self.z, ctrl, zt)
+
+    def pauli_expectation(self, term: tuple):
+        '''
+        Expectation value (0, 1 or -1) of one Pauli term, a tuple of (qubit, pauli).
+        '''
+        n = self.n_qubit
+        px, pz = _pack_pauli(term, self.n_words)
+        # the term is in the stabilizer group (up to a sign) iff it commutes
+        # with all stabilizers
+        if _anticommute(self.x[n:], self.z[n:], px, pz).any():
+            return 0.
+        # it is the product of the stabilizers whose destabilizers anticommute with it
+        rows = numpy.flatnonzero(_anticommute(self.x[:n], self.z[:n], px, pz)) + n
+        x = numpy.zeros((1, self.n_words), dtype=numpy.uint64)
+        z = numpy.zeros((1, self.n_words), dtype=numpy.uint64)
+        r = numpy.zeros(1, dtype=numpy.uint8)
+        for i in rows:
+            _rowsum(x, z, r, self.x[i], self.z[i], self.r[i])
+        return -1. if r[0] else 1.
+
+    def expectation(self, hamiltonian):
+        '''
+        Expectation value of a Hamiltonian given as Pauli terms, see
+        ``observables.pauli_terms``.
+        '''
+        from digicircs import observables
+        terms = observables.pauli_terms(hamiltonian)
+        return sum(coeff * self.pauli_expectation(term) for term, coeff in terms.items())
+
+    def sample(self, n_shots: int, rand_seed=None, chunk_size: int = SAMPLE_CHUNK_SIZE):
+        '''
+        Measurement outcomes in the computational basis.
+
+        Kwargs:
+            :rand_seed: seed or ``numpy.random.Generator``.
+            :chunk_size: number of outcome bits generated at once.
+        Returns:
+            :ndarray: the outcomes as rows of bits packed with
+                      ``numpy.packbits`` (qubit 0 is the most significant
+                      bit of the first byte), shape (n_shots, ceil(n_qubit / 8)).
+        '''
+        rng = numpy.random.default_rng(rand_seed)
+        offset, span = self._affine_support()
+        out = numpy.empty((n_shots, (self.n_qubit + 7) // 8), dtype=numpy.uint8)
+        span = span.astype(numpy.float32)
+        n_chunk = max(1, chunk_size // max(self.n_qubit, 1))
+        for start in range(0, n_shots, n_chunk):
+            stop = min(start + n_chunk, n_shots)
+            coeffs = rng.integers(0, 2, size=(stop - start, len(span)), dtype=numpy.uint8)
+            # XOR of random subsets of the span, as a float product mod 2
+            bits = (coeffs.astype(numpy.float32) @ span).astype(numpy.int64) & 1
+            out[start:stop] = numpy.packbits(bits.astype(numpy.uint8) ^ offset, axis=1)
+        return out
+
+    def _affine_support(self):
+        '''
+        The outcomes with non-zero probability, ``offset ^ span(rows)``, as bit arrays.
+        '''
+        n = self.n_qubit
+        x, z, r = self.x[n:].copy(), self.z[n:].copy(), self.r[n:].copy()
+        # eliminate the X parts: the first k rows get pivots, the others are Z strings
+        k = 0
+        for a in range(n):
+            w, b = divmod(a, 64)
+            col = (x[k:, w] >> numpy.uint64(b)) & numpy.uint64(1)
+            hits = numpy.flatnonzero(col)
+            if len(hits) == 0:
+                continue
+            _swap_rows(x, z, r, k, k + hits[0])
+            others = numpy.flatnonzero((x[:, w] >> numpy.uint64(b)) & numpy.uint64(1))
+            others = others[others != k]
+            _rowsum_rows(x, z, r, others, k)
+            k += 1
+            if k == n:
+                break
+        span = _unpack(x[:k], n)
+
+        # the Z strings fix the outcome bits: z . v = r (mod 2)
+        zrows, rz = _unpack(z[k:], n), r[k:].copy()
+        offset = numpy.zeros(n, dtype=numpy.uint8)
+        row = 0
+        pivots = []
+        for a in range(n):
+            hits = numpy.flatnonzero(zrows[row:, a]) + row
+            if len(hits) == 0:
+                continue
+            p = hits[0]
+            zrows[[row, p]] = zrows[[p, row]]
+            rz[[row, p]] = rz[[p, row]]
+            others = numpy.flatnonzero(zrows[:, a])
+            others = others[others != row]
+            zrows[others] ^= zrows[row]
+            rz[others] ^= rz[row]
+            pivots.append(a)
+            row += 1
+            if row == len(zrows):
+                break
+        # reduced echelon form: the free bits are 0, the pivot bits are the signs
+        offset[pivots] = rz[:len(pivots)]
+        return offset, span
+
+
+def is_clifford(gates: list):
+    '''
+    True if every parsed gate (see ``simulator.parse_gates``) is a Clifford
+    gate supported by ``Tableau``.
+    '''
+    for name, _, ctrl, _ in gates:
+        if ctrl >= 0:
+            if name not in CLIFFORD_2Q and name not in ("X", "Y", "Z"):
+                return False
+        elif name not in CLIFFORD_1Q:
+            return False
+    return True
+
+def simulate_tableau(q_string: str, n_qubit: int = None, rm_ctrl: bool = True,
+                     gate_set=None):
+    '''
+    Stabilizer tableau of a Clifford circuit applied to ``|0...0>``.
+
+    Args:
+        :q_string: A string encoding a quantum circuit.
+    Kwargs:
+        :n_qubit: number of qubits, inferred from the gates if not given.
+        :rm_ctrl: If true, the one qubit gates cannot have control qubits.
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
+    Returns:
+        :Tableau: the final state.
+    '''
+    gates, n_qubit = simulator.parse_gates(q_string, n_qubit=n_qubit, rm_ctrl=rm_ctrl,
+                                           gate_set=gate_set)
+    if not is_clifford(gates):
+        raise ValueError("The circuit is not a Clifford circuit!")
+    return Tableau.from_gates(gates, n_qubit)
+
+def _pack_pauli(term: tuple, n_words: int):
+    x = numpy.zeros(n_words, dtype=numpy.uint64)
+    z = numpy.zeros(n_words, dtype=numpy.uint64)
+    for q, p in term:
+        w, b = divmod(q, 64)
+        bit = numpy.uint64(1) << numpy.uint64(b)
+        if p in ("X", "Y"):
+            x[w] |= bit
+        if p in ("Z", "Y"):
+            z[w] |= bit
+    return x, z
+
+def _anticommute(x, z, px, pz):
+    '''
+    For every row, True if the row anticommutes with the Pauli (px, pz).
+    '''
+    return (_popcount((x & pz) ^ (z & px)).sum(axis=-1) & 1).astype(bool)
+
+def _rowsum(x, z, r, xi, zi, ri):
+    '''
+    Multiply the rows (x, z, r) in place by the Pauli (xi, zi, ri) on the left,
+    tracking the sign as in Aaronson-Gottesman.
+    '''
+    # exponent of i of the products of single-qubit Paulis
+    y1, x1, z1 = xi & zi, xi & ~zi, zi & ~xi
+    pos = (y1 & z & ~x) | (x1 & x & z) | (z1 & x & ~z)
+    neg = (y1 & x & ~z) | (x1 & z & ~x) | (z1 & x & z)
+    phase = 2 * r.astype(numpy.int64) + 2 * int(ri) \
+          + _popcount(pos).sum(axis=-1, dtype=numpy.int64) \
+          - _popcount(neg).sum(axis=-1, dtype=numpy.int64)
+    r[:] = (phase % 4) // 2
+    x ^= xi
+    z ^= zi
+
+def _rowsum_rows(x, z, r, rows, i: int):
+    if len(rows) == 0:
+        return
+    xs, zs, rs = x[rows], z[rows], r[rows]
+    _rowsum(xs, zs, rs, x[i], z[i], r[i])
+    x[rows], z[rows], r[rows] = xs, zs, rs
+
+def _swap_rows(x, z, r, i: int, j: int):
+    if i != j:
+        x[[i, j]] = x[[j, i]]
+        z[[i, j]] = z[[j, i]]
+        r[[i, j]] = r[[j, i]]
+
+def _unpack(words, n_qubit: int):
+    '''
+    Bits of packed rows, shape (n_rows, n_qubit) uint8.
+    '''
+    shifts = numpy.arange(64, dtype=numpy.uint64)
+    bits = (words[..., None] >> shifts) & numpy.uint64(1)
+    return bits.reshape(words.shape[0], words.shape[1] * 64)[:, :n_qubit].astype(numpy.uint8)
+
+if hasattr(numpy, "bitwise_count"):
+    _popcount = numpy.bitwise_count
+else:
+    _POPCOUNT8 = numpy.array([bin(i).count("1") for i in range(256)], dtype=numpy.uint8)
+
+    def _popcount(words):
+        words = numpy.ascontiguousarray(words, dtype=numpy.uint64)
+        return _POPCOUNT8[words.view(numpy.uint8)].reshape(words.shape + (8,)).sum(axis=-1)
@@ -0,0 +1,46 @@
+import numpy
+from digicircs import batching, multi_hot
+
+class TestBatching():
+    q_strs = ["H=0=nop=nop@X=1=nop=nop@RX=1=0=0.1@XX=0=3=0.2@XY=0=1=0.2",
+              "H=0=nop=nop",
+              "X=1=nop=nop@RX=1=0=0.3",
+              "Y=0=nop=nop@X=1=nop=nop@RY=1=0=0.1@ZZ=0=3=0.2@XY=0=1=0.2@H=1=nop=nop"]
+    sym_dicts = [{'RY': 0, 'XY': 1, 'nop': 2, 'X': 3, 'Y': 4, 'ZZ': 5, 'RX': 6,
+                  'H': 7, 'XX': 8}, {'0': 0, '1': 1}, {'nop': 0, '1': 1, '0': 2, '3': 3}]
+
+    def test_bucket_batches(self):
+        lengths = [1, 17, 2, 18, 3, 30, 4]
+        batches = batching.bucket_batches(lengths, 2, bucket_width=8, rand_seed=0)
+        assert sorted(numpy.concatenate(batches)) == list(range(7))
+        for batch in batches:
+            assert len(set(numpy.asarray(lengths)[batch] // 8)) == 1
+        batches = batching.bucket_batches(lengths, 2, shuffle=False, drop_last=True)
+        assert [list(b) for b in batches] == [[0, 2], [4, 6], [1, 3]]
+
+    def test_get_lengths(self):
+        lengths = batching.get_lengths(self.q_strs)
+        assert list(lengths) == [5, 1, 2, 6]
+        unary = multi_hot.get_unary_string(self.sym_dicts)
+        dec = numpy.array([multi_hot.to_multi_hot(q, 6, self.sym_dicts, unary)[0]
+                           for q in self.q_strs])
+        assert list(batching.get_lengths(dec, self.sym_dicts)) == [5, 1, 2, 6]
+
+    def test_iter_batches(self):
+        unary = multi_hot.get_unary_string(self.sym_dicts)
+        dec = numpy.array([multi_hot.to_multi_hot(q, 6, self.sym_dicts, unary)[0]
+                           for q in self.q_strs])
+        for data in [self.q_strs, dec]:
+            n_seen = 0
+            for mhe, mask, idx in batching.iter_batches(data, self.sym_dicts, 2,
+                                                         bucket_width=2, rand_seed=1):
+                batch_len = mhe.shape[1]
+                assert mask.shape == (len(idx), batch_len)
+                assert batch_len == batching.get_lengths(self.q_strs)[idx].max()
+                for k, i in enumerate(idx):
+                    ref = multi_hot.to_multi_hot(self.q_strs[i], batch_len,
+                                                 self.sym_dicts, unary)[1]
+                    assert numpy.allclose(mhe[k], ref)
+                    assert mask[k].sum() == len(self.q_strs[i].split("@"))
+                n_seen += len(idx)
+            assert n_seen == len(self.q_strs)
@@ -0,0 +1,41 @@
+from digicircs.utils import canonical
+
+class TestCanonical():
+    '''
+    Tests for functions in canonical.py
+    '''
+    def test_canonical_qstring(self):
+        # commuting reordering and alias names
+        q_str1 = "RX=1=nop=0.1@X=0=2=nop@H=1=nop=nop"
+        q_str2 = "CNOT=0=2=nop@rx=1=nop=0.1@H=1=nop=nop"
+        out = canonical.canonical_qstring(q_str1, rm_ctrl=False)
+        assert out == "CNOT=0=2=nop@RX=1=nop=0.1@H=1=nop=nop"
+        assert out == canonical.canonical_qstring(q_str2, rm_ctrl=False)
+        # non-commuting gates are not reordered
+        assert canonical.circuit_hash("H=0=nop=nop@X=0=nop=nop") \
+               != canonical.circuit_hash("X=0=nop=nop@H=0=nop=nop")
+
+    def test_canonical_params_and_qubits(self):
+        q_str1 = "H=0=nop=nop@CNOT=1=0=nop@ZZ=2=1=0.30000001@RY=3=nop=0.2"
+        q_str2 = "RY=0=nop=0.2@H=3=nop=nop@CNOT=2=3=nop@ZZ=1=2=0.3"
+        assert canonical.circuit_hash(q_str1, decimals=6) != canonical.circuit_hash(q_str2, decimals=6)
+        assert canonical.circuit_hash(q_str1, decimals=6, relabel_qubits=True) \
+               == canonical.circuit_hash(q_str2, decimals=6, relabel_qubits=True)
+        assert canonical.circuit_hash(q_str1, relabel_qubits=True) \
+               != canonical.circuit_hash(q_str2, relabel_qubits=True)
+
+    def test_relabel_ties(self):
+        # the refinement leaves the qubits tied, the labels must not matter
+        q_str1 = "CNOT=0=2=nop@CNOT=1=3=nop"
+        q_str2 = "CNOT=0=3=nop@CNOT=1=2=nop"
+        assert canonical.canonical_qstring(q_str1, relabel_qubits=True) \
+               == canonical.canonical_qstring(q_str2, relabel_qubits=True)
+        # a ring and two disjoint pairs of the same gates are not isomorphic
+        ring = "ZZ=0=1=0.1@ZZ=2=3=0.1@ZZ=1=2=0.1@ZZ=3=0=0.1"
+        pairs = "ZZ=0=1=0.1@ZZ=2=3=0.1@ZZ=0=1=0.1@ZZ=2=3=0.1"
+        assert canonical.circuit_hash(ring, relabel_qubits=True) \
+               != canonical.circuit_hash(pairs, relabel_qubits=True)
+        perm = [5, 2, 7, 0, 3, 6, 1, 4]
+        q_str = "@".join("ZZ={}={}=0.1".format(perm[q], perm[(q + 1) % 8]) for q in range(8))
+        assert canonical.circuit_hash(q_str, relabel_qubits=True) == canonical.circuit_hash(
+            "@".join("ZZ={}={}=0.1".format(q, (q + 1) % 8) for q in range(8)), relabel_qubits=True)
@@ -0,0 +1,16 @@
+from digicircs.utils import components
+
+class TestComponents():
+    '''
+    Tests for functions in components.py
+    '''
+    def test_qubit_components(self):
+        labels = components.qubit_components([0, 3, 2, 4], [-1, 1, -1, 3], n_qubit=6)
+        assert labels.tolist() == [0, 1, 2, 1, 1, 3]
+        assert components.qubit_components([], []).tolist() == []
+
+    def test_split_circuit(self):
+        q_str = "H=0=nop=nop@CNOT=2=0=nop@RX=1=nop=0.1@XY=3=1=0.2"
+        parts = components.split_circuit(q_str, n_qubit=5)
+        assert [p[0] for p in parts] == ["H=0=nop=nop@CNOT=1=0=nop", "RX=0=nop=0.1@XY=1=0=0.2", ""]
+        assert [p[1].tolist() for p in parts] == [[0, 2], [1, 3], [4]]
@@ -52,6 +52,27 @@ class TestDecoder(unittest.TestCase):
         str_i = "W=0=1=nop" # not in the gates
         self.assertRaises(Exception, decoder.gate_preprocess, str_i)
 
+    def test_gate_preprocess_cache(self):
+        decoder.set_preprocess_cache(maxsize=4)
+        for _ in range(3):
+            assert decoder.gate_preprocess("CNOT=0=0=0.1") == "X=0=nop=nop"
+        info = decoder.preprocess_cache_info()
+        assert info["misses"] == 1 and info["hits"] == 2
+        assert info["currsize"] == 1 and info["maxsize"] == 4
+
+        # random parameters are not cached
+        str_o1 = decoder.gate_preprocess("RX=0=nop=nop")
+        str_o2 = decoder.gate_preprocess("RX=0=nop=nop")
+        assert str_o1 != str_o2
+        info = decoder.preprocess_cache_info()
+        assert info["uncached"] == 2 and info["currsize"] == 1
+
+        decoder.set_preprocess_cache(cache_random=True)
+        str_o1 = decoder.gate_preprocess("RX=0=nop=nop")
+        assert decoder.gate_preprocess("RX=0=nop=nop") == str_o1
+        assert decoder.preprocess_cache_info()["hits"] == 1
+        decoder.set_preprocess_cache()
+
     def test_qstring_preprocessing(self):
         str_i = "H=0=1=0.2@CNOT=0=0=0.1@CNOT=0=nop=0.1"
         str_ref = "H=0=nop=nop@X=0=nop=nop@X=0=nop=nop"
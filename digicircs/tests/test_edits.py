@@ -0,0 +1,46 @@
+import numpy
+from digicircs import edits, index_encoding, decoder
+
+class TestEdits():
+    sym_dicts = [{'H': 0, 'RX': 1, 'CNOT': 2, 'CRZ': 3, 'nop': 4},
+                 {'0': 0, '1': 1, '2': 2, '3': 3},
+                 {'nop': 0, '0': 1, '1': 2, '2': 3, '3': 4}]
+    rev_dicts = [{v: k for k, v in d.items()} for d in sym_dicts]
+    q_str = "H=0=nop=0.2@CNOT=1=0=0.2@RX=2=nop=0.5"
+
+    def _gates(self, q_str):
+        return ["=".join(g.split("=")[:3]) for g in q_str.split("@") if not g.startswith("nop")]
+
+    def test_neighbours(self):
+        idx, params, info = edits.neighbours(self.q_str, self.sym_dicts, max_dist=1, new_param=0.3)
+        assert idx.shape == (len(info), 4, 3) and params.shape == (len(info), 4)
+        base = self._gates(self.q_str)
+        counts = numpy.bincount(info[:, 0], minlength=5)
+        # 8 valid 1-qubit gates, 6 valid pairs for each of 2 gates
+        assert counts[edits.INSERT] == 4 * (8 + 12)
+        assert counts[edits.DELETE] == 3
+        # H=0 -> RX=0 or 2-qubit gates with control 1; CNOT=1=0 -> CRZ=1=0, H=1 or RX=1;
+        # RX=2 -> H=2 or 2-qubit gates with controls 1 and 3
+        assert counts[edits.REPLACE] == 3 + 3 + 5
+        assert counts[edits.MOVE_TARGET] == 3 + 0 + 3
+        assert counts[edits.MOVE_CONTROL] == 1
+        for q_out, (kind, pos) in zip(index_encoding.from_indices(idx, params, self.rev_dicts), info):
+            gates = self._gates(q_out)
+            for g in gates:
+                # valid gates are not modified by the preprocessing
+                assert decoder.gate_preprocess(g + "=0.1").split("=")[:3] == g.split("=")[:3]
+            if kind == edits.INSERT:
+                assert gates[:pos] + gates[pos+1:] == base
+            elif kind == edits.DELETE:
+                assert gates == base[:pos] + base[pos+1:]
+            else:
+                assert gates[:pos] + gates[pos+1:] == base[:pos] + base[pos+1:]
+                assert gates[pos] != base[pos]
+
+    def test_index_input(self):
+        idx, params = index_encoding.to_indices([self.q_str], self.sym_dicts, max_len=5)
+        out = edits.neighbours((idx[0], params[0]), self.sym_dicts, max_dist=1,
+                               kinds=("delete", "move_control"))
+        assert out[0].shape == (4, 4, 3)
+        first_deleted = numpy.flatnonzero((out[2][:, 0] == edits.DELETE) & (out[2][:, 1] == 0))
+        assert numpy.allclose(out[1][first_deleted[0]], [0.2, 0.5, 0.2, 0.2])
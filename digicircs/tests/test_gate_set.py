@@ -0,0 +1,52 @@
+import pickle
+import dataclasses
+import unittest
+from digicircs import __config__, decoder, gen_circuit
+from digicircs.gate_set import GateSet, DEFAULT_GATE_SET
+
+class TestGateSet(unittest.TestCase):
+    def test_default(self):
+        gates = __config__._default_gates
+        assert list(DEFAULT_GATE_SET.sgates_1q) == gates["_static_gates_for_1qubit"]
+        assert list(DEFAULT_GATE_SET.pgates_2q) == gates["_parameterized_gates_for_2qubit"]
+        assert DEFAULT_GATE_SET.arity("CNOT") == 2 and DEFAULT_GATE_SET.arity("H") == 1
+        assert DEFAULT_GATE_SET.n_params("RX") == 1 and DEFAULT_GATE_SET.n_params("X") == 0
+        assert DEFAULT_GATE_SET.cast_to_1q("XY") == "RY"
+        assert DEFAULT_GATE_SET.cast_to_2q("RX") == "CRX"
+        ids = DEFAULT_GATE_SET.gate_ids
+        assert sorted(ids.values()) == list(range(len(DEFAULT_GATE_SET) + 1))
+        assert "nop" in DEFAULT_GATE_SET and "FOO" not in DEFAULT_GATE_SET
+
+    def test_immutable(self):
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            DEFAULT_GATE_SET.sgates_1q = ("X",)
+        with self.assertRaises(TypeError):
+            DEFAULT_GATE_SET.gate_ids["X"] = 5
+        gate_set = GateSet(sgates_1q=["h"], pgates_2q=["XY"])
+        assert gate_set == GateSet(sgates_1q=["H"], pgates_2q=["XY"])
+        assert pickle.loads(pickle.dumps(gate_set)) == gate_set
+        assert hash(pickle.loads(pickle.dumps(gate_set))) == hash(gate_set)
+
+    def test_custom_gate_set(self):
+        gate_set = GateSet(sgates_1q=["H"], sgates_2q=["CNOT"], pgates_1q=["RZ"])
+        q_str = gen_circuit.gen_circuit_gates(n_qubit=4, n_moments=5, gate_set=gate_set,
+                                              rand_seed=3)
+        names = set(g.split("=")[0] for g in q_str.split("@"))
+        assert names <= {"H", "CNOT", "RZ"}
+        q_str = gen_circuit.circuit_from_scratch(4, 20, gate_set=gate_set, rand_seed=3)[0]
+        names = set(g.split("=")[0] for g in q_str.split("@"))
+        assert names <= {"H", "CNOT", "RZ"}
+
+        assert decoder.gate_preprocess("CNOT=0=0=nop", gate_set=gate_set) == "X=0=nop=nop"
+        with self.assertRaises(Exception):
+            decoder.gate_preprocess("RX=0=nop=0.1", gate_set=gate_set)
+
+    def test_no_mutation(self):
+        sgates_1q = ["X", "Z"]
+        pgates_1q = ["RX", "RZ"]
+        gen_circuit.gen_gates_one_moment_fixed_n_params(1, 0, [[0, 1], []],
+                                                        sgates_1q=sgates_1q,
+                                                        pgates_1q=pgates_1q,
+                                                        local_rot_moment=True)
+        assert sgates_1q == ["X", "Z"] and pgates_1q == ["RX", "RZ"]
+        assert "Z" in gen_circuit.SGATES_1Q
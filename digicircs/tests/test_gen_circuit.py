@@ -1,4 +1,5 @@
 import unittest
+import numpy
 from digicircs  import gen_circuit
 
 class TestGenCircuit(unittest.TestCase):
@@ -131,7 +132,7 @@ class TestGenCircuit(unittest.TestCase):
                                                           rand_seed=0,
                                                           fix_params=True)
 
-        ref_q_str = "ZZ=3=1=3.9175@XY=3=1=3.5265@CNOT=1=0=nop@RZ=3=nop=2.9563@RZ=3=nop=1.8851@X=2=nop=nop"
+        ref_q_str = "XY=3=1=3.5265@ZZ=3=1=3.9175@RZ=3=nop=2.9563@CNOT=1=3=nop@X=2=nop=nop@RZ=3=nop=1.8851"
         assert n_p == 4
         assert out_q_str == ref_q_str
 
@@ -158,6 +159,76 @@ class TestGenCircuit(unittest.TestCase):
                                                           rand_seed=0,
                                                           fix_params=False)
 
-        ref_q_str = "ZZ=3=1=param2@XY=3=1=param3@CNOT=1=0=nop@RZ=3=nop=param0@RZ=3=nop=param1@X=2=nop=nop"
+        ref_q_str = "XY=3=1=param3@ZZ=3=1=param2@RZ=3=nop=param0@CNOT=1=3=nop@X=2=nop=nop@RZ=3=nop=param1"
         assert n_p == 4
         assert out_q_str == ref_q_str
+
+    def test_circuit_from_scratch_local(self):
+        """every control is within max_dist or on a coupling edge"""
+        for max_dist in [1, 2]:
+            q_str, _ = gen_circuit.circuit_from_scratch(8, 200, max_dist=max_dist, rand_seed=1)
+            gates = [g.split("=") for g in q_str.split("@")]
+            pairs = [(int(g[1]), int(g[2])) for g in gates if g[2] != "nop"]
+            assert len(pairs) == 100
+            assert all(0 < abs(t - c) <= max_dist for t, c in pairs)
+        edges = set(map(tuple, gen_circuit.coupling_edges(gen_circuit.grid_coupling(3, 3))))
+        q_str, _ = gen_circuit.circuit_from_scratch(9, 200, coupling=gen_circuit.grid_coupling(3, 3),
+                                                    rand_seed=2)
+        pairs = [tuple(sorted((int(g.split("=")[1]), int(g.split("=")[2]))))
+                 for g in q_str.split("@") if g.split("=")[2] != "nop"]
+        assert set(pairs) == edges
+        with self.assertRaises(ValueError):
+            gen_circuit.circuit_from_scratch(4, 6, max_dist=0, rand_seed=0)
+
+    def test_topo_max_dist(self):
+        # no free control within max_dist: the target gets a 1-qubit gate
+        for seed in range(20):
+            layer = gen_circuit._gen_circuit_topo_one_moment(10, [0.1, 0.1, 0.8], max_dist=1,
+                                                             rand_seed=seed)
+            self.test_gen_circuit_topo_one_moment(layer, 10)
+            pairs = numpy.array(layer[1]).reshape(-1, 2)
+            assert (abs(pairs[:, 0] - pairs[:, 1]) == 1).all()
+
+    def test_coupling_edges(self):
+        ref = [[0, 1], [0, 3], [1, 2], [1, 4], [2, 5], [3, 4], [4, 5]]
+        nbrs = gen_circuit.grid_coupling(2, 3)
+        assert gen_circuit.coupling_edges(nbrs).tolist() == ref
+        lists = [[q for q in row if q >= 0] for row in nbrs.tolist()]
+        assert gen_circuit.coupling_edges(lists).tolist() == ref
+        indptr = numpy.cumsum([0] + [len(l) for l in lists])
+        csr = (indptr, numpy.concatenate(lists))
+        assert gen_circuit.coupling_edges(csr).tolist() == ref
+        assert gen_circuit.coupling_edges(csr, n_qubit=4).tolist() == [[0, 1], [0, 3], [1, 2]]
+        assert gen_circuit.coupling_edges(lists, max_dist=1).tolist() == [[0, 1], [1, 2], [3, 4], [4, 5]]
+
+    def test_random_matching(self):
+        edges = gen_circuit.coupling_edges(gen_circuit.grid_coupling(4, 5))
+        for seed in range(10):
+            matched = gen_circuit.random_matching(edges, 20, rand_seed=seed)
+            ends = edges[matched].ravel()
+            # a matching ...
+            assert len(set(ends)) == len(ends)
+            # ... that is maximal
+            free = numpy.ones(20, dtype=bool)
+            free[ends] = False
+            assert not (free[edges[:, 0]] & free[edges[:, 1]]).any()
+
+    def test_gen_coupled_topology(self):
+        coupling = gen_circuit.grid_coupling(3, 4)
+        edges = set(map(tuple, gen_circuit.coupling_edges(coupling)))
+        topo, n_1q, n_2q = gen_circuit.gen_circuit_topology(12, 50, [0.1, 0.3, 0.6], rand_seed=0,
+                                                            local_rot_moment=True,
+                                                            coupling=coupling)
+        assert len(topo) == 50 and topo[0] == [list(range(12)), []]
+        assert n_1q == sum(len(m[0]) for m in topo) and n_2q == sum(len(m[1]) for m in topo) // 2
+        assert n_2q > 100
+        for layer in topo:
+            self.test_gen_circuit_topo_one_moment(layer, 12)
+            for pair in numpy.array(layer[1]).reshape(-1, 2).tolist():
+                assert tuple(sorted(pair)) in edges
+        layer = gen_circuit._gen_circuit_topo_one_moment(12, coupling=coupling, rand_seed=3)
+        assert layer == gen_circuit.gen_coupled_moments(12, 1, coupling, rand_seed=3)[0]
+        q_str = gen_circuit.gen_circuit_gates(n_qubit=12, n_moments=3, coupling=coupling, rand_seed=1)
+        for g in q_str.split("@"):
+            g = g.split("=")
+            assert g[2] == "nop" or tuple(sorted((int(g[1]), int(g[2])))) in edges
@@ -0,0 +1,73 @@
+import numpy
+import torch
+from digicircs import index_encoding, multi_hot, one_hot
+
+class TestIndexEncoding():
+    q_strs = ["H=0=nop=nop@X=1=nop=nop@RX=1=0=0.1@XX=0=3=0.2@XY=0=1=0.2",
+              "RY=1=0=0.7@H=0=nop=nop"]
+    sym_dicts = [{'RY': 0, 'XY': 1, 'nop': 2, 'X': 3, 'Y': 4, 'ZZ': 5, 'RX': 6,
+                  'H': 7, 'XX': 8}, {'0': 0, '1': 1}, {'nop': 0, '1': 1, '0': 2, '3': 3}]
+    rev_dicts = [{v: k for k, v in d.items()} for d in sym_dicts]
+
+    def test_to_indices(self):
+        idx, params = index_encoding.to_indices(self.q_strs, self.sym_dicts)
+        assert idx.dtype == numpy.int16 and idx.shape == (2, 5, 3)
+        assert params.dtype == numpy.float32 and params.shape == (2, 5)
+        unary = one_hot.get_unary_string(self.sym_dicts)
+        for i, q_str in enumerate(self.q_strs):
+            de = numpy.array(one_hot.to_one_hot(q_str, 5, self.sym_dicts, unary)[0])
+            assert (idx[i] == de[:, :3]).all()
+            assert numpy.allclose(params[i], de[:, 3])
+
+    def test_indices_to_multi_hot(self):
+        idx, params = index_encoding.to_indices(self.q_strs, self.sym_dicts)
+        unary = multi_hot.get_unary_string(self.sym_dicts)
+        ref = numpy.array([multi_hot.to_multi_hot(q, 5, self.sym_dicts, unary)[1]
+                           for q in self.q_strs])
+        mhe = index_encoding.indices_to_multi_hot(idx, params, self.sym_dicts)
+        assert numpy.allclose(mhe, ref)
+        mhe_t = index_encoding.indices_to_multi_hot(torch.as_tensor(idx),
+                                                    torch.as_tensor(params), self.sym_dicts)
+        assert numpy.allclose(mhe_t.numpy(), ref)
+        ohe = index_encoding.indices_to_one_hot(torch.as_tensor(idx), self.sym_dicts)
+        assert numpy.allclose(torch.cat(ohe, -1).numpy(), ref[..., :-1])
+        ohe = index_encoding.indices_to_one_hot(idx, self.sym_dicts)
+        assert numpy.allclose(numpy.concatenate(ohe, -1), ref[..., :-1])
+
+    def test_from_indices(self):
+        idx, params = index_encoding.to_indices(self.q_strs[0], self.sym_dicts)
+        out = index_encoding.from_indices(idx[0], params[0], self.rev_dicts)
+        assert out == "H=0=nop=0.2@X=1=nop=0.2@RX=1=0=0.1@XX=0=3=0.2@XY=0=1=0.2"
+        mhe = index_encoding.indices_to_multi_hot(idx, params, self.sym_dicts)
+        idx2, params2 = index_encoding.multi_hot_to_indices(mhe, self.sym_dicts)
+        assert (idx2 == idx).all()
+        out = index_encoding.from_indices(idx2, params2, self.rev_dicts, encode_params=False)
+        assert out == ["H=0=nop=nop0@X=1=nop=nop1@RX=1=0=nop2@XX=0=3=nop3@XY=0=1=nop4"]
+
+    def test_remap(self):
+        idx, params = index_encoding.to_indices(self.q_strs, self.sym_dicts)
+        mhe = index_encoding.indices_to_multi_hot(idx, params, self.sym_dicts)
+        # append-only extension: the indices do not change
+        new_dicts, new_rev = one_hot.extend_symbol_dictionary(self.sym_dicts,
+                                                              [{'CNOT'}, {'2', '3'}, {'2'}])
+        assert (index_encoding.remap_indices(idx, self.sym_dicts, new_dicts) == idx).all()
+        ref = index_encoding.indices_to_multi_hot(idx, params, new_dicts)
+        assert numpy.allclose(multi_hot.remap_multi_hot(mhe, self.sym_dicts, new_dicts), ref)
+        mhe_t = multi_hot.remap_multi_hot(torch.as_tensor(mhe), self.sym_dicts, new_dicts)
+        assert numpy.allclose(mhe_t.numpy(), ref)
+
+        # arbitrary new dictionaries
+        new_dicts = [{k: len(d) - 1 - v for k, v in d.items()} for d in new_dicts]
+        new_rev = [{v: k for k, v in d.items()} for d in new_dicts]
+        idx_new = index_encoding.remap_indices(torch.as_tensor(idx), self.sym_dicts, new_dicts)
+        assert index_encoding.from_indices(idx_new, params, new_rev) \
+               == index_encoding.from_indices(idx, params, self.rev_dicts)
+        out = numpy.empty(mhe.shape[:-1] + (sum(len(d) for d in new_dicts) + 1,))
+        multi_hot.remap_multi_hot(mhe, self.sym_dicts, new_dicts, out=out)
+        assert numpy.allclose(out, index_encoding.indices_to_multi_hot(idx_new.numpy(), params,
+                                                                       new_dicts))
+        try:
+            index_encoding.remap_indices(idx, new_dicts, self.sym_dicts)
+            assert False
+        except ValueError:
+            pass
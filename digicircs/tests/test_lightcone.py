@@ -0,0 +1,24 @@
+from digicircs.utils import lightcone
+
+class TestLightCone():
+    '''
+    Tests for functions in lightcone.py
+    '''
+    def test_light_cone(self):
+        q_str = "H=0=nop=nop@CNOT=1=0=nop@X=5=nop=nop@CRX=4=1=0.2@RZ=3=nop=0.3@H=4=nop=nop"
+        pruned, qubit_map = lightcone.light_cone(q_str, [0])
+        assert pruned == "H=0=nop=nop@CNOT=1=0=nop"
+        assert qubit_map == {0: 0, 1: 1}
+        pruned, qubit_map = lightcone.light_cone(q_str, [4])
+        assert pruned == "H=0=nop=nop@CNOT=1=0=nop@CRX=2=1=0.2@H=2=nop=nop"
+        assert qubit_map == {0: 0, 1: 1, 4: 2}
+        # qubits without gates stay in the register
+        pruned, qubit_map = lightcone.light_cone(q_str, [2, 3])
+        assert pruned == "RZ=1=nop=0.3" and qubit_map == {2: 0, 3: 1}
+        terms = lightcone.remap_terms({((4, "Z"), (0, "X")): 0.5}, {0: 0, 1: 1, 4: 2})
+        assert terms == {((2, "Z"), (0, "X")): 0.5}
+
+    def test_light_cone_mask(self):
+        keep, in_cone = lightcone.light_cone_mask([0, 1, 2, 3], [-1, 0, 1, -1], [2], n_qubit=5)
+        assert keep.tolist() == [True, True, True, False]
+        assert in_cone.tolist() == [True, True, True, False, False]
@@ -0,0 +1,48 @@
+import numpy
+from digicircs import metrics
+
+DEEP = "@".join("RY={}=nop=0.1@RZ={}=nop=0.2@CNOT={}={}=nop".format(q, q, (q + 1) % 3, q)
+                for layer in range(8) for q in range(3))
+
+class TestMetrics():
+    def test_expressibility(self):
+        # a product of RX rotations is far from Haar, a deep circuit is close
+        shallow = metrics.expressibility("RX=0=nop=0.1@RX=1=nop=0.2", 2000, rand_seed=0)
+        deep = metrics.expressibility(DEEP, 2000, rand_seed=0, batch_size=300)
+        assert deep < 0.05 < shallow
+        assert numpy.isclose(metrics.haar_fidelity_bins(3, 20).sum(), 1)
+
+    def test_entangling_capability(self):
+        assert metrics.entangling_capability("RX=0=nop=0.1@RY=1=nop=nop", 100,
+                                             rand_seed=0) < 1e-12
+        # Haar average of the Meyer-Wallach measure: (d - 2) / (d + 1)
+        value = metrics.entangling_capability(DEEP, 2000, rand_seed=0)
+        assert abs(value - 6 / 9) < 0.03
+        bell = numpy.array([[1, 0, 0, 1]]) / numpy.sqrt(2)
+        assert numpy.allclose(metrics.meyer_wallach(bell, 2), 1)
+
+    def test_evaluate_circuits(self):
+        q_strs = ["RX=0=nop=0.1@RX=1=nop=0.2", DEEP]
+        serial = metrics.evaluate_circuits(q_strs, n_workers=1, rand_seed=3, n_samples=200,
+                                           n_bins=20)
+        pooled = metrics.evaluate_circuits(q_strs, n_workers=2, rand_seed=3, n_samples=200,
+                                           n_bins=20)
+        for name in ["expressibility", "entangling_capability"]:
+            assert serial[name].shape == (2,)
+            assert numpy.allclose(serial[name], pooled[name])
+
+    def test_no_params(self):
+        # circuits without parameterized gates give one fixed state
+        assert metrics.expressibility("H=0=nop=nop", 100, rand_seed=0) > 1
+        assert metrics.entangling_capability("H=0=nop=nop@CNOT=1=0=nop", 50,
+                                             rand_seed=0) > 1 - 1e-12
+
+    def test_unknown_kwargs(self):
+        try:
+            metrics.evaluate_circuits(["H=0=nop=nop"], n_workers=1, n_sample=5)
+            assert False
+        except TypeError:
+            pass
+        out = metrics.evaluate_circuits(["H=0=nop=nop"], metrics=("entangling_capability",),
+                                        n_workers=1, n_samples=5)
+        assert out["entangling_capability"].shape == (1,)
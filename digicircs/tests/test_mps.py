@@ -0,0 +1,48 @@
+import numpy
+from digicircs import mps, simulator, observables, gen_circuit
+
+class TestMPS():
+    def test_exact(self):
+        # without truncation the MPS is exact, also with distant pairs
+        for seed in range(5):
+            q_str = gen_circuit.circuit_from_scratch(6, 30, rand_seed=seed)[0]
+            state = mps.simulate_mps(q_str, n_qubit=6)
+            assert numpy.allclose(state.to_statevector(), simulator.simulate(q_str, n_qubit=6))
+            assert state.truncation_error < 1e-10
+
+    def test_expectation(self):
+        ham = {(): 0.5, ((0, "Z"), (4, "Z")): 1.0, ((1, "X"), (2, "Y")): -0.7,
+               ((3, "Y"),): 0.2, ((0, "X"), (2, "Z"), (5, "X")): 0.4}
+        for seed in range(3):
+            q_str = gen_circuit.circuit_from_scratch(6, 25, rand_seed=seed)[0]
+            ref = observables.expectation(q_str, ham, n_qubit=6)
+            values, error = mps.expectation(q_str, [ham, {((2, "Z"),): 1.0}], n_qubit=6)
+            assert numpy.isclose(values[0], ref)
+            assert numpy.isclose(values[1], observables.expectation(q_str, {((2, "Z"),): 1.0},
+                                                                    n_qubit=6))
+            assert error < 1e-10
+
+    def test_truncation(self):
+        rng = numpy.random.default_rng(4)
+        # brickwork of nearest-neighbour gates
+        q_str = "@".join("RY={}=nop={}@XY={}={}={}".format(q, rng.uniform(0, 3), q, q + 1,
+                                                          rng.uniform(0, 3))
+                         for layer in range(6) for q in range(layer % 2, 7, 2))
+        state = mps.simulate_mps(q_str, n_qubit=8, max_bond=2)
+        assert max(state.bond_dims()) <= 2
+        assert state.truncation_error > 0
+        # the truncated state stays normalized
+        assert numpy.isclose(numpy.linalg.norm(state.to_statevector()), 1)
+
+    def test_wide_chain(self):
+        n_qubit = 60
+        q_str = "@".join(["H=0=nop=nop"] + ["CNOT={}={}=nop".format(q + 1, q)
+                                            for q in range(n_qubit - 1)])
+        state = mps.simulate_mps(q_str, max_bond=4)
+        assert state.n_qubit == n_qubit and max(state.bond_dims()) == 2
+        ghz = {((0, "Z"), (n_qubit - 1, "Z")): 1.0, ((0, "Z"),): 1.0}
+        assert numpy.isclose(state.expectation(ghz), 1.0)
+        # long range gate through SWAPs
+        state.apply_gate("CNOT", 0, n_qubit - 1)
+        assert state.n_swaps > 0
+        assert numpy.isclose(state.expectation({((0, "Z"), (n_qubit - 1, "Z")): 1.0}), 0.0)
@@ -0,0 +1,80 @@
+import numpy
+import functools
+from digicircs import observables, simulator, gen_circuit
+
+def _dense_ham(terms, n_qubit):
+    mat = numpy.zeros((2**n_qubit, 2**n_qubit), dtype=complex)
+    for term, coeff in terms.items():
+        paulis = dict(term)
+        mat += coeff * functools.reduce(numpy.kron, [simulator.PAULI_MATRICES[paulis.get(q, "I")]
+                                                     for q in range(n_qubit)])
+    return mat
+
+def _random_ham(n_qubit, n_terms, rng):
+    ham = {(): rng.normal()}
+    for _ in range(n_terms):
+        qubits = rng.choice(n_qubit, size=rng.integers(1, n_qubit + 1), replace=False)
+        ham[tuple((int(q), str(rng.choice(list("XYZ")))) for q in qubits)] = rng.normal()
+    return ham
+
+class TestObservables():
+    def test_bell(self):
+        ham = {((0, "Z"), (1, "Z")): 1.0, ((0, "X"),): 0.5, ((0, "Y"), (1, "Y")): 2.0}
+        value = observables.expectation("H=0=nop=nop@CNOT=1=0=nop", ham)
+        assert numpy.isclose(value, 1.0 - 2.0)
+
+    def test_random(self):
+        rng = numpy.random.default_rng(1)
+        n_qubit = 4
+        hams = [_random_ham(n_qubit, 12, rng) for _ in range(3)]
+        q_strs = [gen_circuit.circuit_from_scratch(n_qubit, 15, rand_seed=s)[0] for s in range(4)]
+        values = observables.expectation(q_strs, hams, n_qubit=n_qubit)
+        assert values.shape == (4, 3)
+        for i, q_str in enumerate(q_strs):
+            psi = simulator.simulate(q_str, n_qubit=n_qubit)
+            for j, ham in enumerate(hams):
+                ref = numpy.vdot(psi, _dense_ham(ham, n_qubit) @ psi).real
+                assert numpy.isclose(values[i, j], ref)
+
+    def test_params_batch(self):
+        q_str = "RY=0=nop=0.1@CNOT=1=0=nop"
+        ham = {((1, "Z"),): 1.0}
+        params = numpy.linspace(0, numpy.pi, 5)[:, None]
+        values = observables.expectation(q_str, ham, params=params)
+        assert numpy.allclose(values, numpy.cos(params[:, 0]))
+
+    def test_grouping(self):
+        terms = [((0, "X"), (1, "X")), ((0, "X"),), ((1, "Z"),), ((1, "X"),), ()]
+        groups = observables.group_qubitwise_commuting(terms)
+        assert sorted(len(g[1]) for g in groups) == [1, 4]
+        for basis, members in groups:
+            for term in members:
+                assert all(basis[q] == p for q, p in term)
+        signs = observables.parity_signs([((0, "Z"),), ((0, "Z"), (1, "Z"))], 2)
+        assert numpy.allclose(signs, [[1, 1, -1, -1], [1, -1, -1, 1]])
+
+    def test_terms_object(self):
+        class Operator:
+            terms = {((0, "Z"),): 1.0}
+        assert numpy.isclose(observables.expectation("X=0=nop=nop", Operator()), -1.0)
+
+    def test_local_expectation(self):
+        ham = {((0, "Z"),): 1.0, ((2, "X"), (3, "Y")): 0.5, (): 0.1, ((7, "Y"),): 0.3}
+        for seed in range(3):
+            q_str = gen_circuit.circuit_from_scratch(8, 30, rand_seed=seed)[0]
+            ref = observables.expectation(q_str, ham, n_qubit=8)
+            values = observables.local_expectation(q_str, [ham, {((5, "Z"),): 1.0}])
+            assert values.shape == (2,)
+            assert numpy.isclose(values[0], ref)
+        # 40 qubits, but the light cones of the terms are small
+        q_str = "@".join("RY={}=nop=0.{}@CNOT={}={}=nop".format(q, q, q + 1, q)
+                         for layer in range(3) for q in range(layer % 2, 39, 2))
+        value = observables.local_expectation(q_str, {((20, "Z"), (21, "Z")): 1.0})
+        assert -1 <= value <= 1
+
+    def test_factorized_expectation(self):
+        q_str = "RY=0=nop=0.3@CNOT=2=0=nop@RX=1=nop=0.7@XY=3=1=0.4@RZ=4=nop=1.0@H=4=nop=nop"
+        hams = [{((0, "Z"), (1, "Z")): 1.0, ((2, "X"), (4, "X"), (3, "Y")): 0.3, (): 0.2},
+                {((5, "Z"),): 1.0, ((1, "Y"),): -0.5}]
+        values = observables.factorized_expectation(q_str, hams)
+        assert numpy.allclose(values, observables.expectation(q_str, hams, n_qubit=6))
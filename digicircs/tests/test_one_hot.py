@@ -47,6 +47,27 @@ class TestOneHot():
         assert set(rev_dicts[1].values()) == set(ref_rev_dicts[1].values())
         assert set(rev_dicts[2].values()) == set(ref_rev_dicts[2].values())
 
+    def test_extend_symbol_dictionary(self):
+        sym_dicts = [{'H': 0, 'nop': 1}, {'0': 0, '1': 1}, {'nop': 0, '0': 1}]
+        new_dicts, rev_dicts = one_hot.extend_symbol_dictionary(sym_dicts,
+                                    [{'X', 'H'}, {'10', '2'}, {'2'}])
+        assert new_dicts[0] == {'H': 0, 'nop': 1, 'X': 2}
+        assert new_dicts[1] == {'0': 0, '1': 1, '2': 2, '10': 3}
+        assert new_dicts[2] == {'nop': 0, '0': 1, '2': 2}
+        assert rev_dicts[1][3] == '10'
+        # the input dictionaries are not modified
+        assert sym_dicts[0] == {'H': 0, 'nop': 1}
+
+    def test_remap_one_hot(self):
+        sym_dicts = [{'H': 0, 'nop': 1}, {'0': 0, '1': 1}, {'nop': 0, '0': 1}]
+        unary_strs = one_hot.get_unary_string(sym_dicts)
+        q_str = "H=1=0=nop"
+        ohe = one_hot.to_one_hot(q_str, 2, sym_dicts, unary_strs)[1]
+        new_dicts, new_rev = one_hot.extend_symbol_dictionary(sym_dicts, [{'X'}, {'2'}, {'2'}])
+        ohe_new = one_hot.remap_one_hot(ohe, sym_dicts, new_dicts)
+        ref = one_hot.to_one_hot(q_str, 2, new_dicts, one_hot.get_unary_string(new_dicts))[1]
+        assert ohe_new == ref
+
     def test_get_unary_string(self):
         sym_dicts = [{'X': 0, 'XY': 1, 'H': 2, 'RX': 3, 'RY': 4, 'nop': 5, 'Y': 6, 'XX': 7, 'ZZ': 8}, \
                      {'0': 0, '1': 1, 'nop': 2}, {'3': 0, '0': 1, 'nop': 2, '1': 3}]
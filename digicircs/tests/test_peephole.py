@@ -0,0 +1,32 @@
+from digicircs.utils import peephole
+
+class TestPeephole():
+    '''
+    Tests for functions in peephole.py
+    '''
+    def test_cancel_self_inverse(self):
+        q_str = "H=0=nop=nop@X=1=nop=nop@H=0=nop=nop@CNOT=1=2=nop@CNOT=1=2=nop@X=1=nop=nop"
+        out, stats = peephole.optimize_qstring(q_str, return_stats=True)
+        assert out == ""
+        assert stats["n_cancelled"] == 6
+        # CNOTs with swapped target and control do not cancel
+        q_str = "CNOT=1=2=nop@CNOT=2=1=nop"
+        assert peephole.optimize_qstring(q_str) == q_str
+
+    def test_merge_rotations(self):
+        q_str = "RZ=0=nop=0.1@H=1=nop=nop@RZ=0=nop=0.2@CRX=1=0=0.3@RZ=0=nop=0.4"
+        out = peephole.optimize_qstring(q_str)
+        assert out == "RZ=0=nop=0.3@H=1=nop=nop@CRX=1=0=0.3@RZ=0=nop=0.4"
+        q_str = "XY=0=1=0.5@YX=1=0=-0.5@RX=2=nop=0.0@RY=2=nop=a@RY=2=nop=b"
+        out, stats = peephole.optimize_qstring(q_str, return_stats=True)
+        assert out == "RY=2=nop=a@RY=2=nop=b"
+        assert stats["n_merged"] == 1
+        assert stats["n_dropped"] == 2
+
+    def test_optimize_qstrings(self):
+        q_strs = ["H=0=nop=nop@H=0=nop=nop@X=1=nop=nop", "RX=0=nop=0.2@RX=0=nop=0.3"]
+        out, stats = peephole.optimize_qstrings(q_strs)
+        assert out == ["X=1=nop=nop", "RX=0=nop=0.5"]
+        assert stats["n_gates_in"] == 5
+        assert stats["n_gates_out"] == 2
+        assert abs(stats["reduction"] - 0.6) < 1e-12
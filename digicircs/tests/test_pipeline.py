@@ -0,0 +1,51 @@
+import time
+from digicircs import pipeline, gen_circuit
+from digicircs.utils import misc
+class TestPipeline():
+    def test_pipeline_order(self):
+        stages = [pipeline.Stage("square", lambda x: x * x, workers=3),
+                  pipeline.Stage("odd", lambda x: x if x % 2 else None, executor="inline")]
+        pipe = pipeline.Pipeline(stages, queue_size=4)
+        out = pipe.run(range(20))
+        assert out == [x * x for x in range(20) if x % 2]
+        stats = pipe.throughput()
+        assert stats["square"]["items_in"] == 20
+        assert stats["odd"]["items_out"] == 10
+
+    def test_pipeline_process(self):
+        q_strs = [gen_circuit.circuit_from_scratch(3, 5, rand_seed=i)[0] for i in range(8)]
+        pipe = pipeline.Pipeline([pipeline.Stage("count", misc.get_num_gates_qstring,
+                                                 workers=2, executor="process")])
+        assert pipe.run(q_strs) == [5] * 8
+
+    def test_pipeline_backpressure(self):
+        produced = []
+        def source():
+            for i in range(30):
+                produced.append(i)
+                yield i
+        processed = []
+        def slow(x):
+            time.sleep(0.002)
+            processed.append(x)
+            return x
+        ahead = []
+        def fast(x):
+            ahead.append(len(produced) - len(processed))
+            return x
+        pipe = pipeline.Pipeline([pipeline.Stage("fast", fast),
+                                  pipeline.Stage("slow", slow)], queue_size=2)
+        pipe.run(source(), sink=lambda x: None)
+        # items in flight are bounded by the queue sizes
+        assert max(ahead) <= 8
+        assert len(processed) == 30
+
+    def test_pipeline_error(self):
+        def fail(x):
+            raise ValueError("bad item")
+        pipe = pipeline.Pipeline([pipeline.Stage("fail", fail)])
+        try:
+            pipe.run(range(5))
+            assert False
+        except ValueError:
+            pass
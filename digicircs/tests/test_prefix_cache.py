@@ -0,0 +1,42 @@
+import numpy
+from digicircs import prefix_cache, simulator, gen_circuit
+
+class TestPrefixCache():
+    def test_mutations(self):
+        q_str = gen_circuit.circuit_from_scratch(4, 40, rand_seed=0)[0]
+        evaluator = prefix_cache.PrefixEvaluator(n_qubit=4, checkpoint_every=5)
+        assert numpy.allclose(evaluator.state(q_str), simulator.simulate(q_str, n_qubit=4))
+        gates = q_str.split("@")
+        for pos in [30, 12, 39]:
+            mutated = "@".join(gates[:pos] + ["H=1=nop=nop"] + gates[pos+1:])
+            assert numpy.allclose(evaluator.state(mutated), simulator.simulate(mutated, n_qubit=4))
+        info = evaluator.info()
+        assert info["misses"] == 1 and info["hits"] == 3
+        # resumed from the checkpoints at 30, 10 and 35 gates
+        assert info["gates_skipped"] == 30 + 10 + 35
+        assert info["gates_simulated"] == 40 + 10 + 30 + 5
+
+    def test_eviction(self):
+        q_str = gen_circuit.circuit_from_scratch(3, 20, rand_seed=1)[0]
+        state_bytes = 2**3 * 16
+        evaluator = prefix_cache.PrefixEvaluator(n_qubit=3, checkpoint_every=2,
+                                                 max_bytes=3 * state_bytes)
+        evaluator.state(q_str)
+        info = evaluator.info()
+        assert info["checkpoints"] == 3 and info["bytes"] <= 3 * state_bytes
+        assert info["evictions"] == 7
+        value = evaluator.expectation(q_str, {((0, "Z"),): 1.0})
+        assert evaluator.info()["hits"] == 1
+        psi = simulator.simulate(q_str, n_qubit=3)
+        assert numpy.isclose(value, numpy.sum(numpy.abs(psi[:4])**2) - numpy.sum(numpy.abs(psi[4:])**2))
+
+    def test_returned_state_is_not_cached(self):
+        q_str = "H=0=nop=nop@CNOT=1=0=nop@RX=1=nop=0.3@H=2=nop=nop"
+        evaluator = prefix_cache.PrefixEvaluator(n_qubit=3, checkpoint_every=2)
+        ref = simulator.simulate(q_str, n_qubit=3)
+        for _ in range(2):
+            # the second call is a full-prefix hit
+            state = evaluator.state(q_str)
+            assert numpy.allclose(state, ref)
+            state[:] = 0
+        assert numpy.allclose(evaluator.state(q_str), ref)
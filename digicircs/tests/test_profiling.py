@@ -0,0 +1,66 @@
+import sys
+import json
+import types
+import numpy
+import tracemalloc
+from digicircs import profiling, one_hot, gen_circuit
+
+class TestProfiling():
+    def test_profile(self):
+        original = one_hot.to_one_hot
+        q_str = "H=0=nop=nop@X=1=nop=nop@RX=1=0=0.1"
+        sym_dicts = [{'H': 0, 'X': 1, 'RX': 2, 'nop': 3}, {'0': 0, '1': 1}, {'nop': 0, '0': 1}]
+        unary = one_hot.get_unary_string(sym_dicts)
+        with profiling.profile(modules=["digicircs.one_hot", "digicircs.gen_circuit"],
+                               track_memory=True) as prof:
+            assert profiling.is_enabled()
+            assert one_hot.to_one_hot is not original
+            for i in range(3):
+                one_hot.to_one_hot(q_str, 4, sym_dicts, unary)
+            gen_circuit.gen_circuit_gates(n_qubit=4, n_moments=2, rand_seed=0)
+        assert not profiling.is_enabled()
+        assert one_hot.to_one_hot is original
+
+        stats = prof.stats
+        assert stats["one_hot.to_one_hot"]["calls"] == 3
+        assert stats["one_hot.to_one_hot"]["items"] == 9
+        assert stats["one_hot.to_one_hot"]["peak_bytes"] >= 0
+        # nested calls through module attributes are recorded as well
+        assert stats["gen_circuit.gen_circuit_topology"]["calls"] == 1
+        assert stats["gen_circuit.gen_gates_one_moment"]["calls"] == 2
+        assert "_gen_random_idx" not in str(list(stats))
+        assert json.loads(prof.to_json())["one_hot.to_one_hot"]["calls"] == 3
+        assert "one_hot.to_one_hot" in prof.to_table()
+
+    def test_user_tracemalloc(self):
+        # a tracing session started by the user survives the profiler
+        tracemalloc.start()
+        try:
+            with profiling.profile(modules=["digicircs.one_hot"], track_memory=True):
+                pass
+            assert tracemalloc.is_tracing()
+        finally:
+            tracemalloc.stop()
+        with profiling.profile(modules=["digicircs.one_hot"], track_memory=True):
+            assert tracemalloc.is_tracing()
+        assert not tracemalloc.is_tracing()
+
+    def test_peak_memory(self):
+        # temporary allocations freed before returning are counted
+        def make_temp():
+            return int(numpy.ones(2**20).sum())
+        def outer():
+            make_temp()
+            return fake.make_temp()
+        fake = types.ModuleType("digicircs_fake_module")
+        fake.make_temp, fake.outer = make_temp, outer
+        make_temp.__module__ = outer.__module__ = fake.__name__
+        sys.modules[fake.__name__] = fake
+        try:
+            with profiling.profile(modules=[fake.__name__], track_memory=True) as prof:
+                fake.outer()
+        finally:
+            del sys.modules[fake.__name__]
+        for name in ["make_temp", "outer"]:
+            peak = prof.stats["digicircs_fake_module." + name]["peak_bytes"]
+            assert 8 * 2**20 <= peak < 9 * 2**20
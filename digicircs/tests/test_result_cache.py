@@ -0,0 +1,47 @@
+import os
+import tempfile
+from digicircs.result_cache import ResultCache, cached
+from digicircs.utils import misc
+class TestResultCache():
+    def test_result_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file_name = os.path.join(tmp, "cache.sqlite")
+            cache = ResultCache(file_name, max_entries=3)
+            for i in range(5):
+                cache.put(str(i), {"value": i})
+            assert len(cache) == 3 and "0" not in cache
+            assert cache.get("1") is None
+            assert cache.get("2") == {"value": 2}
+            # "2" was used last, so "3" is evicted first
+            cache.put("5", 5)
+            assert "3" not in cache and "2" in cache
+            assert cache.info()["evictions"] == 3
+            cache.close()
+            # persistent
+            cache = ResultCache(file_name, max_bytes=100)
+            assert cache.get("5") == 5
+            cache.put("big", "x" * 80)
+            assert cache.n_bytes() <= 100 and "big" in cache
+
+    def test_cached_evaluator(self):
+        calls = []
+        def n_gates(q_str):
+            calls.append(q_str)
+            return misc.get_num_gates_qstring(q_str)
+        cache = ResultCache()
+        func = cached(n_gates, cache, relabel_qubits=True)
+        assert func("H=0=nop=nop@CNOT=1=0=nop@X=2=nop=nop") == 3
+        assert func("X=2=nop=nop@H=0=nop=nop@CNOT=1=0=nop") == 3
+        assert func("H=1=nop=nop@CNOT=0=1=nop@X=2=nop=nop") == 3
+        assert len(calls) == 1
+        assert cache.hits == 2 and cache.misses == 1
+
+    def test_cached_canonical_kwargs(self):
+        def first_target(q_str):
+            return int(q_str.split("=")[1])
+        cache = ResultCache()
+        relabelled = cached(first_target, cache, relabel_qubits=True)
+        plain = cached(first_target, cache)
+        # "H=1" is relabelled to "H=0", the plain wrapper must not read its entry
+        assert relabelled("H=1=nop=nop") == 1
+        assert plain("H=0=nop=nop") == 0
@@ -0,0 +1,73 @@
+import numpy
+import torch
+from digicircs import sampling, decoder, index_encoding
+from digicircs.gate_set import GateSet
+
+class TestSampling():
+    sym_dicts = [{'H': 0, 'CNOT': 1, 'RX': 2, 'FOO': 3, 'nop': 4},
+                 {'0': 0, '1': 1, '2': 2, '3': 3},
+                 {'nop': 0, '0': 1, '1': 2, '2': 3, '3': 4}]
+    rev_dicts = [{v: k for k, v in d.items()} for d in sym_dicts]
+
+    def _check(self, idx, max_dist=None):
+        idx = numpy.asarray(idx).reshape(-1, 3)
+        params = numpy.full(idx.shape[0], 0.1)
+        for g_str in index_encoding.from_indices(idx, params, self.rev_dicts).split("@"):
+            # valid gates are not modified by the preprocessing
+            g_out = decoder.gate_preprocess(g_str).split("=")
+            assert g_out[:3] == g_str.split("=")[:3]
+            name, targ, ctrl = g_str.split("=")[:3]
+            if name == "CNOT" and max_dist is not None:
+                assert abs(int(targ) - int(ctrl)) <= max_dist
+
+    def test_sample_numpy(self):
+        grammar = sampling.GrammarMask(self.sym_dicts, max_dist=1)
+        rng = numpy.random.default_rng(3)
+        # logits favoring invalid symbols
+        shape = (16, 10)
+        gate_logits = rng.normal(size=shape + (5,))
+        gate_logits[..., 3:] += 10
+        targ_logits = rng.normal(size=shape + (4,))
+        ctrl_logits = rng.normal(size=shape + (5,))
+        ctrl_logits[..., 0] += 10
+        idx = sampling.sample_indices(gate_logits, targ_logits, ctrl_logits, grammar,
+                                      rand_seed=5)
+        assert idx.shape == shape + (3,) and idx.dtype == numpy.int16
+        self._check(idx, max_dist=1)
+        assert set(numpy.unique(idx[..., 0])) <= {0, 1, 2}
+
+        # greedy and top-1 sampling agree
+        out = numpy.zeros(shape + (3,), dtype=numpy.int16)
+        idx0 = sampling.sample_indices(gate_logits, targ_logits, ctrl_logits, grammar,
+                                       temperature=0, out=out)
+        idx1 = sampling.sample_indices(gate_logits, targ_logits, ctrl_logits, grammar,
+                                       top_k=1, rand_seed=1)
+        assert idx0 is out and (idx0 == idx1).all()
+
+    def test_sample_torch(self):
+        gate_set = GateSet(sgates_1q=["H"], sgates_2q=["CNOT"])
+        grammar = sampling.GrammarMask(self.sym_dicts, gate_set=gate_set, n_qubit=3)
+        gen = torch.Generator().manual_seed(0)
+        shape = (8, 12)
+        idx = sampling.sample_indices(torch.randn(shape + (5,), generator=gen),
+                                      torch.randn(shape + (4,), generator=gen),
+                                      torch.randn(shape + (5,), generator=gen),
+                                      grammar, temperature=2., top_k=3, rand_seed=gen)
+        assert idx.shape == shape + (3,)
+        self._check(idx)
+        assert set(idx[..., 0].unique().tolist()) <= {0, 1}
+        assert idx[..., 1].max() < 3
+
+    def test_allow_nop(self):
+        grammar = sampling.GrammarMask(self.sym_dicts, allow_nop=True)
+        gate_logits = numpy.zeros((4, 5))
+        gate_logits[:, 4] = 100
+        idx = sampling.sample_indices(gate_logits, numpy.zeros((4, 4)), numpy.zeros((4, 5)),
+                                      grammar, rand_seed=0)
+        assert (idx == [4, 0, 0]).all()
+
+    def test_exact_names(self):
+        # gate names are case-sensitive, as in the decoder
+        sym_dicts = [{'h': 0, 'CNOT': 1, 'Rx': 2, 'nop': 3}] + self.sym_dicts[1:]
+        grammar = sampling.GrammarMask(sym_dicts)
+        assert grammar.gate_valid.tolist() == [False, True, False, False]
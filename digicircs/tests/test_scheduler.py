@@ -0,0 +1,32 @@
+from digicircs.utils import scheduler
+
+class TestScheduler():
+    '''
+    Tests for functions in scheduler.py
+    '''
+    def test_asap_moments(self):
+        moments = scheduler.asap_moments([0, 1, 2, 0, 3], [-1, -1, 1, -1, -1])
+        assert list(moments) == [0, 0, 1, 1, 0]
+        # a greedy layering that resets the layer would need 3 moments
+        moments = scheduler.asap_moments([0, 0, 1, 1], [-1, -1, -1, -1])
+        assert list(moments) == [0, 1, 0, 1]
+        assert scheduler.count_moments(moments) == 2
+
+    def test_asap_moments_span(self):
+        moments = scheduler.asap_moments([1, 0, 1], [-1, 2, -1], span=True)
+        assert list(moments) == [0, 1, 2]
+        moments = scheduler.asap_moments([1, 0, 1], [-1, 2, -1])
+        assert list(moments) == [0, 0, 1]
+
+    def test_schedule_qstrings(self):
+        q_strs = ["H=0=nop=nop@X=1=nop=nop@RX=1=0=0.1@RY=0=1=0.2",
+                  "CNOT=0=1=nop@CNOT=1=2=nop@H=3=nop=nop",
+                  "H=2=nop=nop"]
+        out = scheduler.schedule_qstrings(q_strs)
+        for q_str, moments in zip(q_strs, out):
+            assert list(moments) == list(scheduler.schedule_qstring(q_str))
+        assert list(out[1]) == [0, 1, 0]
+
+    def test_group_by_moment(self):
+        groups = scheduler.group_by_moment([0, 0, 1, 1, 0])
+        assert [list(g) for g in groups] == [[0, 1, 4], [2, 3]]
@@ -0,0 +1,103 @@
+import functools
+import numpy
+from digicircs import search, simulator
+from digicircs.result_cache import ResultCache
+
+SYM_DICTS = [{'H': 0, 'RX': 1, 'RY': 2, 'CNOT': 3, 'CRZ': 4, 'nop': 5},
+             {'0': 0, '1': 1, '2': 2, 'nop': 3},
+             {'nop': 0, '0': 1, '1': 2, '2': 3}]
+
+def ghz_fidelity(q_str):
+    # overlap with the 3-qubit GHZ state, top level to be picklable
+    state = simulator.simulate(q_str, n_qubit=3)
+    return abs(state[0] + state[-1])**2 / 2
+
+def n_cnots(q_str):
+    return sum(g.startswith("CNOT=") for g in q_str.split("@") if g)
+
+class TestSearch():
+    def test_operators(self):
+        ga = search.GeneticSearch(n_cnots, SYM_DICTS, n_gates=8, population_size=16,
+                                  max_dist=1, rand_seed=0)
+        assert ga.idx.shape == (16, 8, 3) and ga.params.shape == (16, 8)
+        for q_str in ga.decode():
+            assert len(q_str.split("@")) == 8
+        ga.scores = ga.evaluate(ga.decode())
+        p1, p2 = numpy.arange(8), numpy.arange(8, 16)
+        idx, params = ga.one_point_crossover(p1, p2)
+        for k in range(8):
+            cut = numpy.argmax(numpy.any(idx[k] != ga.idx[p1[k]], axis=1) |
+                               (params[k] != ga.params[p1[k]]))
+            assert (idx[k, cut:] == ga.idx[p2[k], cut:]).all()
+        idx, params = ga.moment_crossover(p1, p2)
+        mutated, _ = ga.mutate(idx, params)
+        for q_str in ga.decode(mutated, params):
+            gates = [g.split("=") for g in q_str.split("@")]
+            assert len(gates) == 8
+            for name, targ, ctrl, _ in gates:
+                assert (ctrl == "nop") == (name in ["H", "RX", "RY"])
+                assert ctrl == "nop" or abs(int(targ) - int(ctrl)) == 1
+
+    def test_moment_crossover(self):
+        ga = search.GeneticSearch(n_cnots, SYM_DICTS, n_gates=6, population_size=2,
+                                  allow_nop=True, rand_seed=1)
+        ga.idx, ga.params = numpy.array(
+            [[[0, 0, 0], [0, 1, 0], [3, 1, 1], [1, 2, 0], [5, 3, 0], [5, 3, 0]],
+             [[2, 0, 0], [2, 1, 0], [2, 2, 0], [4, 2, 2], [5, 3, 0], [5, 3, 0]]], dtype=numpy.int16), \
+            numpy.full((2, 6), 0.5, dtype=numpy.float32)
+        assert (ga.moments() == [[0, 0, 1, 0, -1, -1], [0, 0, 0, 1, -1, -1]]).all()
+        seen = set()
+        for _ in range(20):
+            q_str = ga.decode(*ga.moment_crossover(numpy.array([0]), numpy.array([1])))[0]
+            seen.add(q_str)
+        # cut at moment 0, 1 and 2
+        assert seen == {"RY=0=nop=0.5@RY=1=nop=0.5@RY=2=nop=0.5@CRZ=2=1=0.5",
+                        "H=0=nop=0.5@H=1=nop=0.5@RX=2=nop=0.5@CRZ=2=1=0.5",
+                        "H=0=nop=0.5@H=1=nop=0.5@CNOT=1=0=0.5@RX=2=nop=0.5"}
+
+    def test_run(self, tmp_path):
+        cache = ResultCache()
+        ga = search.GeneticSearch(ghz_fidelity, SYM_DICTS, n_gates=4, population_size=48,
+                                  max_dist=1, mutation_rate=0.2, cache=cache, rand_seed=2)
+        best, value = ga.run(60, target=1 - 1e-3, checkpoint_file=str(tmp_path / "ga.pkl"))
+        assert value > 1 - 1e-3 and numpy.isclose(ghz_fidelity(best), value)
+        assert cache.hits > 0
+        history = ga.history
+        assert all(h1["best"] <= ga.best[1] for h1 in history)
+
+        resumed = search.GeneticSearch(ghz_fidelity, SYM_DICTS, n_gates=4, population_size=48,
+                                       max_dist=1).load(str(tmp_path / "ga.pkl"))
+        assert resumed.generation == ga.generation and resumed.best == ga.best
+        assert (resumed.idx == ga.idx).all()
+
+    def test_early_stopping(self):
+        ga = search.GeneticSearch(lambda q_str: 1., SYM_DICTS, n_gates=3, population_size=8,
+                                  rand_seed=3)
+        ga.run(50, patience=4)
+        assert ga.generation == 5
+
+    def test_parallel(self):
+        kwargs = dict(n_gates=5, population_size=12, max_dist=1, rand_seed=4)
+        serial = search.GeneticSearch(n_cnots, SYM_DICTS, **kwargs)
+        pooled = search.GeneticSearch(n_cnots, SYM_DICTS, n_workers=2, **kwargs)
+        assert serial.run(5) == pooled.run(5)
+        assert serial.history == pooled.history
+
+    def test_shared_cache(self):
+        # two fitness functions sharing a cache do not read each other's values
+        cache = ResultCache()
+        kwargs = dict(n_gates=4, population_size=8, max_dist=1, cache=cache, rand_seed=5)
+        ghz = search.GeneticSearch(ghz_fidelity, SYM_DICTS, **kwargs)
+        cnots = search.GeneticSearch(n_cnots, SYM_DICTS, **kwargs)
+        q_strs = ghz.decode()
+        ghz.evaluate(q_strs)
+        assert numpy.array_equal(cnots.evaluate(q_strs), [n_cnots(q_str) for q_str in q_strs])
+        # lambdas and partials need an explicit name with a cache
+        for fitness in [lambda q_str: 1., functools.partial(n_cnots)]:
+            try:
+                search.GeneticSearch(fitness, SYM_DICTS, **kwargs)
+                assert False
+            except ValueError:
+                pass
+        named = search.GeneticSearch(lambda q_str: 2., SYM_DICTS, cache_name="two", **kwargs)
+        assert (named.evaluate(q_strs) == 2).all()
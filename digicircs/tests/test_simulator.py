@@ -0,0 +1,122 @@
+import numpy
+import functools
+from scipy.linalg import expm
+from digicircs import simulator, gen_circuit
+
+P = simulator.PAULI_MATRICES
+
+def _op(mats, n_qubit):
+    return functools.reduce(numpy.kron, [mats.get(q, P["I"]) for q in range(n_qubit)])
+
+def _dense(q_str, n_qubit):
+    '''
+    Reference statevector from dense matrices of the gates.
+    '''
+    psi = numpy.zeros(2**n_qubit, dtype=complex)
+    psi[0] = 1
+    proj0, proj1 = numpy.diag([1., 0.]), numpy.diag([0., 1.])
+    for name, targ, ctrl, theta in simulator.parse_gates(q_str, n_qubit)[0]:
+        if name in simulator._PAULI_PAIRS:
+            mat = expm(-0.5j * theta * _op({targ: P[name[0]], ctrl: P[name[1]]}, n_qubit))
+        else:
+            base = "X" if name == "CNOT" else name.lstrip("C") if name.startswith("CR") else name
+            if base.startswith("R"):
+                u = expm(-0.5j * theta * P[base[1]])
+            else:
+                u = simulator.STATIC_MATRICES[base]
+            if ctrl >= 0:
+                mat = _op({ctrl: proj0}, n_qubit) + _op({ctrl: proj1, targ: u}, n_qubit)
+            else:
+                mat = _op({targ: u}, n_qubit)
+        psi = mat @ psi
+    return psi
+
+class TestSimulator():
+    def test_bell(self):
+        state = simulator.simulate("H=0=nop=nop@CNOT=1=0=nop")
+        assert numpy.allclose(state, numpy.array([1, 0, 0, 1]) / numpy.sqrt(2))
+        # qubit 0 is the most significant bit
+        state = simulator.simulate("X=0=nop=nop", n_qubit=2)
+        assert numpy.allclose(state, [0, 0, 1, 0])
+
+    def test_random_circuits(self):
+        for seed in range(10):
+            q_str = gen_circuit.circuit_from_scratch(4, 20, rand_seed=seed)[0]
+            assert numpy.allclose(simulator.simulate(q_str, n_qubit=4), _dense(q_str, 4))
+
+    def test_params_batch(self):
+        q_str = "RX=0=nop=0.1@CRY=1=0=0.2@XY=0=1=0.3@H=1=nop=nop"
+        params = numpy.random.default_rng(0).uniform(-3, 3, size=(5, 3))
+        states = simulator.simulate(q_str, params=params)
+        assert states.shape == (5, 4)
+        for p, state in zip(params, states):
+            q_p = "RX=0=nop={}@CRY=1=0={}@XY=0=1={}@H=1=nop=nop".format(*p)
+            assert numpy.allclose(state, _dense(q_p, 2))
+        assert numpy.allclose(simulator.simulate(q_str, params=params[0]), states[0])
+
+    def test_batch_and_errors(self):
+        q_strs = ["H=0=nop=nop", "X=2=nop=nop"]
+        states = simulator.simulate_batch(q_strs)
+        assert states.shape == (2, 8)
+        assert numpy.isclose(states[1, 1], 1)
+        init = numpy.zeros(8)
+        init[1] = 1
+        assert numpy.allclose(simulator.simulate("X=2=nop=nop", initial_state=init)[0], 1)
+        for q_str in ["RX=0=nop=nop", "X=3=nop=nop"]:
+            try:
+                simulator.simulate(q_str, n_qubit=2)
+                assert False
+            except ValueError:
+                pass
+
+    def test_component_probabilities(self):
+        q_str = "RY=0=nop=0.3@CNOT=2=0=nop@RX=1=nop=0.7@XY=3=1=0.4@H=4=nop=nop"
+        states = simulator.component_states(q_str)
+        assert [qubits.tolist() for qubits, _ in states] == [[0, 2], [1, 3], [4]]
+        bits = simulator.unpack_bitstrings(numpy.arange(32), 5)
+        probs = numpy.abs(simulator.simulate(q_str))**2
+        assert numpy.allclose(simulator.outcome_probabilities(states, bits), probs)
+
+
+class TestShots():
+    def test_bell_counts(self):
+        outcomes, counts = simulator.sample_shots("H=0=nop=nop@CNOT=1=0=nop", 10000,
+                                                  rand_seed=0, chunk_size=999)
+        assert outcomes.tolist() == [0, 3]
+        assert counts.sum() == 10000
+        assert abs(counts[0] - 5000) < 300
+        bits = simulator.unpack_bitstrings(outcomes, 2)
+        assert bits.tolist() == [[0, 0], [1, 1]]
+
+    def test_distribution(self):
+        q_strs = [gen_circuit.circuit_from_scratch(3, 10, rand_seed=s)[0] for s in range(3)]
+        results = simulator.sample_shots(q_strs, 200000, n_qubit=3, rand_seed=1,
+                                         chunk_size=2**14)
+        assert len(results) == 3
+        for q_str, (outcomes, counts) in zip(q_strs, results):
+            probs = numpy.abs(simulator.simulate(q_str, n_qubit=3))**2
+            freq = numpy.zeros(8)
+            freq[outcomes.astype(int)] = counts / 200000
+            assert numpy.allclose(freq, probs, atol=0.01)
+
+    def test_chunked_counts(self):
+        # the counts are merged after every chunk, whatever the chunk size
+        q_str = "H=0=nop=nop@RY=1=nop=0.7@CNOT=2=1=nop@H=2=nop=nop"
+        ref = simulator.sample_shots(q_str, 5000, rand_seed=2)
+        out = simulator.sample_shots(q_str, 5000, rand_seed=2, chunk_size=7)
+        assert (ref[0] == out[0]).all() and (ref[1] == out[1]).all()
+        # Clifford circuit wider than 64 qubits: packed rows
+        ghz = "@".join(["H=0=nop=nop"] + ["CNOT={}={}=nop".format(q + 1, q) for q in range(69)])
+        outcomes, counts = simulator.sample_shots(ghz, 1000, rand_seed=0, chunk_size=33)
+        assert outcomes.shape == (2, 9) and counts.sum() == 1000
+        assert (outcomes[0] == 0).all() and (outcomes[1, :8] == 255).all()
+
+    def test_shots(self):
+        shots = simulator.sample_shots("X=1=nop=nop", 100, n_qubit=3, return_counts=False,
+                                       rand_seed=0, chunk_size=7)
+        assert shots.dtype == numpy.uint64 and shots.shape == (100,)
+        assert (shots == 2).all()
+        same = simulator.sample_shots("H=0=nop=nop", 50, return_counts=False, rand_seed=3)
+        assert (same == simulator.sample_shots("H=0=nop=nop", 50, return_counts=False,
+                                               rand_seed=3)).all()
+
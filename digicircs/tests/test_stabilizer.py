@@ -0,0 +1,69 @@
+import numpy
+from digicircs import stabilizer, simulator, observables
+from digicircs.gate_set import GateSet
+
+GATE_SET = GateSet(sgates_1q=["X", "Y", "Z", "H", "S"], sgates_2q=["CNOT"])
+
+def _random_clifford(n_qubit, n_gates, rng, controlled=False):
+    gates = []
+    for _ in range(n_gates):
+        targ, ctrl = rng.choice(n_qubit, 2, replace=False)
+        if not controlled and rng.random() < 0.4:
+            gates.append("CNOT={}={}=nop".format(targ, ctrl))
+        else:
+            if controlled and rng.random() < 0.5:
+                # controlled Paulis
+                gates.append("{}={}={}=nop".format(rng.choice(list("XYZ")), targ, ctrl))
+            else:
+                gates.append("{}={}=nop=nop".format(rng.choice(list("XYZHS")), targ))
+    return "@".join(gates)
+
+class TestStabilizer():
+    def test_expectation(self):
+        rng = numpy.random.default_rng(0)
+        for trial in range(20):
+            controlled = trial % 2 == 1
+            q_str = _random_clifford(5, 30, rng, controlled=controlled)
+            gates, _ = simulator.parse_gates(q_str, 5, rm_ctrl=not controlled, gate_set=GATE_SET)
+            tableau = stabilizer.Tableau.from_gates(gates, 5)
+            psi = simulator.simulate(q_str, n_qubit=5, rm_ctrl=not controlled, gate_set=GATE_SET)
+            for _ in range(10):
+                qubits = rng.choice(5, rng.integers(1, 6), replace=False)
+                term = tuple(sorted((int(q), str(rng.choice(list("XYZ")))) for q in qubits))
+                ref = observables.state_expectation(psi[None], [{term: 1.0}], 5)[0, 0]
+                assert numpy.isclose(tableau.pauli_expectation(term), ref)
+
+    def test_sample(self):
+        rng = numpy.random.default_rng(1)
+        for _ in range(5):
+            q_str = _random_clifford(4, 25, rng)
+            tableau = stabilizer.simulate_tableau(q_str, n_qubit=4, gate_set=GATE_SET)
+            bits = numpy.unpackbits(tableau.sample(20000, rand_seed=2), axis=1)[:, :4]
+            freq = numpy.bincount(bits @ [8, 4, 2, 1], minlength=16) / 20000
+            probs = numpy.abs(simulator.simulate(q_str, n_qubit=4, gate_set=GATE_SET))**2
+            assert numpy.allclose(freq, probs, atol=0.02)
+
+    def test_wide_ghz(self):
+        n_qubit = 200
+        q_str = "H=0=nop=nop@" + "@".join("CNOT={}={}=nop".format(q + 1, q)
+                                          for q in range(n_qubit - 1))
+        tableau = stabilizer.simulate_tableau(q_str)
+        assert tableau.expectation({((0, "Z"), (n_qubit - 1, "Z")): 2.0}) == 2.0
+        assert tableau.expectation({((70, "Z"),): 1.0}) == 0.0
+        assert tableau.expectation({tuple((q, "X") for q in range(n_qubit)): 1.0}) == 1.0
+        bits = numpy.unpackbits(tableau.sample(100, rand_seed=0), axis=1)[:, :n_qubit]
+        assert set(bits.sum(axis=1).tolist()) <= {0, n_qubit}
+
+    def test_dispatch(self):
+        assert not stabilizer.is_clifford(simulator.parse_gates("RX=0=nop=0.1")[0])
+        try:
+            stabilizer.simulate_tableau("RX=0=nop=0.1")
+            assert False
+        except ValueError:
+            pass
+        ham = {((0, "Z"), (1, "Z")): 1.0, ((0, "X"), (1, "X")): 0.5}
+        q_strs = ["H=0=nop=nop@CNOT=1=0=nop", "H=0=nop=nop@X=1=nop=nop"]
+        values = observables.expectation(q_strs, ham)
+        assert numpy.allclose(values, observables.expectation(q_strs, ham, use_stabilizer=False))
+        outcomes, counts = simulator.sample_shots("X=0=nop=nop@CNOT=2=0=nop", 10)
+        assert outcomes.tolist() == [5] and counts.tolist() == [10]
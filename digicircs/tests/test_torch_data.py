@@ -0,0 +1,58 @@
+import os
+import tempfile
+import numpy
+from digicircs import batching, multi_hot, torch_data
+
+class TestTorchData():
+    q_strs = ["H=0=nop=nop@X=1=nop=nop@RX=1=0=0.1@XX=0=3=0.2@XY=0=1=0.2",
+              "H=0=nop=nop",
+              "X=1=nop=nop@RX=1=0=0.3",
+              "Y=0=nop=nop@X=1=nop=nop@RY=1=0=0.1@ZZ=0=3=0.2@XY=0=1=0.2@H=1=nop=nop"]
+    sym_dicts = [{'RY': 0, 'XY': 1, 'nop': 2, 'X': 3, 'Y': 4, 'ZZ': 5, 'RX': 6,
+                  'H': 7, 'XX': 8}, {'0': 0, '1': 1}, {'nop': 0, '1': 1, '0': 2, '3': 3}]
+
+    def _check_loader(self, dataset, num_workers=0):
+        rev_dicts = [{v: k for k, v in d.items()} for d in self.sym_dicts]
+        loader = torch_data.make_dataloader(dataset, batch_size=2, bucket_width=4,
+                                            num_workers=num_workers, rand_seed=0)
+        # static gates are encoded with the default parameter 0.2
+        expected = ["@".join(g[:-3] + "0.2" if g.endswith("=nop") else g for g in q.split("@"))
+                    for q in self.q_strs]
+        seen = []
+        for mhe, mask in loader:
+            for k in range(mhe.shape[0]):
+                n_gates = int(mask[k].sum())
+                gates = multi_hot.from_multi_hot(mhe[k].numpy(), rev_dicts).split("@")
+                # the masked positions are the padding
+                assert [not g.startswith("nop=") for g in gates] == mask[k].tolist()
+                q_str = "@".join(gates[:n_gates])
+                seen.append(q_str)
+        assert sorted(seen) == sorted(expected)
+
+    def test_dataset_strings(self):
+        dataset = torch_data.CircuitDataset(self.q_strs, self.sym_dicts)
+        assert len(dataset) == 4
+        assert dataset[1].shape == (1, 16)
+        self._check_loader(dataset)
+
+    def test_dataset_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            txt_file = os.path.join(tmp, "circuits.txt")
+            with open(txt_file, "w") as writer:
+                writer.write("\n".join(self.q_strs) + "\n")
+            dataset = torch_data.CircuitDataset(txt_file, self.sym_dicts)
+            assert dataset.get_qstring(2) == self.q_strs[2]
+            self._check_loader(dataset, num_workers=2)
+
+            npy_file = os.path.join(tmp, "circuits.npy")
+            batching.save_binary_dataset(npy_file, self.q_strs, self.sym_dicts)
+            dataset = torch_data.CircuitDataset(npy_file, self.sym_dicts)
+            assert list(dataset.lengths) == [5, 1, 2, 6]
+            self._check_loader(dataset, num_workers=2)
+
+    def test_bucket_batch_sampler(self):
+        sampler = torch_data.BucketBatchSampler([1, 9, 2, 10, 3], 2, bucket_width=8,
+                                                rand_seed=0)
+        assert len(sampler) == 3
+        batches = list(sampler)
+        assert sorted(sum(batches, [])) == [0, 1, 2, 3, 4]
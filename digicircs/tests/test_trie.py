@@ -0,0 +1,31 @@
+import numpy
+from digicircs import trie, simulator, gen_circuit
+
+class TestTrie():
+    def test_simulate_dataset(self):
+        prefix = gen_circuit.circuit_from_scratch(4, 20, rand_seed=0)[0]
+        q_strs = [prefix + "@" + gen_circuit.circuit_from_scratch(4, 5, rand_seed=s)[0]
+                  for s in range(5)] + [prefix, prefix + "@X=0=nop=nop"]
+        gate_trie = trie.GateTrie.from_qstrings(q_strs)
+        info = gate_trie.info()
+        assert info["gates"] == 5 * 25 + 20 + 21
+        assert len(gate_trie) <= 20 + 5 * 5 + 1
+        states = trie.simulate_dataset(gate_trie)
+        for q_str, state in zip(q_strs, states):
+            assert numpy.allclose(state, simulator.simulate(q_str, n_qubit=4))
+
+    def test_evaluate(self):
+        q_strs = ["H=0=nop=nop@CNOT=1=0=nop", "H=0=nop=nop", "X=2=nop=nop", "H=0=nop=nop"]
+        probs = trie.simulate_dataset(q_strs, evaluate=lambda psi: numpy.abs(psi[0])**2)
+        assert numpy.allclose(probs, [0.5, 0.5, 0, 0.5])
+        try:
+            trie.simulate_dataset(q_strs, n_qubit=2)
+            assert False
+        except ValueError:
+            pass
+
+    def test_duplicates(self):
+        states = trie.simulate_dataset(["H=0=nop=nop", "H=0=nop=nop"])
+        assert states[0] is not states[1]
+        states[0][:] = 0
+        assert numpy.allclose(states[1], simulator.simulate("H=0=nop=nop"))
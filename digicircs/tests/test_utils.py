@@ -1,6 +1,10 @@
-#import pytest
+import pytest
 import numpy as np
-from digicircs.utils import misc, circ_utils, dd_utils
+from digicircs.utils import misc
+try:
+    from digicircs.utils import circ_utils
+except ImportError: # circ_utils needs a tequila with a Compiler
+    circ_utils = None
 
 class TestMisc():
     '''
@@ -44,6 +48,19 @@ class TestMisc():
         n_qubit = misc.count_qubit_symb_dict(symb_dict)
         assert n_qubit == 4
 
+    def test_parse_qstring(self):
+        q_str = "H=0=1=nop@CNOT=2=2=nop@nop=0=nop=nop@CRX=1=0=0.1@XY=0=3=a"
+        names, targs, ctrls, params = misc.parse_qstring(q_str)
+        assert names == ["H", "X", "CRX", "XY"]
+        assert list(targs) == [0, 2, 1, 0]
+        assert list(ctrls) == [-1, -1, 0, 3]
+        assert np.isnan(params[[0, 1, 3]]).all()
+        assert params[2] == 0.1
+        names, targs, ctrls, params = misc.parse_qstring(q_str, rm_ctrl=False, raw_params=True)
+        assert list(ctrls) == [1, -1, 0, 3]
+        assert params == ["nop", "nop", "0.1", "a"]
+
+@pytest.mark.skipif(circ_utils is None, reason="circ_utils cannot be imported")
 class TestCircUtils():
     '''
     Tests for functions in circ_utils.py
@@ -57,3 +74,8 @@ class TestCircUtils():
                   @CRX=1=0=1.3606@Z=1=nop=1.0368"
         out_2 = circ_utils.compute_nmoments_from_qstr(q_str2)
         assert out_2 == 9
+
+    def test_simplify_qstring(self):
+        q_str = "CNOT=0=1=nop@CRX=1=0=CRX0@XX=0=1=0.2"
+        out = circ_utils.simplify_qstring(q_str)
+        assert out == "X=0=1=nop@RX=1=0=CRX0@XX=0=1=0.2"
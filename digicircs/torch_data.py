@@ -0,0 +1,232 @@
+'''
+PyTorch datasets of quantum circuits.
+
+The circuits are read lazily and encoded in the ``DataLoader`` workers,
+so that the main process only collates the batches. Supported sources:
+
+    - a list of circuit strings;
+    - a text file with one circuit string per line;
+    - a binary dataset (``.npy`` file written by
+      ``batching.save_binary_dataset``), memory-mapped in every worker.
+'''
+import os
+import numpy
+import torch
+from torch.utils.data import Dataset, Sampler, DataLoader
+from digicircs import batching, index_encoding
+
+class CircuitDataset(Dataset):
+    '''
+    Dataset of encoded circuits with a shared vocabulary.
+    Every item is the encoding of one circuit without padding, with shape
+    (n_gates, n_features); ``collate`` pads a batch to its longest circuit.
+
+    Args:
+        :source: list of circuit strings, or the name of a text or ``.npy`` file.
+        :symbol_dictionary: the symbol dictionaries shared by the dataset.
+    Kwargs:
+        :encoding: "multi_hot" or "decimal".
+        :encode_params: if True, the parameters are included.
+    Examples:
+        >>> dataset = CircuitDataset("circuits.txt", sym_dicts)
+        >>> loader = make_dataloader(dataset, batch_size=64)
+        >>> for mhe, mask in loader:
+        ...     loss = model(mhe, mask)
+    '''
+    def __init__(self, source, symbol_dictionary: list,
+                 encoding: str = "multi_hot", encode_params: bool = True):
+        assert encoding in ["multi_hot", "decimal"], \
+            "Only 'multi_hot' or 'decimal' encodings are supported!"
+        self.symbol_dictionary = symbol_dictionary
+        self.encoding = encoding
+        self.encode_params = encode_params
+        self.q_strings = None
+        self.file_name = None
+        self.offsets = None
+        self._handle = None
+
+        if isinstance(source, (str, os.PathLike)) and str(source).endswith(".npy"):
+            self.file_name = str(source)
+            self.lengths = batching.get_lengths(self._get_handle(), symbol_dictionary)
+        elif isinstance(source, (str, os.PathLike)):
+            self.file_name = str(source)
+            self.offsets, self.lengths = _index_text_file(self.file_name)
+        else:
+            self.q_strings = list(source)
+            self.lengths = batching.get_lengths(self.q_strings)
+
+        self.pad_row = self._encode_padding()
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __getitem__(self, idx: int):
+        length = max(int(self.lengths[idx]), 1)
+        if self.offsets is None and self.q_strings is None:
+            # binary dataset
+            dec = numpy.asarray(self._get_handle()[idx, :length])
+            indices = dec[:, :3].astype(numpy.int16)
+            params = dec[:, 3] if dec.shape[-1] > 3 else None
+        else:
+            indices, params = index_encoding.to_indices(self.get_qstring(idx),
+                                                        self.symbol_dictionary,
+                                                        max_len=length)
+            indices, params = indices[0], params[0]
+        return self._encode(indices, params)
+
+    def get_qstring(self, idx: int):
+        '''
+        The circuit string of item ``idx`` (not available for binary datasets).
+        '''
+        if self.q_strings is not None:
+            return self.q_strings[idx]
+        handle = self._get_handle()
+        handle.seek(self.offsets[idx])
+        return handle.readline().decode().strip()
+
+    def collate(self, batch: list):
+        '''
+        Pad a list of items to the longest one with ``nop`` gates.
+
+        Returns:
+            :tensor: the batch, shape (batch_size, batch_len, n_features).
+            :tensor: the attention mask, True for gates and False for padding.
+        '''
+        batch_len = max(item.shape[0] for item in batch)
+        out = self.pad_row.repeat(len(batch), batch_len, 1)
+        mask = torch.zeros(len(batch), batch_len, dtype=torch.bool)
+        for i, item in enumerate(batch):
+            out[i, :item.shape[0]] = item
+            mask[i, :item.shape[0]] = True
+        return out, mask
+
+    def _encode(self, indices, params):
+        '''
+        Encode index and parameter arrays of one circuit.
+        '''
+        if not self.encode_params:
+            params = None
+        if self.encoding == "multi_hot":
+            enc = index_encoding.indices_to_multi_hot(indices, params,
+                                                      self.symbol_dictionary)
+        elif params is None:
+            enc = indices.astype(numpy.float32)
+        else:
+            enc = numpy.concatenate([indices, params[:, None]], axis=-1)
+        return torch.as_tensor(numpy.asarray(enc, dtype=numpy.float32))
+
+    def _encode_padding(self):
+        '''
+        The encoding of a padding gate.
+        '''
+        pad = [[self.symbol_dictionary[ind].get("nop", 0) for ind in range(3)]]
+        return self._encode(numpy.asarray(pad, dtype=numpy.int16),
+                            numpy.asarray([0.2], dtype=numpy.float32))[0]
+
+    def _get_handle(self):
+        '''
+        Open the source file lazily, once per worker process.
+        '''
+        if self._handle is None:
+            if self.file_name.endswith(".npy"):
+                self._handle = numpy.load(self.file_name, mmap_mode="r")
+            else:
+                self._handle = open(self.file_name, "rb")
+        return self._handle
+
+    def __getstate__(self):
+        # open files and memory maps are not sent to the workers
+        state = self.__dict__.copy()
+        state["_handle"] = None
+        return state
+
+
+class BucketBatchSampler(Sampler):
+    '''
+    Batch sampler drawing batches from length buckets, see
+    ``batching.bucket_batches``. The batches are reshuffled every epoch.
+
+    Args:
+        :lengths: the number of gates of each circuit.
+        :batch_size: maximum number of circuits per batch.
+    Kwargs:
+        :bucket_width: range of lengths grouped into one bucket.
+        :shuffle: if True, shuffle circuits in each bucket and the batch order.
+        :drop_last: if True, drop the incomplete batch of every bucket.
+        :rand_seed: random generator seed of the first epoch.
+    '''
+    def __init__(self, lengths, batch_size: int, bucket_width: int = 8,
+                 shuffle: bool = True, drop_last: bool = False,
+                 rand_seed: int = None):
+        self.lengths = numpy.asarray(lengths)
+        self.batch_size = batch_size
+        self.bucket_width = bucket_width
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.rand_seed = rand_seed
+        self.epoch = 0
+
+    def __iter__(self):
+        seed = None if self.rand_seed is None else self.rand_seed + self.epoch
+        self.epoch += 1
+        for batch in batching.bucket_batches(self.lengths, self.batch_size,
+                                             bucket_width=self.bucket_width,
+                                             shuffle=self.shuffle,
+                                             drop_last=self.drop_last,
+                                             rand_seed=seed):
+            yield batch.tolist()
+
+    def __len__(self):
+        return len(batching.bucket_batches(self.lengths, self.batch_size,
+                                           bucket_width=self.bucket_width,
+                                           shuffle=False, drop_last=self.drop_last))
+
+
+def make_dataloader(dataset: CircuitDataset, batch_size: int,
+                    bucket_width: int = 8, shuffle: bool = True,
+                    num_workers: int = None, pin_memory: bool = None,
+                    rand_seed: int = None, **kwargs):
+    '''
+    Create a ``DataLoader`` over a ``CircuitDataset`` with length-bucketed
+    batches, encoding the circuits in worker processes.
+
+    Args:
+        :dataset: the circuit dataset.
+        :batch_size: maximum number of circuits per batch.
+    Kwargs:
+        :bucket_width: range of lengths grouped into one bucket.
+        :shuffle: if True, shuffle the batches every epoch.
+        :num_workers: number of worker processes, all cores if not given.
+        :pin_memory: return pinned-memory tensors, default if CUDA is available.
+        :rand_seed: random generator seed, used for test.
+        :kwargs: passed to ``DataLoader``.
+    Returns:
+        :DataLoader: yielding (batch, mask) pairs.
+    '''
+    if num_workers is None:
+        num_workers = os.cpu_count() or 0
+    if pin_memory is None:
+        pin_memory = torch.cuda.is_available()
+    sampler = BucketBatchSampler(dataset.lengths, batch_size,
+                                 bucket_width=bucket_width, shuffle=shuffle,
+                                 rand_seed=rand_seed)
+    if num_workers > 0:
+        kwargs.setdefault("persistent_workers", True)
+    return DataLoader(dataset, batch_sampler=sampler, collate_fn=dataset.collate,
+                      num_workers=num_workers, pin_memory=pin_memory, **kwargs)
+
+
+def _index_text_file(file_name: str):
+    '''
+    Byte offsets and numbers of gates of the lines of a text file.
+    '''
+    offsets = []
+    lengths = []
+    pos = 0
+    with open(file_name, "rb") as reader:
+        for line in reader:
+            if line.strip():
+                offsets.append(pos)
+                lengths.append(line.count(b"@") + 1)
+            pos += len(line)
+    return numpy.asarray(offsets, dtype=numpy.int64), numpy.asarray(lengths)
@@ -0,0 +1,133 @@
+'''
+Shared-prefix simulation of datasets of circuits.
+
+Circuits generated with the same local rotations or the ``early``
+strategy often start with the same gates. A ``GateTrie`` stores the
+parsed gates of all circuits as a trie, so every distinct prefix is one
+node. ``simulate_dataset`` walks the trie depth first: every node applies
+one gate to the state of its parent, the state of a branch point is
+shared by all its children, and the states are released as soon as the
+last branch below them is finished. The work scales with the number of
+nodes instead of the total number of gates.
+
+Examples:
+    >>> energies = simulate_dataset(q_strs, evaluate=lambda psi: observables.state_expectation(
+    ...                             psi[None], [ham], n_qubit)[0, 0])
+'''
+import numpy
+from digicircs import simulator
+
+class GateTrie:
+    '''
+    Trie of the gates of a list of circuits; node 0 is the empty prefix.
+
+    Kwargs:
+        :rm_ctrl: If true, the one qubit gates cannot have control qubits.
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
+    '''
+    def __init__(self, rm_ctrl: bool = True, gate_set=None):
+        self.rm_ctrl = rm_ctrl
+        self.gate_set = gate_set
+        self.gates = [None]
+        self.children = [{}]
+        # indices of the circuits ending at every node
+        self.ends = [[]]
+        self.n_circuits = 0
+        self.n_qubit = 1
+        self.n_gates = 0
+
+    @classmethod
+    def from_qstrings(cls, q_strings: list, **kwargs):
+        trie = cls(**kwargs)
+        for q_str in q_strings:
+            trie.add(q_str)
+        return trie
+
+    def add(self, q_string: str):
+        '''
+        Insert a circuit, returns its index.
+        '''
+        gates, n_qubit = simulator.parse_gates(q_string, rm_ctrl=self.rm_ctrl,
+                                               gate_set=self.gate_set)
+        self.n_qubit = max(self.n_qubit, n_qubit)
+        self.n_gates += len(gates)
+        node = 0
+        for gate in gates:
+            child = self.children[node].get(gate)
+            if child is None:
+                child = len(self.gates)
+                self.children[node][gate] = child
+                self.gates.append(gate)
+                self.children.append({})
+                self.ends.append([])
+            node = child
+        self.ends[node].append(self.n_circuits)
+        self.n_circuits += 1
+        return self.n_circuits - 1
+
+    def __len__(self):
+        '''
+        Number of gate nodes (the root excluded).
+        '''
+        return len(self.gates) - 1
+
+    def info(self):
+        '''
+        Total number of gates, number of nodes and their ratio.
+        '''
+        return {"circuits": self.n_circuits, "gates": self.n_gates, "nodes": len(self),
+                "sharing": self.n_gates / max(len(self), 1)}
+
+
+def simulate_dataset(q_strings, evaluate=None, n_qubit: int = None, rm_ctrl: bool = True,
+                     gate_set=None):
+    '''
+    Simulate a dataset of circuits through the trie of their gates.
+
+    Args:
+        :q_strings: a list of circuit strings, or a ``GateTrie``.
+    Kwargs:
+        :evaluate: function of a statevector of shape (2**n_qubit,), called
+                   once per distinct circuit; duplicate circuits share the
+                   returned object. The statevectors are returned if not
+                   given, one copy per circuit.
+        :n_qubit: number of qubits of the common register, the largest of
+                  the dataset if not given.
+        :rm_ctrl: If true, the one qubit gates cannot have control qubits.
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
+    Returns:
+        :list: the results of ``evaluate`` in the order of the circuits.
+    '''
+    if isinstance(q_strings, GateTrie):
+        trie = q_strings
+    else:
+        trie = GateTrie.from_qstrings(q_strings, rm_ctrl=rm_ctrl, gate_set=gate_set)
+    if n_qubit is None:
+        n_qubit = trie.n_qubit
+    elif n_qubit < trie.n_qubit:
+        raise ValueError("The circuits act on {} qubits, more than n_qubit={}".format(
+                         trie.n_qubit, n_qubit))
+    copy_states = evaluate is None
+    if copy_states:
+        evaluate = lambda psi: psi
+
+    state = numpy.zeros((1,) + (2,) * n_qubit, dtype=complex)
+    state[(0,) * (n_qubit + 1)] = 1.
+    results = [None] * trie.n_circuits
+    # the stack holds (node, state of the parent); a state is freed when
+    # the last child popped from the stack drops the reference
+    stack = [(0, state)]
+    del state
+    while stack:
+        node, state = stack.pop()
+        if node > 0:
+            name, targ, ctrl, theta = trie.gates[node]
+            state = simulator.apply_gate(state, name, targ, ctrl, theta)
+        if trie.ends[node]:
+            value = evaluate(state.reshape(-1))
+            for i in trie.ends[node]:
+                results[i] = value.copy() if copy_states else value
+        for child in trie.children[node].values():
+            stack.append((child, state))
+        del state
+    return results
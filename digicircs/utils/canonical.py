@@ -0,0 +1,206 @@
+'''
+Canonical forms and hashes of circuits represented by strings.
+
+Circuits that differ only by
+
+    - alias names (``X`` with a control qubit is ``CNOT``, ``rx`` is ``RX``);
+    - the order of gates acting on disjoint qubits;
+    - the order of the qubits of symmetric gates (``XX``, ``YY``, ``ZZ``);
+    - the parameter precision (with ``decimals``);
+    - a relabelling of the qubits (with ``relabel_qubits``)
+
+have the same canonical string, and thus the same hash. The gates are
+sorted by (ASAP moment, qubits), so the canonical string is itself a valid
+circuit equivalent to the input.
+'''
+import hashlib
+from digicircs.gate_set import get_gate_set
+from digicircs.utils import misc, scheduler
+
+def canonical_qstring(q_string: str, decimals: int = None, relabel_qubits: bool = False,
+                      rm_ctrl: bool = True, gate_set=None):
+    '''
+    Canonical string of a circuit.
+
+    Args:
+        :q_string: A string encoding a quantum circuit.
+    Kwargs:
+        :decimals: if given, the parameters are rounded to ``decimals`` digits.
+        :relabel_qubits: if True, the qubits are relabelled by their wire
+                         signatures, making the form permutation invariant.
+        :rm_ctrl: If true, the control qubits of 1-qubit gates are removed
+                  (as in ``decoder``), else the gates are cast to 2-qubit gates.
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
+    Returns:
+        :str: the canonical circuit string.
+    Examples:
+        >>> canonical_qstring("RX=1=nop=0.1@X=0=2=nop@H=1=nop=nop", rm_ctrl=False)
+            'CNOT=0=2=nop@RX=1=nop=0.1@H=1=nop=nop'
+    '''
+    gate_set = get_gate_set(gate_set)
+    names, targets, controls, params = misc.parse_qstring(q_string, rm_ctrl=rm_ctrl,
+                                                          raw_params=True,
+                                                          gate_set=gate_set)
+    gates = []
+    for name, targ, ctrl, param in zip(names, targets.tolist(), controls.tolist(), params):
+        name = name.upper()
+        if ctrl >= 0 and name in gate_set.one_qubit and name in gate_set.cast_1q_to_2q:
+            name = gate_set.cast_to_2q(name)
+        param = _format_param(param, decimals) if name in gate_set.parameterized else "nop"
+        gates.append((name, targ, ctrl, param))
+
+    gates = _sort_gates(gates)
+    if relabel_qubits:
+        gates = _relabel_gates(gates, _relabel(gates))
+    return _to_string(gates)
+
+def circuit_hash(q_string: str, **kwargs):
+    '''
+    SHA-1 hash of the canonical string, see ``canonical_qstring`` for the kwargs.
+    '''
+    return hashlib.sha1(canonical_qstring(q_string, **kwargs).encode()).hexdigest()
+
+def _symmetric(name: str):
+    return len(name) == 2 and name[0] == name[1] and name in misc.get_paulis_2q()
+
+def _sort_gates(gates: list):
+    '''
+    Order the qubits of symmetric gates, then sort the gates by
+    (ASAP moment, qubits). Returns (moment, name, target, control, param) tuples.
+    '''
+    gates = [(name, ctrl, targ, param) if ctrl >= 0 and ctrl < targ and _symmetric(name)
+             else (name, targ, ctrl, param) for name, targ, ctrl, param in gates]
+    moments = scheduler.asap_moments([g[1] for g in gates], [g[2] for g in gates])
+    gates = [(int(m),) + g for m, g in zip(moments, gates)]
+    # gates in the same moment act on disjoint qubits
+    return sorted(gates, key=lambda g: (g[0], g[2]))
+
+def _relabel(gates: list):
+    '''
+    New labels of the qubits ordered by their wire signatures: the gates seen
+    by the wire, refined with the signatures of the partner wires of
+    2-qubit gates. Qubits left with equal signatures are individualized one
+    at a time and refined again; the labelling with the smallest canonical
+    string is kept, so the result does not depend on the input labels.
+    Branches related by an automorphism found earlier are skipped.
+    '''
+    qubits = sorted(set(g[2] for g in gates) | set(g[3] for g in gates if g[3] >= 0))
+    events = {q: [] for q in qubits}
+    partners = {q: [] for q in qubits}
+    for moment, name, targ, ctrl, param in gates:
+        events[targ].append((moment, name, 0, param))
+        if ctrl >= 0:
+            # the qubits of symmetric gates have the same role
+            role = 0 if _symmetric(name) else 1
+            events[ctrl].append((moment, name, role, param))
+            partners[targ].append((moment, 0, ctrl))
+            partners[ctrl].append((moment, role, targ))
+
+    # the connected wires are labelled together, identical components are
+    # interchangeable and get consecutive blocks of labels
+    blocks = []
+    for members in _components(qubits, partners):
+        sub_gates = [g for g in gates if g[2] in members]
+        colors = _ranks({q: tuple(events[q]) for q in members})
+        best = {"string": None, "labels": None, "automorphisms": []}
+        _search_labels(sub_gates, colors, partners, [], best)
+        blocks.append((best["string"], best["labels"]))
+    labels = {}
+    for _, block in sorted(blocks, key=lambda b: b[0]):
+        offset = len(labels)
+        labels.update({q: offset + i for q, i in block.items()})
+    return labels
+
+def _components(qubits: list, partners: dict):
+    '''
+    Sets of qubits connected by 2-qubit gates.
+    '''
+    seen, components = set(), []
+    for q in qubits:
+        if q in seen:
+            continue
+        component, frontier = {q}, [q]
+        while frontier:
+            p = frontier.pop()
+            for _, _, r in partners[p]:
+                if r not in component:
+                    component.add(r)
+                    frontier.append(r)
+        seen |= component
+        components.append(component)
+    return components
+
+def _refine(colors: dict, partners: dict):
+    '''
+    Refine the colors with the colors of the partner wires until stable.
+    '''
+    while True:
+        new_colors = _ranks({q: (colors[q], tuple((m, r, colors[p]) for m, r, p in partners[q]))
+                             for q in colors})
+        if len(set(new_colors.values())) == len(set(colors.values())):
+            return colors
+        colors = new_colors
+
+def _search_labels(gates: list, colors: dict, partners: dict, path: list, best: dict):
+    '''
+    Individualize-and-refine search of the labelling with the smallest
+    canonical string, updating ``best`` in place.
+    '''
+    colors = _refine(colors, partners)
+    cells = {}
+    for q, c in colors.items():
+        cells.setdefault(c, []).append(q)
+    tied = [cell for c, cell in sorted(cells.items()) if len(cell) > 1]
+    if not tied:
+        string = _to_string(_relabel_gates(gates, colors))
+        if best["string"] is None or string < best["string"]:
+            best["string"], best["labels"] = string, colors
+        elif string == best["string"]:
+            # same string: the map between the two labellings is an automorphism
+            inverse = {i: q for q, i in best["labels"].items()}
+            best["automorphisms"].append({q: inverse[i] for q, i in colors.items()})
+        return
+
+    explored = []
+    for q in sorted(tied[0]):
+        # skip the qubits in the orbit of an explored one, under the
+        # automorphisms fixing the individualized qubits
+        autos = [a for a in best["automorphisms"] if all(a[p] == p for p in path)]
+        if explored and _same_orbit(q, explored, autos):
+            continue
+        individualized = {p: 2 * c for p, c in colors.items()}
+        individualized[q] -= 1
+        _search_labels(gates, _ranks(individualized), partners, path + [q], best)
+        explored.append(q)
+
+def _same_orbit(q, explored: list, automorphisms: list):
+    orbit, frontier = {q}, [q]
+    while frontier:
+        p = frontier.pop()
+        for a in automorphisms:
+            if a[p] not in orbit:
+                orbit.add(a[p])
+                frontier.append(a[p])
+    return any(p in orbit for p in explored)
+
+def _relabel_gates(gates: list, labels: dict):
+    return _sort_gates([(name, labels[targ], labels[ctrl] if ctrl >= 0 else -1, param)
+                        for _, name, targ, ctrl, param in gates])
+
+def _to_string(gates: list):
+    return "@".join("{}={}={}={}".format(name, targ, "nop" if ctrl < 0 else ctrl, param)
+                    for _, name, targ, ctrl, param in gates)
+
+def _ranks(signatures: dict):
+    values = sorted(set(signatures.values()))
+    rank = {v: i for i, v in enumerate(values)}
+    return {q: rank[s] for q, s in signatures.items()}
+
+def _format_param(param: str, decimals: int = None):
+    try:
+        value = float(param)
+    except ValueError:
+        return param # symbolic parameter
+    if decimals is not None:
+        value = round(value, decimals)
+    return "{:.12g}".format(value + 0.) # + 0. turns -0. into 0.
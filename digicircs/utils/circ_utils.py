@@ -4,12 +4,14 @@
 import cirq
 import tequila as tq
 from tequila.circuit.compiler import Compiler
+from digicircs.gate_set import DEFAULT_GATE_SET, get_gate_set
+from digicircs.utils import misc, scheduler
 
 # Default gates (Static and Parameterized)
-SGATES_1Q = ["X", "Y", "Z", "H"]
-SGATES_2Q = ["CNOT"]
-PGATES_1Q = ["RX", "RY", "RZ"]
-PGATES_2Q = ["CRX", "CRY", "CRZ"]
+SGATES_1Q = list(DEFAULT_GATE_SET.sgates_1q)
+SGATES_2Q = list(DEFAULT_GATE_SET.sgates_2q)
+PGATES_1Q = list(DEFAULT_GATE_SET.pgates_1q)
+PGATES_2Q = list(DEFAULT_GATE_SET.pgates_2q)
 GATES_1Q = SGATES_1Q + PGATES_1Q
 GATES_2Q = PGATES_2Q + SGATES_2Q
 
@@ -59,6 +61,7 @@ def compute_nparams(circuit: tq.QCircuit):
 def compute_nmoments_from_qstr(q_str: str):
     '''
     Get the number of moments in a circuit represented by a string.
+    The gates are placed by the ASAP scheduler in ``scheduler.py``.
 
     Args:
         :q_str: A string encoding a quantum circuit
@@ -70,39 +73,8 @@ def compute_nmoments_from_qstr(q_str: str):
         >>> print(n_moments)
             2
     '''
-    q_list = q_str.split("@")
-    qubit_count = []
-    n_moments = 1
-    for gate in q_list:
-        g_elems = gate.split("=")
-        try:
-            _gname = g_elems[0]
-            _targ = int(g_elems[1])
-            _ctrl = g_elems[2]
-            if _ctrl != "nop":
-                _ctrl = int(_ctrl)
-            else:
-                _ctrl = None
-            if _gname in GATES_1Q:
-                _ctrl = None #ignore control qubit for 1-qubit gates
-        except:
-            raise ValueError("The string given is in valid!")
-
-        if _ctrl is None:
-            if _targ in qubit_count:
-                n_moments += 1
-                qubit_count = []
-            qubit_count += [_targ]
-        else:
-            if _targ in qubit_count:
-                n_moments += 1
-                qubit_count = []
-            elif _ctrl in qubit_count:
-                n_moments += 1
-                qubit_count = []
-            qubit_count += [_targ, _ctrl]
-
-    return n_moments
+    moments = scheduler.schedule_qstring(q_str)
+    return scheduler.count_moments(moments)
 
 def edit_qpic_file(file_to_modify, tq_circuit, file_to_save='temp.qpic'):
     '''
@@ -159,15 +131,22 @@ def edit_qpic_file(file_to_modify, tq_circuit, file_to_save='temp.qpic'):
         writer.writelines(data)
 
 
-def simplify_qstring(qstr: str):
+def simplify_qstring(qstr: str, gate_set=None):
     '''
     Simplify the circuit string based on Tequila syntax.
         CNOT           -> X with control qubit.
         CRX, CRY, CRZ  -> RX, RY, RZ with control qubit.
+    Only the gate names are renamed, the other fields are left untouched.
+    Pauli-pair gates (e.g. XY) are kept.
     '''
-    qstr = qstr.replace("CNOT", "X")
-    qstr = qstr.replace("CRX", "RX")
-    qstr = qstr.replace("CRY", "RY")
-    qstr = qstr.replace("CRZ", "RZ")
-
-    return qstr
+    paulis_2q = misc.get_paulis_2q()
+    cast_map = {k: v for k, v in get_gate_set(gate_set).cast_2q_to_1q.items()
+                if k not in paulis_2q}
+    gate_strs = misc.break_qstr_to_gstrs(qstr)
+    for i, g_str in enumerate(gate_strs):
+        g_elems = g_str.split("=")
+        if g_elems[0] in cast_map:
+            g_elems[0] = cast_map[g_elems[0]]
+            gate_strs[i] = "=".join(g_elems)
+
+    return "@".join(gate_strs)
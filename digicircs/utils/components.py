@@ -0,0 +1,84 @@
+'''
+Factorization of circuits into independent sub-circuits.
+
+Qubits linked by a 2-qubit gate are merged with a union-find over the
+(target, control) pairs. Every connected component of qubits evolves
+independently, so the circuit splits into sub-circuits on small
+registers, and the state is the tensor product of their states.
+
+Examples:
+    >>> split_circuit("H=0=nop=nop@CNOT=2=0=nop@RX=1=nop=0.1")
+        [('H=0=nop=nop@CNOT=1=0=nop', array([0, 2])), ('RX=0=nop=0.1', array([1]))]
+'''
+import numpy
+from digicircs.gate_set import get_gate_set
+from digicircs.utils import misc
+
+def qubit_components(targets, controls, n_qubit: int = None):
+    '''
+    Connected components of the qubits linked by 2-qubit gates.
+
+    Args:
+        :targets: target qubits of the gates.
+        :controls: control qubits of the gates, -1 for gates without control.
+    Kwargs:
+        :n_qubit: number of qubits, inferred from the gates if not given.
+    Returns:
+        :ndarray: the component of every qubit, numbered in the order of
+                  their smallest qubits.
+    Examples:
+        >>> qubit_components([0, 3, 2], [-1, 1, -1])
+            array([0, 1, 2, 1])
+    '''
+    targets = [int(t) for t in targets]
+    controls = [int(c) for c in controls]
+    if n_qubit is None:
+        n_qubit = max(targets + controls, default=-1) + 1
+    parent = list(range(n_qubit))
+
+    def find(q):
+        while parent[q] != q:
+            # path halving
+            parent[q] = parent[parent[q]]
+            q = parent[q]
+        return q
+
+    for t, c in zip(targets, controls):
+        if c >= 0:
+            rt, rc = find(t), find(c)
+            if rt != rc:
+                # the root is the smallest qubit of the component
+                parent[max(rt, rc)] = min(rt, rc)
+    roots = numpy.array([find(q) for q in range(n_qubit)], dtype=numpy.int64)
+    _, labels = numpy.unique(roots, return_inverse=True)
+    return labels.reshape(-1)
+
+def split_circuit(q_string: str, n_qubit: int = None, rm_ctrl: bool = True, gate_set=None):
+    '''
+    Split a circuit into the sub-circuits of its qubit components.
+
+    Args:
+        :q_string: A string encoding a quantum circuit.
+    Kwargs:
+        :n_qubit: number of qubits, inferred from the gates if not given;
+                  idle qubits form their own (empty) components.
+        :rm_ctrl: If true, the one qubit gates cannot have control qubits.
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
+    Returns:
+        :list: (sub-circuit string, qubits) pairs, the qubits of the
+               sub-circuit relabelled as 0, 1, ... in increasing order.
+    '''
+    gate_set = get_gate_set(gate_set)
+    names, targets, controls, params = misc.parse_qstring(q_string, rm_ctrl=rm_ctrl,
+                                                          raw_params=True, gate_set=gate_set)
+    labels = qubit_components(targets, controls, n_qubit=n_qubit)
+    qubits = [numpy.flatnonzero(labels == i) for i in range(labels.max(initial=-1) + 1)]
+    # position of every qubit in its component
+    local = numpy.zeros(len(labels), dtype=numpy.int64)
+    for qs in qubits:
+        local[qs] = numpy.arange(len(qs))
+    gates = [[] for _ in qubits]
+    for name, targ, ctrl, param in zip(names, targets.tolist(), controls.tolist(), params):
+        ctrl = "nop" if ctrl < 0 else local[ctrl]
+        gates[labels[targ]].append("{}={}={}={}".format(name, local[targ], ctrl, param))
+    return [("@".join(g), qs) for g, qs in zip(gates, qubits)]
@@ -0,0 +1,89 @@
+'''
+Light-cone pruning of circuits represented by strings.
+
+The expectation value of an observable only depends on the gates in its
+backward light cone. Walking the circuit from the end, a gate is kept if
+it touches a qubit of the current cone, and then adds its qubits to the
+cone. The kept gates are remapped to a register with only the qubits of
+the cone, so local observables of wide and deep circuits can be evaluated
+on a few qubits.
+
+Examples:
+    >>> pruned, qubit_map = light_cone("H=0=nop=nop@CNOT=1=0=nop@X=5=nop=nop", [1])
+    >>> print(pruned, qubit_map)
+        H=0=nop=nop@CNOT=1=0=nop {0: 0, 1: 1}
+'''
+import numpy
+from digicircs.gate_set import get_gate_set
+from digicircs.utils import misc
+
+def light_cone_mask(targets, controls, support, n_qubit: int = None):
+    '''
+    Gates in the backward light cone of a set of qubits.
+
+    Args:
+        :targets: target qubits of the gates.
+        :controls: control qubits of the gates, -1 for gates without control.
+        :support: qubits acted on by the observable.
+    Kwargs:
+        :n_qubit: number of qubits, inferred from the gates if not given.
+    Returns:
+        :ndarray: True for the kept gates.
+        :ndarray: True for the qubits of the cone.
+    '''
+    targets = numpy.asarray(targets, dtype=numpy.int64)
+    controls = numpy.asarray(controls, dtype=numpy.int64)
+    support = numpy.asarray(list(support), dtype=numpy.int64)
+    if n_qubit is None:
+        n_qubit = int(max(targets.max(initial=-1), controls.max(initial=-1),
+                          support.max(initial=-1))) + 1
+    in_cone = numpy.zeros(n_qubit + 1, dtype=bool) # the last entry stands for ctrl = -1
+    in_cone[support] = True
+    keep = numpy.zeros(len(targets), dtype=bool)
+    for i in range(len(targets) - 1, -1, -1):
+        t, c = targets[i], controls[i]
+        if in_cone[t] or in_cone[c]:
+            keep[i] = True
+            in_cone[t] = True
+            if c >= 0:
+                in_cone[c] = True
+    return keep, in_cone[:n_qubit]
+
+def light_cone(q_string: str, support, rm_ctrl: bool = True, gate_set=None):
+    '''
+    Prune a circuit to the backward light cone of some qubits and relabel
+    the remaining qubits as 0, 1, ... in increasing order.
+
+    Args:
+        :q_string: A string encoding a quantum circuit.
+        :support: qubits acted on by the observable.
+    Kwargs:
+        :rm_ctrl: If true, the one qubit gates cannot have control qubits.
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
+    Returns:
+        :str: the pruned circuit on the smaller register.
+        :dict: the new label of every qubit of the cone.
+    '''
+    gate_set = get_gate_set(gate_set)
+    parsed = misc.parse_qstring(q_string, rm_ctrl=rm_ctrl, raw_params=True, gate_set=gate_set)
+    return prune_parsed(parsed, support)
+
+def prune_parsed(parsed: tuple, support):
+    '''
+    ``light_cone`` of a circuit already parsed by ``misc.parse_qstring``
+    with ``raw_params=True``, to prune it for many observables.
+    '''
+    names, targets, controls, params = parsed
+    keep, in_cone = light_cone_mask(targets, controls, support)
+    qubit_map = {int(q): i for i, q in enumerate(numpy.flatnonzero(in_cone))}
+    gates = []
+    for i in numpy.flatnonzero(keep):
+        ctrl = "nop" if controls[i] < 0 else qubit_map[int(controls[i])]
+        gates.append("{}={}={}={}".format(names[i], qubit_map[int(targets[i])], ctrl, params[i]))
+    return "@".join(gates), qubit_map
+
+def remap_terms(terms: dict, qubit_map: dict):
+    '''
+    Relabel the qubits of Pauli terms ``{((qubit, pauli), ...): coeff}``.
+    '''
+    return {tuple((qubit_map[q], p) for q, p in term): coeff for term, coeff in terms.items()}
@@ -6,6 +6,7 @@ import random
 import warnings
 import string
 from digicircs import __config__
+from digicircs.gate_set import get_gate_set
 
 
 def make_dir(path_name):
@@ -92,6 +93,79 @@ def break_qstr_to_gstrs(q_string:str):
     except:
         raise Exception("The string representation is incompatible")
 
+def parse_qstring(q_string: str, rm_ctrl: bool = True, raw_params: bool = False,
+                  gate_set=None):
+    """
+    Parse the string representation of a circuit into per-gate arrays.
+    The rules of ``decoder.gate_preprocess`` are applied to the qubits:
+    control qubits of 1-qubit gates are removed (if ``rm_ctrl``), and
+    2-qubit gates without a valid control qubit are cast to 1-qubit gates.
+    ``nop`` gates are skipped.
+
+    Args:
+        :q_string: A string representation of a tequila circuit object.
+    Kwargs:
+        :rm_ctrl: If true, the one qubit gates cannot have control qubits.
+        :raw_params: If true, return the parameters as strings.
+        :gate_set: the ``GateSet`` of valid gates, the default one if not given.
+    Returns:
+        :list: gate names.
+        :ndarray: target qubits.
+        :ndarray: control qubits, -1 for gates without control.
+        :ndarray: parameters, nan for static or symbolic parameters
+                  (a list of strings if ``raw_params``).
+    Examples:
+        >>> names, targs, ctrls, params = parse_qstring("H=0=nop=nop@CRX=1=0=0.1")
+        >>> print(names, targs, ctrls, params)
+            ['H', 'CRX'] [0 1] [-1  0] [nan 0.1]
+    """
+    gate_set = get_gate_set(gate_set)
+
+    names, targets, controls, params = [], [], [], []
+    for g_str in break_qstr_to_gstrs(q_string):
+        g_elems = g_str.strip().split("=")
+        if g_elems[0] == "nop" or g_elems[0] == "":
+            continue
+        try:
+            _gname, _targ, _ctrl, _param = g_elems[:4]
+            _targ = int(_targ)
+            _ctrl = -1 if _ctrl == "nop" else int(_ctrl)
+        except:
+            raise ValueError("The string given is invalid: {}".format(g_str))
+
+        if _gname.upper() in gate_set.one_qubit and rm_ctrl:
+            _ctrl = -1
+        elif _gname.upper() in gate_set.two_qubit and (_ctrl < 0 or _ctrl == _targ):
+            _gname = gate_set.cast_to_1q(_gname.upper())
+            _ctrl = -1
+        names.append(_gname)
+        targets.append(_targ)
+        controls.append(_ctrl)
+        params.append(_param.strip())
+
+    targets = numpy.asarray(targets, dtype=int)
+    controls = numpy.asarray(controls, dtype=int)
+    if not raw_params:
+        params = param_values(params)
+    return names, targets, controls, params
+
+def param_values(params: list):
+    """
+    Convert parameter strings into floats, nan for static or symbolic parameters.
+
+    Args:
+        :params: A list of parameter strings.
+    Returns:
+        :ndarray: The parameter values.
+    """
+    values = numpy.full(len(params), numpy.nan)
+    for i, p in enumerate(params):
+        try:
+            values[i] = float(p)
+        except ValueError:
+            pass
+    return values
+
 def random_array(n_elem: int, distrib: str = "normal", rand_seed: int = None,
                  l_bound: float = 0, r_bound: float = 1,
                  mean: float = numpy.pi/2, scale: float = numpy.pi/4):
@@ -0,0 +1,143 @@
+'''
+Peephole optimizer for circuits represented by strings.
+
+The following rewrites are applied, commuting gates through gates that act
+on disjoint qubits:
+
+    - adjacent self-inverse pairs cancel:     X X -> I, CNOT CNOT -> I
+    - consecutive rotations of the same axis: RX(a) RX(b) -> RX(a+b)
+    - rotations with vanishing angles:        RX(0) -> I
+'''
+import numpy
+from digicircs.utils import misc
+
+SELF_INVERSE_GATES = frozenset(["X", "Y", "Z", "H", "CNOT", "CX", "CY", "CZ"])
+PAULI_PAIR_GATES = frozenset(misc.get_paulis_2q())
+ROTATION_GATES = frozenset(["RX", "RY", "RZ", "CRX", "CRY", "CRZ"]) | PAULI_PAIR_GATES
+
+def optimize_qstring(q_string: str, atol: float = 1e-8, rm_ctrl: bool = True,
+                     return_stats: bool = False):
+    '''
+    Simplify a circuit with peephole rewrites.
+    Every qubit keeps a stack of the surviving gates acting on it; a new
+    gate is compared with the gate on top of the stacks of all its qubits,
+    which is the latest gate it can be commuted next to.
+
+    Args:
+        :q_string: A string encoding a quantum circuit.
+    Kwargs:
+        :atol: rotations with ``abs(angle) < atol`` are removed.
+        :rm_ctrl: If true, the one qubit gates cannot have control qubits.
+        :return_stats: if True, also return the numbers of rewrites.
+    Returns:
+        :str: the simplified circuit string.
+        :dict: numbers of cancelled, merged and dropped gates (if ``return_stats``).
+    Examples:
+        >>> optimize_qstring("H=0=nop=nop@X=1=nop=nop@H=0=nop=nop@RZ=1=nop=0.1@RZ=1=nop=-0.1")
+            'X=1=nop=nop'
+    '''
+    names, targets, controls, params = misc.parse_qstring(q_string, rm_ctrl=rm_ctrl,
+                                                          raw_params=True)
+    values = misc.param_values(params)
+    stats = {"n_gates_in": len(names), "n_cancelled": 0, "n_merged": 0,
+             "n_dropped": 0}
+
+    gates = [] # surviving gates, None if removed
+    stacks = {}
+    for name, targ, ctrl, param, value in zip(names, targets, controls,
+                                              params, values):
+        gname = name.upper()
+        qubits = (int(targ),) if ctrl < 0 else (int(targ), int(ctrl))
+        if gname in ROTATION_GATES and abs(value) < atol:
+            stats["n_dropped"] += 1
+            continue
+
+        prev = None
+        tops = set(stacks[q][-1] if stacks.get(q) else None for q in qubits)
+        if len(tops) == 1 and None not in tops:
+            prev = tops.pop()
+            if set(gates[prev][1]) != set(qubits):
+                prev = None
+
+        if prev is not None:
+            p_name, p_qubits, p_param, p_value = gates[prev]
+            if gname in SELF_INVERSE_GATES and p_name == gname and p_qubits == qubits:
+                _pop_gate(gates, stacks, prev)
+                stats["n_cancelled"] += 2
+                continue
+            if gname in ROTATION_GATES and _rotation_key(p_name, p_qubits) \
+               == _rotation_key(gname, qubits) and not numpy.isnan(value + p_value):
+                p_value += value
+                stats["n_merged"] += 1
+                if abs(p_value) < atol:
+                    _pop_gate(gates, stacks, prev)
+                    stats["n_dropped"] += 1
+                else:
+                    gates[prev] = (p_name, p_qubits, "{:.10g}".format(p_value), p_value)
+                continue
+
+        for q in qubits:
+            stacks.setdefault(q, []).append(len(gates))
+        gates.append((gname, qubits, param, value))
+
+    gate_strs = []
+    for gate in gates:
+        if gate is None:
+            continue
+        name, qubits, param, value = gate
+        ctrl = str(qubits[1]) if len(qubits) == 2 else "nop"
+        gate_strs.append(name + "=" + str(qubits[0]) + "=" + ctrl + "=" + param)
+    q_string_opt = "@".join(gate_strs)
+    stats["n_gates_out"] = len(gate_strs)
+
+    if return_stats:
+        return q_string_opt, stats
+    return q_string_opt
+
+def optimize_qstrings(q_strings: list, atol: float = 1e-8, rm_ctrl: bool = True):
+    '''
+    Batch version of ``optimize_qstring``, to be used as a pipeline stage.
+
+    Args:
+        :q_strings: A list of strings encoding quantum circuits.
+    Kwargs:
+        :atol: rotations with ``abs(angle) < atol`` are removed.
+        :rm_ctrl: If true, the one qubit gates cannot have control qubits.
+    Returns:
+        :list: the simplified circuit strings.
+        :dict: reduction statistics summed over the batch, with
+               ``reduction`` the fraction of removed gates.
+    '''
+    q_strings_opt = []
+    stats = {"n_circuits": 0, "n_gates_in": 0, "n_gates_out": 0,
+             "n_cancelled": 0, "n_merged": 0, "n_dropped": 0}
+    for q_string in q_strings:
+        q_string_opt, _stats = optimize_qstring(q_string, atol=atol,
+                                                rm_ctrl=rm_ctrl, return_stats=True)
+        q_strings_opt.append(q_string_opt)
+        stats["n_circuits"] += 1
+        for key in _stats:
+            stats[key] += _stats[key]
+    if stats["n_gates_in"] > 0:
+        stats["reduction"] = 1. - stats["n_gates_out"] / stats["n_gates_in"]
+    else:
+        stats["reduction"] = 0.
+    return q_strings_opt, stats
+
+def _rotation_key(name: str, qubits: tuple):
+    '''
+    Key identifying rotations with the same generator.
+    Pauli-pair rotations are symmetric under swapping the two qubits
+    together with the two Paulis (``XY=0=1`` is ``YX=1=0``).
+    '''
+    if name in PAULI_PAIR_GATES:
+        return tuple(sorted([(qubits[0], name[0]), (qubits[1], name[1])]))
+    return (name, qubits)
+
+def _pop_gate(gates: list, stacks: dict, idx: int):
+    '''
+    Remove a gate that is on top of the stacks of all its qubits.
+    '''
+    for q in gates[idx][1]:
+        stacks[q].pop()
+    gates[idx] = None
@@ -24,6 +24,7 @@ plt.rc('savefig', dpi=400)
 from matplotlib import rcParams
 rcParams.update({'figure.autolayout':True})
 from mpl_toolkits.axes_grid1.inset_locator import inset_axes
+from digicircs.utils import misc, scheduler
 
 
 Pauli_2q = ["XX", "XY", "XZ", "YX", "YY", "YZ", "ZX", "ZY", "ZZ"]
@@ -95,22 +96,16 @@ def draw_gate(ax, i_layer, t_qubit, c_qubit=None, t_symb=None, c_symb=None, zord
 
 def draw_circuit(q_str, n_qubit, save_name=None):
 
-    q_list = q_str.split("@")
+    names, targets, controls, params = misc.parse_qstring(q_str, rm_ctrl=False,
+                                                          raw_params=True)
+    layers = scheduler.asap_moments(targets, controls, n_qubit=n_qubit, span=True)
     fig, ax = plt.subplots()
     ax.set_aspect('equal', adjustable='box')
     ax.axis('off')
     #fig.set_size_inches(6,4)
     # draw gates
-    qubit_count = []
-    n_layer = 0
-    for gate in q_list:
-        g_info = gate.split("=")
-        g_name = g_info[0]
-        t_qbit = int(g_info[1])
-        c_qbit = g_info[2]
-        if c_qbit != "nop":
-            c_qbit = int(c_qbit)
-        else:
+    for g_name, t_qbit, c_qbit, i_layer in zip(names, targets, controls, layers):
+        if c_qbit < 0:
             c_qbit = None
         if g_name in Pauli_2q:
             t_symb = g_name[1]
@@ -122,23 +117,9 @@ def draw_circuit(q_str, n_qubit, save_name=None):
             t_symb = g_name
             c_symb = None
 
-        if c_qbit is not None:
-            qmin = min(c_qbit, t_qbit)
-            qmax = max(c_qbit, t_qbit)
-            for i in range(qmin, qmax + 1):
-                if i in qubit_count: # start a new layer
-                    n_layer += 1
-                    qubit_count = []
-                    break
-            qubit_count += list(range(qmin, qmax + 1))
-        else:
-            if t_qbit in qubit_count: # start a new layer
-                n_layer += 1
-                qubit_count = []
-            qubit_count += [t_qbit]
-
-        draw_gate(ax, n_layer, t_qbit, c_qubit = c_qbit, t_symb=t_symb, c_symb=c_symb)
+        draw_gate(ax, i_layer, t_qbit, c_qubit = c_qbit, t_symb=t_symb, c_symb=c_symb)
 
+    n_layer = scheduler.count_moments(layers) - 1
     draw_wires(ax, n_qubit, n_layer, zorder=0)
     if save_name is not None:
         fig.savefig(save_name, dpi=300)
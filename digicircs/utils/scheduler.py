@@ -0,0 +1,150 @@
+'''
+ASAP moment scheduler for circuits represented by strings.
+
+Every gate is placed in the earliest moment after the last gate acting on
+any of its qubits. A per-qubit frontier array stores the next free moment
+of each qubit, so each gate is scheduled in O(1).
+'''
+import numpy
+from digicircs.utils import misc
+
+def asap_moments(targets, controls, n_qubit: int = None, span: bool = False):
+    '''
+    Assign every gate its as-soon-as-possible moment.
+
+    Args:
+        :targets: target qubits of the gates.
+        :controls: control qubits of the gates, -1 for gates without control.
+    Kwargs:
+        :n_qubit: number of qubits, inferred from the gates if not given.
+        :span: if True, a 2-qubit gate also blocks all qubits between its
+               target and control (used for drawing).
+    Returns:
+        :ndarray: the moment index of each gate.
+    Examples:
+        >>> asap_moments([0, 1, 1, 0], [-1, -1, 0, -1])
+            array([0, 0, 1, 2])
+    '''
+    targets = [int(t) for t in targets]
+    controls = [int(c) for c in controls]
+    n_gates = len(targets)
+    if n_qubit is None:
+        n_qubit = max(targets + controls, default=-1) + 1
+
+    frontier = [0] * n_qubit
+    moments = numpy.empty(n_gates, dtype=int)
+    for i in range(n_gates):
+        _targ = targets[i]
+        _ctrl = controls[i]
+        if _ctrl < 0:
+            m = frontier[_targ]
+            frontier[_targ] = m + 1
+        elif span:
+            qmin = min(_targ, _ctrl)
+            qmax = max(_targ, _ctrl) + 1
+            m = max(frontier[qmin:qmax])
+            frontier[qmin:qmax] = [m + 1] * (qmax - qmin)
+        else:
+            m = max(frontier[_targ], frontier[_ctrl])
+            frontier[_targ] = m + 1
+            frontier[_ctrl] = m + 1
+        moments[i] = m
+    return moments
+
+def asap_moments_batch(targets, controls, n_qubit: int = None):
+    '''
+    Vectorized ASAP scheduling of many circuits at once.
+    The gates of all circuits are padded to the same length with -1 targets;
+    the frontier array has shape (n_circuits, n_qubit + 1), where the last
+    column absorbs the writes of missing controls and padded gates.
+
+    Args:
+        :targets: (n_circuits, max_len) array of target qubits, -1 for padding.
+        :controls: (n_circuits, max_len) array of control qubits, -1 for none.
+    Kwargs:
+        :n_qubit: number of qubits, inferred from the gates if not given.
+    Returns:
+        :ndarray: (n_circuits, max_len) array of moment indices, -1 for padding.
+    '''
+    targets = numpy.asarray(targets, dtype=int)
+    controls = numpy.asarray(controls, dtype=int)
+    n_circ, max_len = targets.shape
+    if n_qubit is None:
+        n_qubit = max(targets.max(initial=-1), controls.max(initial=-1)) + 1
+
+    frontier = numpy.zeros((n_circ, n_qubit + 1), dtype=int)
+    moments = numpy.full((n_circ, max_len), -1, dtype=int)
+    rows = numpy.arange(n_circ)
+    for j in range(max_len):
+        _targ = targets[:, j]
+        _ctrl = controls[:, j]
+        m = numpy.maximum(frontier[rows, _targ], frontier[rows, _ctrl])
+        frontier[rows, _ctrl] = m + 1
+        frontier[rows, _targ] = m + 1
+        frontier[:, -1] = 0
+        moments[:, j] = numpy.where(_targ >= 0, m, -1)
+    return moments
+
+def schedule_qstring(q_str: str, span: bool = False, rm_ctrl: bool = True):
+    '''
+    Get the moment index of each gate in a circuit represented by a string.
+
+    Args:
+        :q_str: A string encoding a quantum circuit.
+    Kwargs:
+        :span: if True, 2-qubit gates block all qubits between target and control.
+        :rm_ctrl: If true, the one qubit gates cannot have control qubits.
+    Returns:
+        :ndarray: the moment index of each (non-nop) gate.
+    '''
+    names, targets, controls, params = misc.parse_qstring(q_str, rm_ctrl=rm_ctrl,
+                                                          raw_params=True)
+    return asap_moments(targets, controls, span=span)
+
+def schedule_qstrings(q_strs: list):
+    '''
+    Get the moment indices of the gates of many circuits with the
+    vectorized batch scheduler.
+
+    Args:
+        :q_strs: A list of strings encoding quantum circuits.
+    Returns:
+        :list: A list of arrays with the moment index of each gate.
+    '''
+    parsed = [misc.parse_qstring(q, raw_params=True) for q in q_strs]
+    lengths = [len(p[1]) for p in parsed]
+    max_len = max(lengths, default=0)
+    targets = numpy.full((len(q_strs), max_len), -1, dtype=int)
+    controls = numpy.full((len(q_strs), max_len), -1, dtype=int)
+    for i, p in enumerate(parsed):
+        targets[i, :lengths[i]] = p[1]
+        controls[i, :lengths[i]] = p[2]
+    moments = asap_moments_batch(targets, controls)
+    return [moments[i, :lengths[i]] for i in range(len(q_strs))]
+
+def count_moments(moments):
+    '''
+    Number of moments of a scheduled circuit.
+
+    Args:
+        :moments: the moment index array of a circuit.
+    Returns:
+        :int: Number of moments (0 for an empty circuit).
+    '''
+    moments = numpy.asarray(moments)
+    return int(moments.max(initial=-1)) + 1
+
+def group_by_moment(moments):
+    '''
+    Group the gate indices by moment.
+
+    Args:
+        :moments: the moment index array of a circuit.
+    Returns:
+        :list: A list of arrays; the i-th array contains the indices of
+               the gates in moment i.
+    '''
+    moments = numpy.asarray(moments)
+    order = numpy.argsort(moments, kind="stable")
+    bounds = numpy.searchsorted(moments[order], numpy.arange(count_moments(moments) + 1))
+    return [order[bounds[i]:bounds[i+1]] for i in range(len(bounds) - 1)]